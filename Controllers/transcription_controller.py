@@ -1,22 +1,77 @@
+import base64
+import logging
 import os
-import subprocess
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
+from uuid import uuid4
 
 import openai
 from fastapi import UploadFile, HTTPException, status
+from sqlalchemy import String, and_, func, literal, or_
 from sqlalchemy.orm import Session
-
-from db.models import Transcription as TranscriptionModel, TranscriptionStatus
-from Schemas.transcription_schema import TranscriptionHistoryItem, TranscriptionDetail
-from services.storage import store_audio_file
-from services.queue import transcription_queue
-from workers.transcription_job import transcription_job
+from starlette.concurrency import run_in_threadpool
+
+from db.models import Transcription as TranscriptionModel, TranscriptionStatus, TranscriptSegment
+from Schemas.transcription_schema import (
+    TranscriptionHistoryItem,
+    TranscriptionDetail,
+    TranscriptionProgressEvent,
+    TranscriptSegmentOut,
+    TranscriptWord,
+)
+from services.audio import normalize_for_transcription, probe_duration_seconds
+from services.leases import LeaseKeeper, lease_deadline
+from services.progress import publish_progress
+from services.retention import AUDIO_TIER_COLD, AUDIO_TIER_PURGED, restore_object
+from services.scheduler import choose_lane, transcription_scheduler
+from services.segments import CheckpointStore, join_overlapping_texts, plan_windows, transcribe_windows
+from services.timeline import (
+    TimedSegment,
+    Transcript,
+    merge_window_segments,
+    pack_word_times,
+    shift_segment,
+    to_ms,
+    transcript_from_response,
+    unpack_word_times,
+)
+from services.storage import StoredFile, discard_spool, get_storage, persist_upload, spool_upload
+from services.summarizer import map_reduce_summary
+from services.vad import TrimResult, trim_silence
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_AUDIO_TYPES = {"audio/mpeg", "audio/wav", "audio/x-m4a", "audio/mp4", "audio/aac"}
 SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
 TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "whisper-1")
+# Recordings longer than one segment are cut into overlapping windows that
+# are transcribed concurrently. Set TRANSCRIPTION_SEGMENT_SECONDS=0 to always
+# send the whole file in one request.
+TRANSCRIPTION_SEGMENT_SECONDS = int(os.getenv("TRANSCRIPTION_SEGMENT_SECONDS", "600"))
+TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS = int(os.getenv("TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS", "5"))
+TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "4"))
+# How often playing a recording refreshes its audio_accessed_at.
+AUDIO_ACCESS_TOUCH_INTERVAL = timedelta(hours=1)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 100
+# Ask Whisper for segment and word timings (verbose_json). Only whisper-1
+# returns them; turn off for models that reject timestamp granularities.
+TRANSCRIPTION_TIMESTAMPS = os.getenv("TRANSCRIPTION_TIMESTAMPS", "on").lower() not in ("0", "off", "false")
+# Audio is transcoded to compact mono 16 kHz before upload to the API:
+# "opus", "flac", or "off" to send the original file.
+TRANSCRIPTION_NORMALIZE_CODEC = os.getenv("TRANSCRIPTION_NORMALIZE_CODEC", "opus").lower()
+# Long silent stretches are cut before transcription; the offset map stored
+# on the row maps trimmed times back to the original recording.
+TRANSCRIPTION_VAD = os.getenv("TRANSCRIPTION_VAD", "on").lower() not in ("0", "off", "false")
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "2.0"))
+VAD_KEEP_SILENCE_SECONDS = float(os.getenv("VAD_KEEP_SILENCE_SECONDS", "0.5"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+# Transcripts above this estimated token count are summarized map-reduce style.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
@@ -35,35 +90,98 @@ async def create_transcription_request(
             detail="Invalid file type. Only .mp3, .wav, .m4a, or .aac files are supported.",
         )
 
-    stored_file = await store_audio_file(file, user_id)
+    spooled = await spool_upload(file, user_id)
+    try:
+        # Probe at upload time, off the local spool, so the duration is known
+        # before the job is queued.
+        duration_seconds = await run_in_threadpool(
+            _extract_duration_seconds, spooled.absolute_path, spooled.detected_format
+        )
+        stored_file = await run_in_threadpool(persist_upload, spooled)
+    finally:
+        discard_spool(spooled)
+    storage = get_storage()
+    transcription_id = str(uuid4())
     transcription = TranscriptionModel(
+        id=transcription_id,
         user_id=user_id,
         title=title,
         course_name=course_name,
-        audio_url=stored_file.public_url,
-        audio_path=str(stored_file.absolute_path),
+        audio_url=audio_url_for(transcription_id),
+        audio_path=storage.uri(stored_file.key),
+        audio_key=stored_file.key,
+        audio_sha256=stored_file.sha256,
+        audio_size_bytes=stored_file.size_bytes,
+        duration_seconds=duration_seconds,
         status=TranscriptionStatus.PENDING,
     )
+
+    # Identical audio that has already been transcribed is copied over
+    # instead of going through Whisper and the summary model again.
+    duplicate = _find_completed_duplicate(db, stored_file.sha256)
+    if duplicate:
+        transcription.transcript_text = duplicate.transcript_text
+        transcription.summary_text = duplicate.summary_text
+        transcription.duration_seconds = duplicate.duration_seconds or duration_seconds
+        transcription.word_count = duplicate.word_count
+        transcription.course_name = course_name or duplicate.course_name
+        transcription.status = TranscriptionStatus.COMPLETED
+
     db.add(transcription)
+    if duplicate:
+        db.flush()
+        _copy_segments(db, source_id=duplicate.id, target_id=transcription.id)
     db.commit()
     db.refresh(transcription)
 
-    transcription_queue.enqueue(transcription_job, transcription_id=transcription.id)
+    if not duplicate:
+        transcription_scheduler.submit(
+            transcription.id, user_id=user_id, lane=choose_lane(duration_seconds)
+        )
     return transcription
 
 
 def list_transcriptions_for_history(
-    db: Session, *, user_id: int, filter_value: Optional[str]
-) -> List[TranscriptionHistoryItem]:
+    db: Session,
+    *,
+    user_id: int,
+    filter_value: Optional[str],
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[TranscriptionHistoryItem], Optional[str]]:
+    """
+    Return one page of history, newest first, plus the cursor for the next
+    page (None on the last page). Only the columns shown in the list are
+    loaded, and paging seeks on (created_at, id) instead of using OFFSET.
+    """
     query = (
-        db.query(TranscriptionModel)
+        db.query(
+            TranscriptionModel.id,
+            TranscriptionModel.course_name,
+            TranscriptionModel.word_count,
+            TranscriptionModel.created_at,
+            TranscriptionModel.duration_seconds,
+            TranscriptionModel.status,
+        )
         .filter(TranscriptionModel.user_id == user_id)
-        .order_by(TranscriptionModel.created_at.desc())
+        .order_by(TranscriptionModel.created_at.desc(), TranscriptionModel.id.desc())
     )
     query = _apply_history_filter(query, filter_value)
+    if cursor:
+        created_at, last_id = _decode_history_cursor(cursor)
+        bound = _created_at_bound(db, created_at)
+        query = query.filter(
+            or_(
+                TranscriptionModel.created_at < bound,
+                and_(TranscriptionModel.created_at == bound, TranscriptionModel.id < last_id),
+            )
+        )
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = _encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
 
     items: List[TranscriptionHistoryItem] = []
-    for row in query.all():
+    for row in rows[:limit]:
         items.append(
             TranscriptionHistoryItem(
                 id=row.id,
@@ -74,7 +192,7 @@ def list_transcriptions_for_history(
                 status=row.status,
             )
         )
-    return items
+    return items, next_cursor
 
 
 def get_transcription_detail(db: Session, *, user_id: int, transcription_id: str) -> TranscriptionDetail:
@@ -90,12 +208,15 @@ def get_transcription_detail(db: Session, *, user_id: int, transcription_id: str
         id=transcription.id,
         title=transcription.title,
         course_name=transcription.course_name,
-        audio_url=transcription.audio_url,
+        audio_url=audio_url_for(transcription.id),
         transcript_text=transcription.transcript_text,
         summary_text=transcription.summary_text,
         duration_seconds=transcription.duration_seconds,
         duration=_format_duration(transcription.duration_seconds),
         word_count=transcription.word_count,
+        audio_size_bytes=transcription.audio_size_bytes,
+        transcoded_size_bytes=transcription.transcoded_size_bytes,
+        trimmed_percent=transcription.trimmed_percent,
         status=transcription.status,
         created_at=transcription.created_at,
         updated_at=transcription.updated_at,
@@ -103,62 +224,327 @@ def get_transcription_detail(db: Session, *, user_id: int, transcription_id: str
     )
 
 
+def get_transcription_progress(
+    db: Session, *, user_id: int, transcription_id: str
+) -> TranscriptionProgressEvent:
+    # Only the status columns are loaded; transcript and summary stay in the DB.
+    row = (
+        db.query(TranscriptionModel.id, TranscriptionModel.status, TranscriptionModel.error_message)
+        .filter(TranscriptionModel.id == transcription_id, TranscriptionModel.user_id == user_id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transcription not found")
+
+    return TranscriptionProgressEvent(id=row.id, status=row.status, error_message=row.error_message)
+
+
+def get_transcription_audio(db: Session, *, user_id: int, transcription_id: str) -> StoredFile:
+    row = (
+        db.query(
+            TranscriptionModel.audio_path,
+            TranscriptionModel.audio_key,
+            TranscriptionModel.audio_sha256,
+            TranscriptionModel.audio_size_bytes,
+            TranscriptionModel.audio_tier,
+        )
+        .filter(TranscriptionModel.id == transcription_id, TranscriptionModel.user_id == user_id)
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transcription not found")
+    if row.audio_tier == AUDIO_TIER_PURGED:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Audio was removed by the retention policy")
+    if row.audio_tier == AUDIO_TIER_COLD:
+        _restore_audio(db, row.audio_key, row.audio_sha256)
+
+    # Retention ages recordings from their last play. The player sends many
+    # range requests, so the timestamp is written at most once an interval.
+    now = datetime.utcnow()
+    db.query(TranscriptionModel).filter(
+        TranscriptionModel.id == transcription_id,
+        or_(
+            TranscriptionModel.audio_accessed_at.is_(None),
+            TranscriptionModel.audio_accessed_at < now - AUDIO_ACCESS_TOUCH_INTERVAL,
+        ),
+    ).update({"audio_accessed_at": now}, synchronize_session=False)
+    db.commit()
+
+    return StoredFile(
+        absolute_path=get_storage().local_path(row.audio_key) if row.audio_key else Path(row.audio_path),
+        sha256=row.audio_sha256,
+        size_bytes=row.audio_size_bytes or 0,
+        key=row.audio_key,
+    )
+
+
+def _restore_audio(db: Session, key: str, sha256: Optional[str]) -> None:
+    # Every transcription sharing the recording comes back with it.
+    try:
+        restore_object(key, sha256)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio file not found")
+    db.query(TranscriptionModel).filter(
+        TranscriptionModel.audio_key == key, TranscriptionModel.audio_tier == AUDIO_TIER_COLD
+    ).update({"audio_tier": None, "audio_path": get_storage().uri(key)}, synchronize_session=False)
+    db.commit()
+
+
+def audio_url_for(transcription_id: str) -> str:
+    # Per transcription rather than per file: deduplicated uploads share one
+    # file but each owner is authorized against their own row.
+    return f"/api/v1/transcriptions/{transcription_id}/audio"
+
+
+def get_transcript_segments(
+    db: Session,
+    *,
+    user_id: int,
+    transcription_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> List[TranscriptSegmentOut]:
+    """
+    Segments overlapping ``[start, end]`` seconds of the original recording.
+
+    Segments follow each other without overlapping, so the range starts at
+    the last segment beginning at or before ``start``. Both steps are seeks
+    on the (transcription_id, start_ms) index.
+    """
+    owned = (
+        db.query(TranscriptionModel.id)
+        .filter(TranscriptionModel.id == transcription_id, TranscriptionModel.user_id == user_id)
+        .first()
+    )
+    if not owned:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transcription not found")
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must not be before start")
+
+    query = db.query(TranscriptSegment).filter(TranscriptSegment.transcription_id == transcription_id)
+    if start is not None:
+        first_start = (
+            db.query(func.max(TranscriptSegment.start_ms))
+            .filter(
+                TranscriptSegment.transcription_id == transcription_id,
+                TranscriptSegment.start_ms <= to_ms(start),
+            )
+            .scalar_subquery()
+        )
+        query = query.filter(
+            TranscriptSegment.start_ms >= func.coalesce(first_start, 0),
+            TranscriptSegment.end_ms >= to_ms(start),
+        )
+    if end is not None:
+        query = query.filter(TranscriptSegment.start_ms <= to_ms(end))
+
+    segments: List[TranscriptSegmentOut] = []
+    for row in query.order_by(TranscriptSegment.start_ms):
+        words = row.words or []
+        segments.append(
+            TranscriptSegmentOut(
+                start=row.start_ms / 1000,
+                end=row.end_ms / 1000,
+                text=row.text,
+                words=[
+                    TranscriptWord(word=word, start=word_start / 1000, end=word_end / 1000)
+                    for word, (word_start, word_end) in zip(words, unpack_word_times(row.word_times))
+                ],
+            )
+        )
+    return segments
+
+
 def process_transcription_job(db: Session, transcription_id: str) -> None:
     transcription = db.query(TranscriptionModel).filter(TranscriptionModel.id == transcription_id).first()
-    if not transcription:
+    if not transcription or transcription.status == TranscriptionStatus.COMPLETED:
         return
 
     transcription.status = TranscriptionStatus.PROCESSING
     transcription.error_message = None
+    transcription.attempts = (transcription.attempts or 0) + 1
+    transcription.lease_owner = str(uuid4())
+    transcription.lease_expires_at = lease_deadline()
+    transcription.next_attempt_at = None
     db.commit()
-
-    try:
-        audio_path = Path(transcription.audio_path)
-        if not audio_path.exists():
-            raise RuntimeError(f"Stored audio file not found at {audio_path}")
-
-        transcription.duration_seconds = _extract_duration_seconds(audio_path)
-
-        # If OpenAI key isn't configured, create a safe stubbed transcript so
-        # the system can be run locally without failing.
-        if not openai.api_key:
-            # Create a lightweight stub so the front-end doesn't block
-            transcript_text = (
-                "[TRANSCRIPT STUB] OpenAI API key not configured. "
-                "Install and set OPENAI_API_KEY to enable real transcriptions."
-            )
-        else:
-            with audio_path.open("rb") as audio_file:
-                transcription_result = openai.Audio.transcriptions.create(
-                    model=TRANSCRIPTION_MODEL,
-                    file=audio_file,
+    _publish_progress(transcription, stage="transcribing", progress=0.0)
+
+    with LeaseKeeper(transcription.id, transcription.lease_owner) as lease:
+        try:
+            with _local_audio(transcription) as audio_path:
+                if transcription.duration_seconds is None:
+                    transcription.duration_seconds = _extract_duration_seconds(audio_path)
+
+                # If OpenAI key isn't configured, create a safe stubbed transcript so
+                # the system can be run locally without failing.
+                if not openai.api_key:
+                    # Create a lightweight stub so the front-end doesn't block
+                    transcript = Transcript(
+                        text=(
+                            "[TRANSCRIPT STUB] OpenAI API key not configured. "
+                            "Install and set OPENAI_API_KEY to enable real transcriptions."
+                        )
+                    )
+                else:
+                    transcript = _transcribe_recording(transcription, audio_path)
+            transcript_text = transcript.text
+            transcription.transcript_text = transcript_text
+            transcription.word_count = len(transcript_text.split())
+
+            _publish_progress(transcription, stage="summarizing")
+
+            # Try to generate a summary only if we have an API key. If not,
+            # leave a short note and an empty summary so the frontend can proceed.
+            if openai.api_key:
+                transcription.summary_text = _generate_summary(transcript_text)
+            else:
+                transcription.summary_text = (
+                    "[SUMMARY SKIPPED] OpenAI API key not configured; summary omitted."
+                )
+            if not transcription.course_name:
+                transcription.course_name = (
+                    _infer_course_name(transcription.summary_text) if openai.api_key else "General Studies"
                 )
 
-            transcript_text = transcription_result.text
-        transcription.transcript_text = transcript_text
-        transcription.word_count = len(transcript_text.split())
-
-        # Try to generate a summary only if we have an API key. If not,
-        # leave a short note and an empty summary so the frontend can proceed.
-        if openai.api_key:
-            transcription.summary_text = _generate_summary(transcript_text)
+            transcription.status = TranscriptionStatus.COMPLETED
+        except Exception as exc:
+            if _lease_lost(db, lease):
+                raise
+            transcription.status = TranscriptionStatus.FAILED
+            transcription.error_message = str(exc)
+            _release_lease(transcription)
+            db.commit()
+            _publish_progress(transcription)
+            raise
         else:
-            transcription.summary_text = (
-                "[SUMMARY SKIPPED] OpenAI API key not configured; summary omitted."
-            )
-        if not transcription.course_name:
-            transcription.course_name = (
-                _infer_course_name(transcript_text) if openai.api_key else "General Studies"
+            if _lease_lost(db, lease):
+                return
+            # Written only once the lease is confirmed, in the same commit as
+            # the transcript: holding the segment rows' write lock through
+            # summarization would block the lease heartbeat on SQLite.
+            _replace_segments(db, transcription.id, transcript.segments)
+            _release_lease(transcription)
+            db.commit()
+            _publish_progress(transcription)
+            CheckpointStore.for_transcription(transcription.id).clear()
+
+
+@contextmanager
+def _local_audio(transcription: TranscriptionModel) -> Iterator[Path]:
+    # Workers fetch the recording by key, so they need no shared volume
+    # with the API; with local storage this is the stored file itself.
+    if transcription.audio_key:
+        storage = get_storage()
+        if not storage.exists(transcription.audio_key):
+            # A new upload of a recording whose hot copy the retention job
+            # was removing at the same moment.
+            restore_object(transcription.audio_key, transcription.audio_sha256)
+        with storage.local_copy(transcription.audio_key) as audio_path:
+            yield audio_path
+        return
+    audio_path = Path(transcription.audio_path)
+    if not audio_path.exists():
+        raise RuntimeError(f"Stored audio file not found at {audio_path}")
+    yield audio_path
+
+
+def _transcribe_recording(transcription: TranscriptionModel, audio_path: Path) -> Transcript:
+    # Trimmed and transcoded intermediates are per attempt: the stored audio
+    # is content-addressed, so paths next to it would be shared by every job
+    # for the same recording. The directory goes away with the attempt.
+    with tempfile.TemporaryDirectory(prefix=f"transcription-{transcription.id}-") as work_dir:
+        speech_seconds = transcription.duration_seconds
+        speech = _trim_silence(audio_path, Path(work_dir) / "speech.wav")
+        if speech:
+            transcription.trimmed_percent = round(speech.trimmed_percent, 1)
+            transcription.speech_offset_map = speech.offset_map.to_json()
+            speech_seconds = int(speech.trimmed_seconds)
+            logger.info(
+                "Transcription %s: trimmed %.1f%% silence (%.0fs of %.0fs kept)",
+                transcription.id,
+                speech.trimmed_percent,
+                speech.trimmed_seconds,
+                speech.original_seconds,
             )
 
-        transcription.status = TranscriptionStatus.COMPLETED
-    except Exception as exc:
-        transcription.status = TranscriptionStatus.FAILED
-        transcription.error_message = str(exc)
-        db.commit()
-        raise
-    else:
-        db.commit()
+        upload_path = _prepare_audio(speech.path if speech else audio_path)
+        transcription.audio_size_bytes = audio_path.stat().st_size
+        if upload_path != audio_path:
+            transcription.transcoded_size_bytes = upload_path.stat().st_size
+        _log_upload_size(transcription, upload_path)
+        transcript = _transcribe_audio(upload_path, speech_seconds, transcription.id)
+        if speech:
+            # Segment times refer to the trimmed audio; map them back.
+            transcript.segments = [shift_segment(s, speech.offset_map.to_original) for s in transcript.segments]
+        return transcript
+
+
+def _release_lease(transcription: TranscriptionModel) -> None:
+    transcription.lease_owner = None
+    transcription.lease_expires_at = None
+
+
+def _lease_lost(db: Session, lease: LeaseKeeper) -> bool:
+    """
+    True when the reaper handed this job to another attempt while it ran;
+    this attempt's results are then discarded.
+    """
+    if not lease.lost.is_set() and lease.renew():
+        return False
+    db.rollback()
+    logger.warning("Lost lease on transcription %s; discarding this attempt", lease.transcription_id)
+    return True
+
+
+def _publish_progress(
+    transcription: TranscriptionModel, *, stage: Optional[str] = None, progress: Optional[float] = None
+) -> None:
+    event = TranscriptionProgressEvent(
+        id=transcription.id,
+        status=transcription.status,
+        stage=stage,
+        progress=progress,
+        error_message=transcription.error_message,
+    )
+    publish_progress(transcription.id, event.model_dump(mode="json"))
+
+
+def _find_completed_duplicate(db: Session, audio_sha256: Optional[str]) -> Optional[TranscriptionModel]:
+    if not audio_sha256:
+        return None
+    return (
+        db.query(TranscriptionModel)
+        .filter(
+            TranscriptionModel.audio_sha256 == audio_sha256,
+            TranscriptionModel.status == TranscriptionStatus.COMPLETED,
+        )
+        .order_by(TranscriptionModel.created_at.desc())
+        .first()
+    )
+
+
+def _encode_history_cursor(row) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, last_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), last_id
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid history cursor")
+
+
+def _created_at_bound(db: Session, created_at: datetime):
+    # SQLite stores server-default timestamps as "YYYY-MM-DD HH:MM:SS" text,
+    # while bound datetimes always carry microseconds, so equal values would
+    # not compare equal. Bind the cursor in the stored text format instead.
+    if db.get_bind().dialect.name == "sqlite":
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if created_at.microsecond else "%Y-%m-%d %H:%M:%S"
+        return literal(created_at.strftime(fmt), String)
+    return created_at
 
 
 def _apply_history_filter(query, filter_value: Optional[str]):
@@ -186,32 +572,161 @@ def _format_duration(seconds: Optional[int]) -> Optional[str]:
     return f"{int(hours):02d}:{int(minutes):02d}:{int(secs):02d}"
 
 
-def _extract_duration_seconds(path: Path) -> Optional[int]:
+def _extract_duration_seconds(path: Path, detected_format: Optional[str] = None) -> Optional[int]:
+    seconds = probe_duration_seconds(path, detected_format)
+    return int(seconds) if seconds is not None else None
+
+
+def _trim_silence(audio_path: Path, destination: Path) -> Optional[TrimResult]:
+    if not TRANSCRIPTION_VAD:
+        return None
     try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-show_entries",
-                "format=duration",
-                "-of",
-                "default=noprint_wrappers=1:nokey=1",
-                str(path),
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
+        return trim_silence(
+            audio_path,
+            destination,
+            min_silence_seconds=VAD_MIN_SILENCE_SECONDS,
+            keep_silence_seconds=VAD_KEEP_SILENCE_SECONDS,
+            margin_db=VAD_MARGIN_DB,
         )
-        return int(float(result.stdout.strip()))
-    except Exception:
+    except Exception as exc:
+        logger.warning("Could not trim silence from %s, sending full audio: %s", audio_path, exc)
         return None
 
 
+def _prepare_audio(audio_path: Path) -> Path:
+    if TRANSCRIPTION_NORMALIZE_CODEC not in ("opus", "flac"):
+        return audio_path
+    try:
+        return normalize_for_transcription(audio_path, TRANSCRIPTION_NORMALIZE_CODEC)
+    except Exception as exc:
+        # ffmpeg missing or unable to decode: the API still accepts the original.
+        logger.warning("Could not normalize %s, sending original audio: %s", audio_path, exc)
+        return audio_path
+
+
+def _log_upload_size(transcription: TranscriptionModel, upload_path: Path) -> None:
+    sent_bytes = upload_path.stat().st_size
+    minutes = (transcription.duration_seconds or 0) / 60
+    logger.info(
+        "Transcription %s: sending %d bytes (original %d, %s bytes per audio minute)",
+        transcription.id,
+        sent_bytes,
+        transcription.audio_size_bytes,
+        f"{sent_bytes / minutes:.0f}" if minutes else "unknown",
+    )
+
+
+def _transcribe_audio(audio_path: Path, duration_seconds: Optional[int], transcription_id: str) -> Transcript:
+    if (
+        TRANSCRIPTION_SEGMENT_SECONDS <= 0
+        or not duration_seconds
+        or duration_seconds <= TRANSCRIPTION_SEGMENT_SECONDS
+    ):
+        return _transcribe_file(audio_path)
+
+    windows = plan_windows(
+        duration_seconds, TRANSCRIPTION_SEGMENT_SECONDS, TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS
+    )
+    transcripts = transcribe_windows(
+        audio_path,
+        windows,
+        _transcribe_file,
+        CheckpointStore.for_transcription(transcription_id),
+        max_concurrency=TRANSCRIPTION_MAX_CONCURRENCY,
+        on_progress=lambda done, total: publish_progress(
+            transcription_id,
+            TranscriptionProgressEvent(
+                id=transcription_id,
+                status=TranscriptionStatus.PROCESSING,
+                stage="transcribing",
+                progress=done / total,
+            ).model_dump(mode="json"),
+        ),
+    )
+    return Transcript(
+        text=join_overlapping_texts([t.text for t in transcripts]),
+        segments=merge_window_segments(windows, transcripts),
+    )
+
+
+def _transcribe_file(audio_path: Path) -> Transcript:
+    options = {}
+    if TRANSCRIPTION_TIMESTAMPS:
+        options = {"response_format": "verbose_json", "timestamp_granularities": ["segment", "word"]}
+    with audio_path.open("rb") as audio_file:
+        transcription_result = openai.Audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL,
+            file=audio_file,
+            **options,
+        )
+    return transcript_from_response(transcription_result)
+
+
+def _replace_segments(db: Session, transcription_id: str, segments: List[TimedSegment]) -> None:
+    # A retried job replaces whatever an earlier attempt stored.
+    db.query(TranscriptSegment).filter(TranscriptSegment.transcription_id == transcription_id).delete(
+        synchronize_session=False
+    )
+    db.add_all(
+        TranscriptSegment(
+            transcription_id=transcription_id,
+            position=position,
+            start_ms=to_ms(segment.start),
+            end_ms=to_ms(segment.end),
+            text=segment.text,
+            words=[word.word for word in segment.words] or None,
+            word_times=pack_word_times(segment.words) if segment.words else None,
+        )
+        for position, segment in enumerate(segments)
+    )
+
+
+def _copy_segments(db: Session, *, source_id: str, target_id: str) -> None:
+    rows = db.query(TranscriptSegment).filter(TranscriptSegment.transcription_id == source_id).all()
+    db.add_all(
+        TranscriptSegment(
+            transcription_id=target_id,
+            position=row.position,
+            start_ms=row.start_ms,
+            end_ms=row.end_ms,
+            text=row.text,
+            words=row.words,
+            word_times=row.word_times,
+        )
+        for row in rows
+    )
+
+
 def _generate_summary(transcript_text: str) -> str:
     if not transcript_text:
         return ""
 
+    return map_reduce_summary(
+        transcript_text,
+        summarize_chunk=_summarize_transcript_chunk,
+        reduce_summaries=_write_study_notes,
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        max_concurrency=SUMMARY_MAX_CONCURRENCY,
+    )
+
+
+def _summarize_transcript_chunk(chunk_text: str) -> str:
+    prompt = (
+        "You are a note-taking assistant. Condense this part of a lecture into dense bullet "
+        "points, keeping every definition, key term, example and assignment mentioned."
+    )
+    response = openai.ChatCompletion.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": chunk_text},
+        ],
+        temperature=0.2,
+    )
+    return response.choices[0].message["content"].strip()
+
+
+def _write_study_notes(lecture_text: str) -> str:
     prompt = (
         "You are a note-taking assistant. Create organized study notes with sections "
         "Overview, Key Points, Important Terms, and Action Items using concise Markdown."
@@ -220,15 +735,15 @@ def _generate_summary(transcript_text: str) -> str:
         model=SUMMARY_MODEL,
         messages=[
             {"role": "system", "content": prompt},
-            {"role": "user", "content": transcript_text},
+            {"role": "user", "content": lecture_text},
         ],
         temperature=0.3,
     )
     return response.choices[0].message["content"].strip()
 
 
-def _infer_course_name(transcript_text: str) -> Optional[str]:
-    if not transcript_text:
+def _infer_course_name(lecture_text: str) -> Optional[str]:
+    if not lecture_text:
         return None
 
     response = openai.ChatCompletion.create(
@@ -237,13 +752,13 @@ def _infer_course_name(transcript_text: str) -> Optional[str]:
             {
                 "role": "system",
                 "content": (
-                    "Read the lecture transcript and reply with a short course or subject label "
+                    "Read the lecture notes and reply with a short course or subject label "
                     "(max 5 words). If unsure, respond with 'General Studies'."
                 ),
             },
-            {"role": "user", "content": transcript_text},
+            {"role": "user", "content": lecture_text},
         ],
         temperature=0.2,
         max_tokens=30,
     )
-    return response.choices[0].message["content"].strip()
\ No newline at end of file
+    return response.choices[0].message["content"].strip()
@@ -1,22 +1,38 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, status, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Form, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from db.sessions import get_db
+from db.sessions import SessionLocal, get_db
 from Controllers.transcription_controller import (
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE,
     create_transcription_request,
     list_transcriptions_for_history,
     get_transcription_detail,
+    get_transcription_progress,
+    get_transcript_segments,
+    get_transcription_audio,
 )
 from Schemas.transcription_schema import (
     TranscriptionUploadResponse,
     TranscriptionHistoryItem,
     TranscriptionDetail,
+    TranscriptionProgressEvent,
+    QueueLaneStats,
+    TranscriptSegmentOut,
 )
+from services.media import media_file_response
+from services.progress import TERMINAL_STATUSES, open_subscription
+from services.scheduler import transcription_scheduler
 
 router = APIRouter(prefix="/api/v1/transcriptions", tags=["Transcriptions"])
 
+# Comment line sent on idle streams so proxies don't drop the connection.
+SSE_KEEPALIVE_SECONDS = 15.0
+
 
 @router.post(
     "/upload",
@@ -42,13 +58,28 @@ async def upload_transcription(
 
 @router.get("/history", response_model=List[TranscriptionHistoryItem])
 def get_transcription_history(
+    response: Response,
     user_id: int = Query(..., description="Authenticated user identifier"),
     filter: Optional[str] = Query(
         default=None, pattern="^(today|week|month)$", description="Date filter"
     ),
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(
+        default=None, description="X-Next-Cursor value from the previous page"
+    ),
     db: Session = Depends(get_db),
 ):
-    return list_transcriptions_for_history(db, user_id=user_id, filter_value=filter)
+    items, next_cursor = list_transcriptions_for_history(
+        db, user_id=user_id, filter_value=filter, limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.get("/queue/stats", response_model=List[QueueLaneStats])
+def get_queue_stats():
+    return transcription_scheduler.stats()
 
 
 @router.get("/{transcription_id}", response_model=TranscriptionDetail)
@@ -66,5 +97,83 @@ def get_transcription_status(
     user_id: int = Query(..., description="Authenticated user identifier"),
     db: Session = Depends(get_db),
 ):
-    detail = get_transcription_detail(db, user_id=user_id, transcription_id=transcription_id)
-    return TranscriptionUploadResponse(id=detail.id, status=detail.status)
\ No newline at end of file
+    progress = get_transcription_progress(db, user_id=user_id, transcription_id=transcription_id)
+    return TranscriptionUploadResponse(id=progress.id, status=progress.status)
+
+
+@router.get("/{transcription_id}/segments", response_model=List[TranscriptSegmentOut])
+def get_transcription_segments(
+    transcription_id: str,
+    user_id: int = Query(..., description="Authenticated user identifier"),
+    start: Optional[float] = Query(default=None, ge=0, description="Range start, seconds into the recording"),
+    end: Optional[float] = Query(default=None, ge=0, description="Range end, seconds into the recording"),
+    db: Session = Depends(get_db),
+):
+    return get_transcript_segments(
+        db, user_id=user_id, transcription_id=transcription_id, start=start, end=end
+    )
+
+
+@router.get("/{transcription_id}/audio")
+def get_transcription_audio_file(
+    request: Request,
+    transcription_id: str,
+    user_id: int = Query(..., description="Authenticated user identifier"),
+    db: Session = Depends(get_db),
+):
+    stored = get_transcription_audio(db, user_id=user_id, transcription_id=transcription_id)
+    return media_file_response(request.headers, stored)
+
+
+@router.get("/{transcription_id}/events")
+async def stream_transcription_events(
+    transcription_id: str,
+    user_id: int = Query(..., description="Authenticated user identifier"),
+):
+    """
+    Server-Sent Events stream of status changes for one transcription.
+    The current status is sent first; the stream ends once the job is
+    COMPLETED or FAILED.
+    """
+    # Subscribe before reading the snapshot so no transition is missed.
+    subscription = await open_subscription(transcription_id)
+    try:
+        snapshot = await run_in_threadpool(_read_progress_snapshot, user_id, transcription_id)
+    except Exception:
+        await subscription.close()
+        raise
+
+    return StreamingResponse(
+        _progress_event_stream(snapshot, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _read_progress_snapshot(user_id: int, transcription_id: str) -> TranscriptionProgressEvent:
+    # A get_db dependency would stay checked out until the stream ends, so
+    # every open stream would pin a pooled connection for the whole job.
+    db = SessionLocal()
+    try:
+        return get_transcription_progress(db, user_id=user_id, transcription_id=transcription_id)
+    finally:
+        db.close()
+
+
+async def _progress_event_stream(
+    snapshot: TranscriptionProgressEvent, subscription
+) -> AsyncIterator[str]:
+    try:
+        yield f"data: {snapshot.model_dump_json()}\n\n"
+        if snapshot.status.value in TERMINAL_STATUSES:
+            return
+        while True:
+            event = await subscription.next_event(SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {TranscriptionProgressEvent(**event).model_dump_json()}\n\n"
+            if event["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        await subscription.close()
\ No newline at end of file
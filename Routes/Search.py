@@ -0,0 +1,39 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+
+from db.sessions import get_db
+from Schemas.Search import SearchKind, SearchResult
+from services.search import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("/", response_model=List[SearchResult])
+def search_material(
+    response: Response,
+    user_id: int = Query(..., description="Authenticated user identifier"),
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms; all must match"),
+    kind: Optional[List[SearchKind]] = Query(default=None, description="Only return these kinds"),
+    limit: int = Query(default=SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[int] = Query(default=None, ge=0, description="X-Next-Cursor value from the previous page"),
+    db: Session = Depends(get_db),
+):
+    offset = cursor or 0
+    # One extra hit tells whether another page exists.
+    hits = search(
+        db.connection(),
+        user_id=user_id,
+        query=q,
+        kinds=[k.value for k in kind] if kind else None,
+        limit=limit + 1,
+        offset=offset,
+    )
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers["X-Next-Cursor"] = str(offset + limit)
+    return [
+        SearchResult(kind=hit.kind, id=hit.ref_id, title=hit.title, snippet=hit.snippet, score=hit.score)
+        for hit in hits
+    ]
@@ -2,10 +2,13 @@
 
 import os
 import json
-from typing import List, Optional
+import math
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
 
 import httpx
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -18,24 +21,45 @@ from db.models import (
     FlashCard,
     SourceType,
 )
+from services.hf_client import (
+    HF_GENERATE_TIMEOUT_SECONDS,
+    HF_SUMMARIZE_TIMEOUT_SECONDS,
+    HF_URL,
+    get_hf_client,
+    hf_timeout,
+)
+from services.chunked_generation import generate_in_chunks
+from services.circuit_breaker import CircuitOpen, circuit_breaker
+from services.llm_cache import LLM_CACHE_ENABLED, cache_key, llm_cache
+from services.rate_limiter import RateLimited, rate_limiter
+from services.single_flight import single_flight
 
 HF_API_TOKEN = os.getenv("HF_API_TOKEN")
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
-HF_URL = "https://router.huggingface.co/v1/chat/completions"
 MODEL_NAME = "meta-llama/Llama-3.1-8B-Instruct"
+# Quiz and flashcard generation splits long texts into chunks of at most
+# AI_CHUNK_TOKENS estimated tokens, asks each for at most
+# AI_MAX_ITEMS_PER_CHUNK items, and runs AI_MAX_CONCURRENCY chunks at once.
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", "3000"))
+AI_MAX_ITEMS_PER_CHUNK = int(os.getenv("AI_MAX_ITEMS_PER_CHUNK", "10"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+# Answer budget per requested question/card, so the JSON is not cut off.
+AI_TOKENS_PER_ITEM = 100
 
 
 # ---------- Schemas ----------
 
 class SummarizeRequest(BaseModel):
     text: str
+    fresh: bool = False  # skip the response cache and generate anew
 
 
 class QuizRequest(BaseModel):
     text: str
     num_questions: int = 10  # you can change default
+    fresh: bool = False
 
 
 class QuizQuestion(BaseModel):
@@ -48,21 +72,133 @@ class FlashcardAIRequest(BaseModel):
     text: str
     num_cards: int = 20
     title: Optional[str] = None
+    fresh: bool = False
 
 
-# ---------- Summarize Endpoint ----------
+# ---------- Model calls ----------
 
-@router.post("/summarize")
-async def summarize_text(request: SummarizeRequest):
-    if not HF_API_TOKEN:
-        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
+async def _chat_completion(
+    payload: dict, *, read_timeout: float, fresh: bool, parse: Callable[[str], Any] = str
+) -> Any:
+    """
+    Model output for ``payload``, passed through ``parse``. Identical requests
+    are answered from the response cache unless ``fresh``, and concurrent
+    ones share a single upstream call. Output is only cached once ``parse``
+    accepted it, so a malformed answer is not repeated.
+    """
+    key = cache_key(payload)
+    if LLM_CACHE_ENABLED and not fresh:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            return parse(cached)
+
+    content = await single_flight.run(key, partial(_fetch_completion, payload, read_timeout))
+    result = parse(content)
+    if LLM_CACHE_ENABLED:
+        await llm_cache.set(key, content)
+    return result
 
-    headers = {
+
+def _hf_headers() -> dict:
+    return {
         "Authorization": f"Bearer {HF_API_TOKEN}",
         "Content-Type": "application/json",
     }
 
-    payload = {
+
+def _retry_later(status_code: int, error: str, retry_after: float, **extra) -> HTTPException:
+    seconds = max(1, math.ceil(retry_after))
+    return HTTPException(
+        status_code=status_code,
+        detail={"error": error, "retry_after": seconds, **extra},
+        headers={"Retry-After": str(seconds)},
+    )
+
+
+def _is_upstream_failure(outcome: object) -> bool:
+    # Timeouts, connection errors and 5xx count against the circuit breaker;
+    # 4xx (including 429) mean the provider is up.
+    if isinstance(outcome, httpx.Response):
+        return outcome.status_code >= 500
+    return isinstance(outcome, httpx.TransportError)
+
+
+async def _send_upstream(send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """
+    Send one request to HF through the circuit breaker and the rate limiter
+    shared by all workers. An open circuit or a full queue is a 503/429
+    with a retry-after, and so is a 429 from HF itself.
+    """
+    try:
+        circuit_breaker.check()
+        await rate_limiter.acquire()
+        resp = await circuit_breaker.call(send, is_failure=_is_upstream_failure)
+    except CircuitOpen as exc:
+        raise _retry_later(503, "upstream_unavailable", exc.retry_after, circuit=exc.state)
+    except RateLimited as exc:
+        raise _retry_later(429, "rate_limited", exc.retry_after)
+
+    if resp.status_code == 429:
+        try:
+            await resp.aread()
+        finally:
+            await resp.aclose()
+        try:
+            retry_after = float(resp.headers.get("Retry-After", ""))
+        except ValueError:
+            retry_after = 1.0
+        raise _retry_later(429, "upstream_rate_limited", retry_after, message=resp.text)
+    return resp
+
+
+async def _fetch_completion(payload: dict, read_timeout: float) -> str:
+    resp = await _send_upstream(
+        lambda: get_hf_client().post(HF_URL, headers=_hf_headers(), json=payload, timeout=hf_timeout(read_timeout))
+    )
+
+    if resp.status_code != 200:
+        raise HTTPException(
+            status_code=resp.status_code,
+            detail=f"HuggingFace error: {resp.text}",
+        )
+
+    data = resp.json()
+    try:
+        return data["choices"][0]["message"]["content"]
+    except Exception:
+        raise HTTPException(500, "Bad response format from HuggingFace")
+
+
+def _parse_json_items(content: str, *, noun: str, empty_detail: str) -> list:
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError:
+        raise HTTPException(
+            500,
+            detail=f"Model did not return valid JSON. Try again with shorter text or fewer {noun}.",
+        )
+
+    if not isinstance(items, list) or not items:
+        raise HTTPException(500, detail=empty_detail)
+    return items
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Response cache and request coalescing counters for this process."""
+    return {**llm_cache.stats(), "single_flight": single_flight.stats()}
+
+
+@router.get("/upstream/stats")
+def get_upstream_stats():
+    """Rate limiter queueing and circuit breaker state for calls to HF from this process."""
+    return {"rate_limiter": rate_limiter.stats(), "circuit_breaker": circuit_breaker.stats()}
+
+
+# ---------- Summarize Endpoint ----------
+
+def _summary_payload(text: str) -> dict:
+    return {
         "model": MODEL_NAME,
         "messages": [
             {
@@ -71,54 +207,118 @@ async def summarize_text(request: SummarizeRequest):
             },
             {
                 "role": "user",
-                "content": f"Summarize the following text in 5 short bullet points:\n\n{request.text}",
+                "content": f"Summarize the following text in 5 short bullet points:\n\n{text}",
             },
         ],
         "temperature": 0.4,
         "max_tokens": 256,
     }
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(HF_URL, headers=headers, json=payload)
 
+@router.post("/summarize")
+async def summarize_text(request: SummarizeRequest):
+    if not HF_API_TOKEN:
+        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
+
+    payload = _summary_payload(request.text)
+    summary = await _chat_completion(payload, read_timeout=HF_SUMMARIZE_TIMEOUT_SECONDS, fresh=request.fresh)
+
+    return {"summary": summary}
+
+
+@router.post("/summarize/stream")
+async def summarize_text_stream(request: SummarizeRequest):
+    """
+    Server-Sent Events version of /summarize: each ``data`` event carries a
+    ``{"delta": ...}`` chunk of the summary as the model produces it, and a
+    final ``done`` event carries the whole summary. Cached summaries arrive
+    as a single delta. If the client goes away, the upstream request is
+    closed so the model stops generating.
+    """
+    if not HF_API_TOKEN:
+        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
+
+    payload = _summary_payload(request.text)
+    key = cache_key(payload)
+    cached = await llm_cache.get(key) if LLM_CACHE_ENABLED and not request.fresh else None
+    if cached is not None:
+        events = _cached_summary_events(cached)
+    else:
+        # Opened before responding, so upstream errors keep their status code.
+        upstream = await _open_completion_stream({**payload, "stream": True})
+        events = _relay_summary_events(upstream, key)
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _open_completion_stream(payload: dict) -> httpx.Response:
+    client = get_hf_client()
+    upstream_request = client.build_request(
+        "POST", HF_URL, headers=_hf_headers(), json=payload, timeout=hf_timeout(HF_SUMMARIZE_TIMEOUT_SECONDS)
+    )
+    resp = await _send_upstream(partial(client.send, upstream_request, stream=True))
     if resp.status_code != 200:
+        try:
+            await resp.aread()
+        finally:
+            await resp.aclose()
         raise HTTPException(
             status_code=resp.status_code,
             detail=f"HuggingFace error: {resp.text}",
         )
+    return resp
 
-    data = resp.json()
-    try:
-        summary = data["choices"][0]["message"]["content"]
-    except Exception:
-        raise HTTPException(500, "Bad response format from HuggingFace")
 
-    return {"summary": summary}
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 
-# ---------- Quiz Generation + SAVE to DB ----------
+async def _cached_summary_events(summary: str) -> AsyncIterator[str]:
+    yield _sse({"delta": summary})
+    yield _sse({"summary": summary}, event="done")
 
-@router.post("/generate-quiz")
-async def generate_quiz_and_save(
-    request: QuizRequest,
-    user_id: int,
-    db: Session = Depends(get_db),
-):
-    """
-    1. Generate MCQs from text using Llama 3.1.
-    2. Save Exam + ExamQuestions to DB.
-    3. Return exam_id + questions.
-    """
-    if not HF_API_TOKEN:
-        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
 
-    headers = {
-        "Authorization": f"Bearer {HF_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
+async def _relay_summary_events(upstream: httpx.Response, key: str) -> AsyncIterator[str]:
+    parts: List[str] = []
+    try:
+        # OpenAI-compatible stream: "data: {chunk}" lines, then "data: [DONE]".
+        async for line in upstream.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+            except (ValueError, KeyError, IndexError):
+                continue
+            if delta:
+                parts.append(delta)
+                yield _sse({"delta": delta})
+    except httpx.HTTPError as exc:
+        yield _sse({"detail": f"HuggingFace stream failed: {exc}"}, event="error")
+        return
+    finally:
+        # Also reached when the client disconnects and Starlette cancels
+        # this generator: closing the response aborts the upstream request.
+        await upstream.aclose()
+
+    summary = "".join(parts)
+    if LLM_CACHE_ENABLED and summary:
+        await llm_cache.set(key, summary)
+    yield _sse({"summary": summary}, event="done")
+
 
+# ---------- Quiz Generation + SAVE to DB ----------
+
+async def _generate_quiz_chunk(chunk_text: str, count: int, *, fresh: bool) -> list:
     user_prompt = f"""
-Generate {request.num_questions} multiple-choice questions (MCQs) based on the following text.
+Generate {count} multiple-choice questions (MCQs) based on the following text.
 
 Return ONLY a JSON array (no backticks, no markdown, no explanation) where each element has:
 - "question": string
@@ -126,7 +326,7 @@ Return ONLY a JSON array (no backticks, no markdown, no explanation) where each
 - "correct_index": integer 0-3 indicating which option is correct.
 
 Text:
-{request.text}
+{chunk_text}
 """
 
     payload = {
@@ -142,35 +342,42 @@ Text:
             {"role": "user", "content": user_prompt},
         ],
         "temperature": 0.3,
-        "max_tokens": 1024,
+        "max_tokens": max(1024, count * AI_TOKENS_PER_ITEM),
     }
 
-    # ---- 1) Call HF ----
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        resp = await client.post(HF_URL, headers=headers, json=payload)
-
-    if resp.status_code != 200:
-        raise HTTPException(
-            status_code=resp.status_code,
-            detail=f"HuggingFace error: {resp.text}",
-        )
-
-    data = resp.json()
+    return await _chat_completion(
+        payload,
+        read_timeout=HF_GENERATE_TIMEOUT_SECONDS,
+        fresh=fresh,
+        parse=partial(_parse_json_items, noun="questions", empty_detail="No questions generated by the model."),
+    )
 
-    try:
-        raw_content = data["choices"][0]["message"]["content"]
-    except Exception:
-        raise HTTPException(500, "Bad response format from HuggingFace")
 
-    try:
-        items = json.loads(raw_content)
-    except json.JSONDecodeError:
-        raise HTTPException(
-            500,
-            detail="Model did not return valid JSON. Try again with shorter text or fewer questions.",
-        )
+@router.post("/generate-quiz")
+async def generate_quiz_and_save(
+    request: QuizRequest,
+    user_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    1. Generate MCQs from text using Llama 3.1, chunk by chunk for long texts.
+    2. Save Exam + ExamQuestions to DB.
+    3. Return exam_id + questions.
+    """
+    if not HF_API_TOKEN:
+        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
 
-    if not isinstance(items, list) or not items:
+    # ---- 1) Call HF per chunk of the text (or the response cache) ----
+    items = await generate_in_chunks(
+        request.text,
+        request.num_questions,
+        generate_chunk=partial(_generate_quiz_chunk, fresh=request.fresh),
+        item_key=lambda item: item.get("question") if isinstance(item, dict) else None,
+        chunk_tokens=AI_CHUNK_TOKENS,
+        max_items_per_chunk=AI_MAX_ITEMS_PER_CHUNK,
+        max_concurrency=AI_MAX_CONCURRENCY,
+    )
+    if not items:
         raise HTTPException(500, detail="No questions generated by the model.")
 
     # ---- 2) Create Exam ----
@@ -236,34 +443,16 @@ Text:
 
 # ---------- Flashcard Generation + SAVE to DB ----------
 
-@router.post("/generate-flashcards")
-async def generate_flashcards_and_save(
-    request: FlashcardAIRequest,
-    user_id: int,
-    db: Session = Depends(get_db),
-):
-    """
-    1. Generate flashcards from text using Llama 3.1.
-    2. Save FlashCardDeck + FlashCard rows to DB.
-    3. Return deck_id + cards.
-    """
-    if not HF_API_TOKEN:
-        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
-
-    headers = {
-        "Authorization": f"Bearer {HF_API_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
+async def _generate_flashcard_chunk(chunk_text: str, count: int, *, fresh: bool) -> list:
     user_prompt = f"""
-Create {request.num_cards} concise study flashcards from the following text.
+Create {count} concise study flashcards from the following text.
 
 Return ONLY a JSON array (no backticks, no markdown, no explanation) where each element has:
 - "front": short prompt or question (<= 120 characters ideally)
 - "back": clear answer/explanation (<= 240 characters ideally)
 
 Text:
-{request.text}
+{chunk_text}
 """
 
     payload = {
@@ -279,35 +468,42 @@ Text:
             {"role": "user", "content": user_prompt},
         ],
         "temperature": 0.35,
-        "max_tokens": 1024,
+        "max_tokens": max(1024, count * AI_TOKENS_PER_ITEM),
     }
 
-    # ---- 1) Call HF ----
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        resp = await client.post(HF_URL, headers=headers, json=payload)
-
-    if resp.status_code != 200:
-        raise HTTPException(
-            status_code=resp.status_code,
-            detail=f"HuggingFace error: {resp.text}",
-        )
+    return await _chat_completion(
+        payload,
+        read_timeout=HF_GENERATE_TIMEOUT_SECONDS,
+        fresh=fresh,
+        parse=partial(_parse_json_items, noun="cards", empty_detail="No flashcards generated by the model."),
+    )
 
-    data = resp.json()
 
-    try:
-        raw_content = data["choices"][0]["message"]["content"]
-    except Exception:
-        raise HTTPException(500, "Bad response format from HuggingFace")
-
-    try:
-        items = json.loads(raw_content)
-    except json.JSONDecodeError:
-        raise HTTPException(
-            500,
-            detail="Model did not return valid JSON. Try again with shorter text or fewer cards.",
-        )
+@router.post("/generate-flashcards")
+async def generate_flashcards_and_save(
+    request: FlashcardAIRequest,
+    user_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    1. Generate flashcards from text using Llama 3.1, chunk by chunk for long texts.
+    2. Save FlashCardDeck + FlashCard rows to DB.
+    3. Return deck_id + cards.
+    """
+    if not HF_API_TOKEN:
+        raise HTTPException(status_code=500, detail="HF_API_TOKEN not set")
 
-    if not isinstance(items, list) or not items:
+    # ---- 1) Call HF per chunk of the text (or the response cache) ----
+    items = await generate_in_chunks(
+        request.text,
+        request.num_cards,
+        generate_chunk=partial(_generate_flashcard_chunk, fresh=request.fresh),
+        item_key=lambda item: item.get("front") if isinstance(item, dict) else None,
+        chunk_tokens=AI_CHUNK_TOKENS,
+        max_items_per_chunk=AI_MAX_ITEMS_PER_CHUNK,
+        max_concurrency=AI_MAX_CONCURRENCY,
+    )
+    if not items:
         raise HTTPException(500, detail="No flashcards generated by the model.")
 
     # ---- 2) Create FlashcardDeck ----
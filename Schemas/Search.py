@@ -0,0 +1,17 @@
+import enum
+
+from pydantic import BaseModel, Field
+
+
+class SearchKind(str, enum.Enum):
+    transcription = "transcription"
+    note = "note"
+    flashcard = "flashcard"
+
+
+class SearchResult(BaseModel):
+    kind: SearchKind
+    id: str = Field(..., description="Identifier of the transcription, note or flashcard")
+    title: str
+    snippet: str = Field(..., description="Matching excerpt, matched terms wrapped in <b></b>")
+    score: float = Field(..., description="Relevance; higher is better, only comparable within one query")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 import enum
 
@@ -16,6 +16,27 @@ class TranscriptionUploadResponse(BaseModel):
     status: TranscriptionStatus
 
 
+class TranscriptionProgressEvent(BaseModel):
+    id: str
+    status: TranscriptionStatus
+    stage: Optional[str] = Field(
+        default=None, description="Pipeline stage while PROCESSING, e.g. transcribing or summarizing"
+    )
+    progress: Optional[float] = Field(
+        default=None, description="Completed fraction of the current stage, 0-1"
+    )
+    error_message: Optional[str] = None
+
+
+class QueueLaneStats(BaseModel):
+    lane: str
+    pending: int = Field(..., description="Jobs held back by the fair-share scheduler")
+    queued: int = Field(..., description="Jobs handed to the worker queue but not started")
+    dispatched: int
+    avg_wait_seconds: Optional[float] = None
+    p95_wait_seconds: Optional[float] = None
+
+
 class TranscriptionHistoryItem(BaseModel):
     id: str
     course: Optional[str] = None
@@ -27,6 +48,19 @@ class TranscriptionHistoryItem(BaseModel):
     status: TranscriptionStatus
 
 
+class TranscriptWord(BaseModel):
+    word: str
+    start: float = Field(..., description="Seconds from the start of the original recording")
+    end: float
+
+
+class TranscriptSegmentOut(BaseModel):
+    start: float = Field(..., description="Seconds from the start of the original recording")
+    end: float
+    text: str
+    words: List[TranscriptWord] = []
+
+
 class TranscriptionDetail(BaseModel):
     id: str
     title: str
@@ -37,6 +71,13 @@ class TranscriptionDetail(BaseModel):
     duration_seconds: Optional[int] = None
     duration: Optional[str] = None
     word_count: Optional[int] = None
+    audio_size_bytes: Optional[int] = None
+    transcoded_size_bytes: Optional[int] = Field(
+        default=None, description="Size of the mono 16 kHz copy sent for transcription"
+    )
+    trimmed_percent: Optional[float] = Field(
+        default=None, description="Share of the recording dropped as silence before transcription"
+    )
     status: TranscriptionStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
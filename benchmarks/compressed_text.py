@@ -0,0 +1,90 @@
+"""
+Compression ratio and read latency of CompressedText against plain Text.
+
+    python -m benchmarks.compressed_text [--rows 200] [--words 18000]
+
+Builds two SQLite tables with the same synthetic lecture transcripts (a
+two-hour lecture is roughly 18k words), then times single-row reads of the
+text column, the access pattern of the transcription detail endpoint.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from db.types import CompressedText
+
+_VOCABULARY = (
+    "the of and to in is that for it as was with be by on not he this are or his from at which but have an "
+    "they you were her she there been one all we their has would when if so no will can more about our what "
+    "energy entropy system heat temperature process reversible equation pressure volume gas molecules state "
+    "example remember exam question integral derivative function value problem professor lecture chapter "
+    "because therefore however notice basically right okay so um"
+).split()
+
+
+def _lecture(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = rng.randint(6, 24)
+        sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(length))
+        sentences.append(sentence.capitalize() + rng.choice([".", ".", ".", "?"]))
+        words -= length
+    return " ".join(sentences)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def run(rows: int, words: int, reads: int) -> None:
+    rng = random.Random(42)
+    texts = [_lecture(rng, words) for _ in range(rows)]
+    metadata = sa.MetaData()
+    tables = {
+        "plain Text": sa.Table("plain", metadata, sa.Column("id", sa.Integer, primary_key=True), sa.Column("body", sa.Text)),
+        "CompressedText": sa.Table(
+            "compressed", metadata, sa.Column("id", sa.Integer, primary_key=True), sa.Column("body", CompressedText)
+        ),
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"{rows} transcripts of ~{words} words ({sum(len(t) for t in texts) / rows / 1024:.0f} KiB each)")
+        for label, table in tables.items():
+            path = Path(work_dir) / f"{table.name}.db"
+            engine = sa.create_engine(f"sqlite:///{path}")
+            metadata.create_all(engine, tables=[table])
+            with engine.begin() as connection:
+                connection.execute(table.insert(), [{"id": i, "body": text} for i, text in enumerate(texts)])
+            stored = engine.connect().execute(sa.text(f"SELECT sum(length(body)) FROM {table.name}")).scalar()
+
+            latencies = []
+            with engine.connect() as connection:
+                for _ in range(reads):
+                    row_id = rng.randrange(rows)
+                    started = time.perf_counter()
+                    connection.execute(sa.select(table.c.body).where(table.c.id == row_id)).scalar_one()
+                    latencies.append((time.perf_counter() - started) * 1000)
+            engine.dispose()
+            print(
+                f"{label:>15}: stored {stored / 1024 / 1024:7.2f} MiB, db file {path.stat().st_size / 1024 / 1024:7.2f} MiB, "
+                f"read p50 {statistics.median(latencies):.3f} ms, p95 {_percentile(latencies, 0.95):.3f} ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--words", type=int, default=18000)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+    run(args.rows, args.words, args.reads)
+
+
+if __name__ == "__main__":
+    main()
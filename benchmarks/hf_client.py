@@ -0,0 +1,177 @@
+"""
+Latency of Hugging Face calls with a client per request against the shared
+pooled client (services/hf_client.py).
+
+    python -m benchmarks.hf_client [--requests 200] [--concurrency 8] [--server-ms 20] [--no-tls]
+
+Runs a fake chat-completions server on localhost (TLS with a throwaway
+self-signed certificate unless --no-tls; needs the cryptography package)
+that answers after --server-ms, then sends the same summarize payload both
+ways and reports p50/p95 per request. The fake server speaks HTTP/1.1
+only, so this measures connection reuse; HTTP/2 multiplexing applies on
+top against the real router.
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import socket
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+import uvicorn
+
+from services.hf_client import create_hf_client, hf_timeout
+
+_COMPLETION = (
+    b'{"choices":[{"message":{"role":"assistant","content":"- Entropy rises\\n- Energy is conserved"}}]}'
+)
+_PAYLOAD = {
+    "model": "meta-llama/Llama-3.1-8B-Instruct",
+    "messages": [{"role": "user", "content": "Summarize the following text in 5 short bullet points:\n\n" + "x " * 500}],
+    "max_tokens": 256,
+}
+
+
+def _fake_router(server_seconds: float):
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        while (await receive()).get("more_body"):
+            pass
+        await asyncio.sleep(server_seconds)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(_COMPLETION)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": _COMPLETION})
+
+    return app
+
+
+def _self_signed_certificate(directory: Path):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    return cert_path, key_path
+
+
+def start_server(app, cert: Optional[Path], key: Optional[Path]):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(
+        app,
+        log_level="warning",
+        ssl_certfile=str(cert) if cert else None,
+        ssl_keyfile=str(key) if key else None,
+        timeout_keep_alive=60,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, sock.getsockname()[1]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+async def _measure(url: str, verify, requests: int, concurrency: int, shared: bool) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    client = create_hf_client(verify=verify) if shared else None
+
+    async def one_call():
+        async with semaphore:
+            started = time.perf_counter()
+            if client is not None:
+                response = await client.post(url, json=_PAYLOAD, timeout=hf_timeout(60))
+            else:
+                # The previous pattern in Routes/ai.py.
+                async with httpx.AsyncClient(timeout=60.0, verify=verify) as own_client:
+                    response = await own_client.post(url, json=_PAYLOAD)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(one_call() for _ in range(requests)))
+    finally:
+        if client is not None:
+            await client.aclose()
+    return latencies
+
+
+def run(requests: int, concurrency: int, server_ms: float, tls: bool) -> None:
+    with tempfile.TemporaryDirectory() as work_dir:
+        cert = key = None
+        verify = True
+        if tls:
+            cert, key = _self_signed_certificate(Path(work_dir))
+            verify = ssl.create_default_context(cafile=str(cert))
+        server, thread, port = start_server(_fake_router(server_ms / 1000), cert, key)
+        url = f"{'https' if tls else 'http'}://127.0.0.1:{port}/v1/chat/completions"
+        print(
+            f"{requests} requests, {concurrency} concurrent, fake router answering after {server_ms:.0f} ms "
+            f"({'TLS' if tls else 'plain HTTP'})"
+        )
+        try:
+            for label, shared in (("client per request", False), ("shared pooled client", True)):
+                latencies = asyncio.run(_measure(url, verify, requests, concurrency, shared))
+                print(
+                    f"{label:>22}: p50 {percentile(latencies, 0.5) * 1000:6.1f} ms  "
+                    f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms  "
+                    f"mean {statistics.mean(latencies) * 1000:6.1f} ms"
+                )
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-ms", type=float, default=20.0)
+    parser.add_argument("--no-tls", action="store_true")
+    args = parser.parse_args()
+    run(args.requests, args.concurrency, args.server_ms, tls=not args.no_tls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Time to first byte and total latency of /ai/summarize against
+/ai/summarize/stream.
+
+    python -m benchmarks.summarize_stream [--requests 20] [--tokens 120] [--first-token-ms 300] [--token-ms 15]
+
+Runs a fake streaming chat-completions server that produces --tokens
+tokens, the first after --first-token-ms and the rest --token-ms apart (or
+the whole answer at once for non-streaming requests), and the /ai routes
+on a second local server. Every request is sent with "fresh": true so the
+response cache does not answer it.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Tuple
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.hf_client import percentile, start_server
+from Routes import ai
+
+
+def _fake_streaming_router(tokens: int, first_token_seconds: float, token_seconds: float):
+    words = [f" word{i}" for i in range(tokens)]
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        streaming = json.loads(body).get("stream")
+
+        if not streaming:
+            await asyncio.sleep(first_token_seconds + token_seconds * (tokens - 1))
+            answer = json.dumps({"choices": [{"message": {"content": "".join(words)}}]}).encode()
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": answer})
+            return
+
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        for i, word in enumerate(words):
+            await asyncio.sleep(first_token_seconds if i == 0 else token_seconds)
+            chunk = json.dumps({"choices": [{"index": 0, "delta": {"content": word}}]})
+            await send({"type": "http.response.body", "body": f"data: {chunk}\n\n".encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    return app
+
+
+def _measure(client: httpx.Client, path: str, requests: int) -> Tuple[List[float], List[float]]:
+    first_bytes, totals = [], []
+    for i in range(requests):
+        started = time.perf_counter()
+        with client.stream("POST", path, json={"text": f"Lecture notes {i}", "fresh": True}) as response:
+            response.raise_for_status()
+            first = None
+            for _ in response.iter_bytes():
+                if first is None:
+                    first = time.perf_counter() - started
+        totals.append(time.perf_counter() - started)
+        first_bytes.append(first)
+    return first_bytes, totals
+
+
+def run(requests: int, tokens: int, first_token_ms: float, token_ms: float) -> None:
+    upstream, upstream_thread, upstream_port = start_server(
+        _fake_streaming_router(tokens, first_token_ms / 1000, token_ms / 1000), None, None
+    )
+    ai.HF_URL = f"http://127.0.0.1:{upstream_port}/v1/chat/completions"
+    ai.HF_API_TOKEN = ai.HF_API_TOKEN or "benchmark"
+    app = FastAPI()
+    app.include_router(ai.router)
+    api, api_thread, api_port = start_server(app, None, None)
+
+    print(
+        f"{requests} requests per endpoint, {tokens} tokens: first after {first_token_ms:.0f} ms, "
+        f"then every {token_ms:.0f} ms"
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{api_port}", timeout=60) as client:
+            for path in ("/ai/summarize", "/ai/summarize/stream"):
+                first_bytes, totals = _measure(client, path, requests)
+                print(
+                    f"{path:>22}: TTFB p50 {percentile(first_bytes, 0.5) * 1000:7.1f} ms  "
+                    f"p95 {percentile(first_bytes, 0.95) * 1000:7.1f} ms  |  "
+                    f"total p50 {percentile(totals, 0.5) * 1000:7.1f} ms  "
+                    f"p95 {percentile(totals, 0.95) * 1000:7.1f} ms"
+                )
+    finally:
+        for server, thread in ((api, api_thread), (upstream, upstream_thread)):
+            server.should_exit = True
+            thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    args = parser.parse_args()
+    run(args.requests, args.tokens, args.first_token_ms, args.token_ms)
+
+
+if __name__ == "__main__":
+    main()
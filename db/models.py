@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text, JSON, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, func, Text, JSON, Float, Index, LargeBinary
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import Enum as SAEnum
 import enum
 from db.sessions import Base
+from db.types import CompressedText
 from uuid import uuid4
 
 class SourceType(str, enum.Enum):
@@ -22,6 +23,12 @@ class TranscriptionStatus(str, enum.Enum):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
 
+class LocalJobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    FINISHED = "FINISHED"
+    FAILED = "FAILED"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -47,6 +54,8 @@ class Note(Base):
 
     owner = relationship("User", back_populates="notes")
 
+    __table_args__ = (Index("ix_notes_user_id_created_at", "user_id", "created_at"),)
+
 
 class FlashCardDeck(Base):
     __tablename__ = "flashcard_deck"
@@ -63,7 +72,7 @@ class FlashCardDeck(Base):
 class FlashCard(Base):
     __tablename__ = "flashcard"
     id = Column(Integer, primary_key=True, index=True)
-    set_id = Column(Integer, ForeignKey("flashcard_deck.id"))
+    set_id = Column(Integer, ForeignKey("flashcard_deck.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     prompt = Column(Text, nullable=False)
@@ -87,13 +96,15 @@ class Exam(Base):
     questions = relationship("ExamQuestion", back_populates="exam", cascade="all, delete")
     owner = relationship("User", back_populates="quizes")  # FIX: counterpart for User.quizes
 
+    __table_args__ = (Index("ix_exam_user_id_created_at", "user_id", "created_at"),)
+
 
 class ExamQuestion(Base):
     __tablename__ = "examQuestion"
     id = Column(Integer, primary_key=True, index=True)
     exam_id = Column(Integer, ForeignKey("exam.id"), index=True, nullable=False)
     question = Column(Text, nullable=False)
-    options = Column(JSONB, nullable=False) 
+    options = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
     answer_idx = Column(Integer, nullable=False)
     points = Column(Integer, default=1)
     order = Column(Integer, nullable=True)
@@ -111,17 +122,87 @@ class Transcription(Base):
     course_name = Column(String(255), nullable=True)
     audio_url = Column(String(512), nullable=False)
     audio_path = Column(String(1024), nullable=False)
-    transcript_text = Column(Text, nullable=True)
-    summary_text = Column(Text, nullable=True)
+    # Storage backend key (services/storage.py). Rows from before storage
+    # keys only have audio_path, a file on local disk.
+    audio_key = Column(String(512), nullable=True)
+    # NULL while the recording is in hot storage; "cold" once the retention
+    # job archived it, "purged" once it deleted it (services/retention.py).
+    audio_tier = Column(String(16), nullable=True)
+    # Last time the recording was played; retention ages from created_at
+    # until then.
+    audio_accessed_at = Column(DateTime(timezone=True), nullable=True)
+    audio_sha256 = Column(String(64), nullable=True, index=True)
+    audio_size_bytes = Column(BigInteger, nullable=True)
+    transcoded_size_bytes = Column(BigInteger, nullable=True)
+    trimmed_percent = Column(Float, nullable=True)
+    speech_offset_map = Column(JSON, nullable=True)
+    # Compressed, and only loaded (together) when one of them is accessed.
+    transcript_text = deferred(Column(CompressedText, nullable=True), group="text")
+    summary_text = deferred(Column(CompressedText, nullable=True), group="text")
     duration_seconds = Column(Integer, nullable=True)
     word_count = Column(Integer, nullable=True)
     status = Column(
         SAEnum(TranscriptionStatus, name="transcription_status", native_enum=True),
         nullable=False,
         server_default=TranscriptionStatus.PENDING.value,
+        index=True,
     )
     error_message = Column(Text, nullable=True)
+    # Worker lease: renewed by a heartbeat while PROCESSING. The reaper
+    # requeues rows whose lease expired (worker died) until attempts run out.
+    attempts = Column(Integer, nullable=False, server_default="0", default=0)
+    lease_owner = Column(String(36), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     owner = relationship("User", back_populates="transcriptions")
+
+    __table_args__ = (
+        # History pages seek on (created_at, id) within one user.
+        Index("ix_transcriptions_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_transcriptions_status_lease_expires_at", "status", "lease_expires_at"),
+        Index("ix_transcriptions_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class TranscriptSegment(Base):
+    """
+    One Whisper segment of a transcript. Times are milliseconds in the
+    original recording, after undoing silence trimming.
+    """
+    __tablename__ = "transcript_segments"
+    id = Column(Integer, primary_key=True)
+    transcription_id = Column(String(36), ForeignKey("transcriptions.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    start_ms = Column(Integer, nullable=False)
+    end_ms = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    # Word strings as a JSON array; word_times holds their (start, end)
+    # milliseconds as packed uint32 pairs in the same order (services/timeline.py).
+    words = Column(JSON, nullable=True)
+    word_times = Column(LargeBinary, nullable=True)
+
+    __table_args__ = (
+        Index("ix_transcript_segments_transcription_id_start_ms", "transcription_id", "start_ms"),
+    )
+
+
+class LocalJob(Base):
+    """Job table for the in-process executor used when Redis is unavailable."""
+    __tablename__ = "local_jobs"
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    queue_name = Column(String(64), nullable=False, server_default="transcriptions")
+    func_path = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(
+        SAEnum(LocalJobStatus, name="local_job_status", native_enum=True),
+        nullable=False,
+        index=True,
+        server_default=LocalJobStatus.QUEUED.value,
+    )
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
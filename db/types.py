@@ -0,0 +1,71 @@
+import zlib
+from typing import Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+# First byte of every stored value says how the rest is encoded, so the
+# codec can change later without rewriting old rows.
+RAW_UTF8 = 0x00
+ZLIB_UTF8 = 0x01
+# Shorter values are stored raw: zlib's header and checksum would eat the gain.
+COMPRESS_MIN_BYTES = 256
+ZLIB_LEVEL = 6
+
+
+def encode_text(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    data = value.encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, ZLIB_LEVEL)
+        if len(packed) < len(data):
+            return bytes([ZLIB_UTF8]) + packed
+    return bytes([RAW_UTF8]) + data
+
+
+def decode_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Written before the column was compressed; SQLite keeps TEXT values
+        # as they were until the backfill rewrites them.
+        return value
+    value = bytes(value)
+    if not value:
+        return ""
+    version, payload = value[0], value[1:]
+    if version == ZLIB_UTF8:
+        return zlib.decompress(payload).decode("utf-8")
+    if version == RAW_UTF8:
+        return payload.decode("utf-8")
+    raise ValueError(f"Unknown compressed text version {version}")
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) > 0 and value[0] == ZLIB_UTF8
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored as a version byte plus zlib-compressed UTF-8. Python code
+    reads and writes plain ``str``; map the column with ``deferred`` so the
+    blob is only fetched and inflated when the attribute is used.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            # MySQL's plain BLOB stops at 64 KB.
+            from sqlalchemy.dialects.mysql import LONGBLOB
+
+            return dialect.type_descriptor(LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        return encode_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value)
@@ -1,15 +1,13 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
-
-# Ensure media directories exist before mounting static files. Some PaaS
-# environments (like Render) don't persist empty directories from the repo,
-# so creating them here prevents a startup error when FastAPI mounts /media.
-media_root = Path("media")
-media_root.mkdir(parents=True, exist_ok=True)
-(media_root / "transcriptions").mkdir(parents=True, exist_ok=True)
+import asyncio
 from contextlib import asynccontextmanager
 from db.sessions import engine, Base
+from services.hf_client import close_hf_client, open_hf_client
+from services.progress import close_async_redis
+from services.queue import drain_local_jobs, recover_local_jobs
+from services.scheduler import recover_held_back_jobs
+from services.search import create_search_index
+from workers.reaper import run_reaper
 
 from Routes.Home import router as home_router
 from Routes.SignUp import router as signup_router
@@ -24,16 +22,33 @@ from Routes.History import router as history_router
 from Routes.ai import router as ai_router
 from Routes.Exam import router as exam_router
 from Routes.password import router as password_router
+from Routes.Search import router as search_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_search_index(connection)
     print("Database tables created successfully")
+    recovered = recover_local_jobs()
+    if recovered:
+        print(f"Resumed {recovered} queued local jobs")
+    resubmitted = recover_held_back_jobs()
+    if resubmitted:
+        print(f"Re-submitted {resubmitted} transcriptions held back by the scheduler")
+    reaper = asyncio.create_task(run_reaper())
+    open_hf_client()
     yield
     print("Application is shutting down")
+    reaper.cancel()
+    await close_hf_client()
+    await close_async_redis()
+    if not drain_local_jobs():
+        print("Some local jobs were still running at shutdown; they will resume on next start")
 
 app = FastAPI(lifespan=lifespan)
-app.mount("/media", StaticFiles(directory="media"), name="media")
+# Media is not mounted publicly: audio is served per transcription, after
+# an ownership check, by GET /api/v1/transcriptions/{id}/audio.
 app.include_router(ai_router)
 app.include_router(home_router)
 app.include_router(signup_router)
@@ -47,3 +62,4 @@ app.include_router(lecture_router)
 app.include_router(history_router)
 app.include_router(exam_router)
 app.include_router(password_router)
+app.include_router(search_router)
@@ -0,0 +1,43 @@
+"""
+Idempotent schema helpers for the migrations.
+
+The app still runs ``Base.metadata.create_all`` at startup, so a fresh
+database already has every table in its current shape, while an older one
+only has what create_all built back then. Each migration therefore only
+adds what is missing, and leaves tables that do not exist yet to
+create_all.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    return _inspector().has_table(table)
+
+
+def add_column_if_missing(table: str, column: sa.Column) -> None:
+    if not has_table(table):
+        return
+    if column.name not in {c["name"] for c in _inspector().get_columns(table)}:
+        op.add_column(table, column)
+
+
+def drop_column_if_present(table: str, column: str) -> None:
+    if has_table(table) and column in {c["name"] for c in _inspector().get_columns(table)}:
+        op.drop_column(table, column)
+
+
+def create_index_if_missing(name: str, table: str, columns, **kwargs) -> None:
+    if not has_table(table):
+        return
+    if name not in {index["name"] for index in _inspector().get_indexes(table)}:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def drop_index_if_present(name: str, table: str) -> None:
+    if has_table(table) and name in {index["name"] for index in _inspector().get_indexes(table)}:
+        op.drop_index(name, table_name=table)
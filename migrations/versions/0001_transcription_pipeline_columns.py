@@ -0,0 +1,77 @@
+"""transcription pipeline columns
+
+First revision: catches existing databases up with the columns the
+transcription pipeline added to existing tables before migrations were
+set up, when they were only created on fresh databases. Later schema
+changes each ship their own revision.
+
+- audio_sha256: content-hash deduplication of uploads
+- audio_size_bytes, transcoded_size_bytes: mono 16 kHz transcoding
+- trimmed_percent, speech_offset_map: VAD silence trimming
+- attempts, lease_owner, lease_expires_at, next_attempt_at: worker leases
+  and the reaper's retry backoff
+- local_jobs.queue_name: per-lane counts on the local executor
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.helpers import (
+    add_column_if_missing,
+    create_index_if_missing,
+    drop_column_if_present,
+    drop_index_if_present,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TRANSCRIPTION_COLUMNS = [
+    # Deduplication
+    lambda: sa.Column("audio_sha256", sa.String(64), nullable=True),
+    # Transcoding
+    lambda: sa.Column("audio_size_bytes", sa.BigInteger(), nullable=True),
+    lambda: sa.Column("transcoded_size_bytes", sa.BigInteger(), nullable=True),
+    # VAD trimming
+    lambda: sa.Column("trimmed_percent", sa.Float(), nullable=True),
+    lambda: sa.Column("speech_offset_map", sa.JSON(), nullable=True),
+    # Leases and retries
+    lambda: sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    lambda: sa.Column("lease_owner", sa.String(36), nullable=True),
+    lambda: sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+    lambda: sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+]
+
+_TRANSCRIPTION_INDEXES = [
+    ("ix_transcriptions_audio_sha256", ["audio_sha256"]),
+    ("ix_transcriptions_status_lease_expires_at", ["status", "lease_expires_at"]),
+    ("ix_transcriptions_status_next_attempt_at", ["status", "next_attempt_at"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in _TRANSCRIPTION_COLUMNS:
+        add_column_if_missing("transcriptions", column())
+    for name, columns in _TRANSCRIPTION_INDEXES:
+        create_index_if_missing(name, "transcriptions", columns)
+    add_column_if_missing(
+        "local_jobs", sa.Column("queue_name", sa.String(64), nullable=False, server_default="transcriptions")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present("local_jobs", "queue_name")
+    for name, _ in reversed(_TRANSCRIPTION_INDEXES):
+        drop_index_if_present(name, "transcriptions")
+    for column in reversed(_TRANSCRIPTION_COLUMNS):
+        drop_column_if_present("transcriptions", column().name)
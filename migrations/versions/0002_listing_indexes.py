@@ -0,0 +1,45 @@
+"""per-user listing indexes
+
+Composite (user_id, created_at) indexes for the newest-first listings
+(exam history, lectures, transcription history), plus flashcard.set_id and
+transcriptions.status.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.helpers import create_index_if_missing, drop_index_if_present
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEXES = [
+    ("ix_exam_user_id_created_at", "exam", ["user_id", "created_at"]),
+    ("ix_notes_user_id_created_at", "notes", ["user_id", "created_at"]),
+    ("ix_transcriptions_user_id_created_at", "transcriptions", ["user_id", "created_at", "id"]),
+    ("ix_transcriptions_status", "transcriptions", ["status"]),
+    ("ix_flashcard_set_id", "flashcard", ["set_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps Postgres tables writable while the indexes build;
+    # it cannot run inside a transaction. Other dialects ignore the flag.
+    with op.get_context().autocommit_block():
+        for name, table, columns in _INDEXES:
+            create_index_if_missing(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(_INDEXES):
+        drop_index_if_present(name, table)
@@ -0,0 +1,116 @@
+"""compressed transcript and summary text
+
+transcript_text and summary_text become binary columns holding a version
+byte plus (optionally zlib-compressed) UTF-8, see db/types.py. Existing
+values are converted to the uncompressed version in place; run
+``python -m workers.compress_text`` afterwards to compress them.
+
+SQLite keeps its TEXT declaration: old values stay readable as text and
+new ones are stored as blobs.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from db.types import RAW_UTF8, decode_text, is_compressed
+from migrations.helpers import has_table
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = ("transcript_text", "summary_text")
+_DOWNGRADE_BATCH_SIZE = 500
+
+
+def _is_binary(column: str) -> bool:
+    for info in sa.inspect(op.get_bind()).get_columns("transcriptions"):
+        if info["name"] == column:
+            return isinstance(info["type"], sa.LargeBinary)
+    return False
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite" or not has_table("transcriptions"):
+        return
+    for column in _COLUMNS:
+        if _is_binary(column):
+            continue
+        if dialect == "postgresql":
+            op.alter_column(
+                "transcriptions",
+                column,
+                existing_type=sa.Text(),
+                type_=sa.LargeBinary(),
+                postgresql_using=f"decode('00', 'hex') || convert_to({column}, 'UTF8')",
+            )
+        elif dialect == "mysql":
+            from sqlalchemy.dialects.mysql import LONGBLOB
+
+            op.alter_column("transcriptions", column, existing_type=sa.Text(), type_=LONGBLOB())
+            op.execute(f"UPDATE transcriptions SET {column} = CONCAT(X'{RAW_UTF8:02x}', {column}) WHERE {column} IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not has_table("transcriptions"):
+        return
+    bind = op.get_bind()
+    # Compressed values can only be inflated in Python. Rewrite them batch by
+    # batch while the columns are still binary, then let the database strip
+    # the version byte as it converts the column back to text.
+    to_text = bind.dialect.name == "sqlite"
+    _inflate_in_batches(bind, to_text=to_text)
+    if to_text:
+        return
+    for column in _COLUMNS:
+        if not _is_binary(column):
+            continue
+        if bind.dialect.name == "postgresql":
+            op.alter_column(
+                "transcriptions",
+                column,
+                type_=sa.Text(),
+                postgresql_using=f"convert_from(substring({column} from 2), 'UTF8')",
+            )
+        elif bind.dialect.name == "mysql":
+            op.alter_column("transcriptions", column, type_=sa.Text())
+            op.execute(f"UPDATE transcriptions SET {column} = SUBSTRING({column}, 2) WHERE {column} IS NOT NULL")
+
+
+def _inflate_in_batches(bind, *, to_text: bool) -> None:
+    table = sa.table("transcriptions", sa.column("id"), *(sa.column(c) for c in _COLUMNS))
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(_DOWNGRADE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            values = {}
+            for column in _COLUMNS:
+                stored = getattr(row, column)
+                if stored is None or isinstance(stored, str):
+                    continue
+                if not to_text and not is_compressed(stored):
+                    # Already version byte plus plain UTF-8.
+                    continue
+                text = decode_text(stored)
+                if to_text:
+                    values[column] = text
+                else:
+                    values[column] = sa.literal(bytes([RAW_UTF8]) + text.encode("utf-8"), sa.LargeBinary)
+            if values:
+                bind.execute(sa.update(table).where(table.c.id == row.id).values(**values))
+        last_id = rows[-1].id
@@ -0,0 +1,55 @@
+"""transcript segments
+
+Timed Whisper segments per transcription, for range queries and
+click-to-seek.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_table
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if has_table("transcript_segments") or not has_table("transcriptions"):
+        return
+    op.create_table(
+        "transcript_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "transcription_id",
+            sa.String(36),
+            sa.ForeignKey("transcriptions.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("start_ms", sa.Integer(), nullable=False),
+        sa.Column("end_ms", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("words", sa.JSON(), nullable=True),
+        sa.Column("word_times", sa.LargeBinary(), nullable=True),
+    )
+    op.create_index(
+        "ix_transcript_segments_transcription_id_start_ms",
+        "transcript_segments",
+        ["transcription_id", "start_ms"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if has_table("transcript_segments"):
+        op.drop_table("transcript_segments")
@@ -0,0 +1,36 @@
+"""search index
+
+search_documents plus its inverted index: FTS5 on SQLite, a GIN-indexed
+tsvector on Postgres (services/search.py). Run
+``python -m workers.reindex_search`` afterwards to index existing rows.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.helpers import has_table
+from services.search import create_search_index, drop_search_index
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get the index at startup along with their tables.
+    if not has_table("transcriptions"):
+        return
+    create_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_search_index(op.get_bind())
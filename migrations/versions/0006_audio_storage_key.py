@@ -0,0 +1,32 @@
+"""audio storage key
+
+transcriptions.audio_key locates the recording in the storage backend
+(local disk or S3). Existing rows keep only audio_path and are read from
+local disk as before.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.helpers import add_column_if_missing, drop_column_if_present
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing("transcriptions", sa.Column("audio_key", sa.String(512), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present("transcriptions", "audio_key")
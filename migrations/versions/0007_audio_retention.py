@@ -0,0 +1,37 @@
+"""audio retention
+
+transcriptions.audio_tier records whether a recording is in hot storage
+(NULL), archived to the cold tier or purged; audio_accessed_at is when it
+was last played. Both are maintained by workers/archive_audio.py and the
+audio endpoint.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.helpers import add_column_if_missing, drop_column_if_present
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    add_column_if_missing("transcriptions", sa.Column("audio_tier", sa.String(16), nullable=True))
+    add_column_if_missing(
+        "transcriptions", sa.Column("audio_accessed_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_column_if_present("transcriptions", "audio_accessed_at")
+    drop_column_if_present("transcriptions", "audio_tier")
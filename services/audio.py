@@ -0,0 +1,272 @@
+import logging
+import os
+import struct
+import subprocess
+from pathlib import Path
+from typing import BinaryIO, Optional
+from uuid import uuid4
+
+from services.storage import sniff_audio_format
+
+logger = logging.getLogger(__name__)
+
+# kbps, indexed by [version is MPEG-1][bitrate index] for Layer III.
+_MP3_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0),
+}
+# Hz, indexed by version bits then sample-rate index.
+_MP3_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000),  # MPEG-2.5
+}
+# How far past the ID3 tag to look for the first frame sync.
+_MP3_SYNC_SCAN_BYTES = 64 * 1024
+
+# Speech-grade targets for transcription: cached file suffix, ffmpeg muxer
+# and codec arguments. Mono 16 kHz is what Whisper resamples to anyway.
+NORMALIZED_SAMPLE_RATE = 16000
+_NORMALIZE_CODECS = {
+    "opus": (".16k.ogg", "ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"]),
+    "flac": (".16k.flac", "flac", ["-c:a", "flac", "-compression_level", "8"]),
+}
+
+
+def probe_duration_seconds(path: Path, detected_format: Optional[str] = None) -> Optional[float]:
+    """
+    Return the duration of an audio file by parsing its container header.
+
+    WAV, MP3 and M4A/MP4 are handled in-process and only read the few bytes
+    they need; anything else falls back to ffprobe.
+    """
+    audio_format = detected_format
+    try:
+        with path.open("rb") as audio_file:
+            if audio_format is None:
+                audio_format = sniff_audio_format(audio_file.read(16))
+            parser = _PARSERS.get(audio_format)
+            if parser is not None:
+                audio_file.seek(0)
+                duration = parser(audio_file, path.stat().st_size)
+                if duration is not None:
+                    return duration
+    except (OSError, struct.error, ValueError) as exc:
+        logger.warning("Could not parse %s header of %s: %s", audio_format, path, exc)
+
+    return _ffprobe_duration_seconds(path)
+
+
+def normalized_path(source: Path, codec: str) -> Path:
+    suffix = _NORMALIZE_CODECS[codec][0]
+    return source.with_name(source.stem + suffix)
+
+
+def normalize_for_transcription(source: Path, codec: str) -> Path:
+    """
+    Transcode ``source`` to mono 16 kHz ``codec`` (opus or flac) with ffmpeg.
+
+    The result is cached next to the original, so retries and duplicate
+    uploads of the same content reuse it.
+    """
+    _, muxer, codec_args = _NORMALIZE_CODECS[codec]
+    destination = normalized_path(source, codec)
+    if destination.exists() and destination.stat().st_size > 0:
+        return destination
+
+    partial = destination.with_name(f".{destination.name}.{uuid4().hex}.part")
+    try:
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                "-y",
+                "-i",
+                str(source),
+                "-vn",
+                "-ac",
+                "1",
+                "-ar",
+                str(NORMALIZED_SAMPLE_RATE),
+                *codec_args,
+                "-f",
+                muxer,
+                str(partial),
+            ],
+            capture_output=True,
+            check=True,
+        )
+        os.replace(partial, destination)
+    finally:
+        partial.unlink(missing_ok=True)
+    return destination
+
+
+def _wav_duration(audio_file: BinaryIO, file_size: int) -> Optional[float]:
+    header = audio_file.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    byte_rate = None
+    while True:
+        chunk_header = audio_file.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt = audio_file.read(min(chunk_size, 16))
+            if len(fmt) < 12:
+                return None
+            byte_rate = struct.unpack_from("<I", fmt, 8)[0]
+            audio_file.seek(chunk_size - len(fmt) + (chunk_size & 1), 1)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_start = audio_file.tell()
+            # Streaming writers leave the size as 0 or 0xFFFFFFFF.
+            if chunk_size in (0, 0xFFFFFFFF) or data_start + chunk_size > file_size:
+                chunk_size = file_size - data_start
+            return chunk_size / byte_rate
+        else:
+            audio_file.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def _mp3_duration(audio_file: BinaryIO, file_size: int) -> Optional[float]:
+    audio_start = 0
+    tag = audio_file.read(10)
+    if tag[:3] == b"ID3" and len(tag) == 10:
+        size = (tag[6] << 21) | (tag[7] << 14) | (tag[8] << 7) | tag[9]
+        audio_start = 10 + size + (10 if tag[5] & 0x10 else 0)
+
+    audio_file.seek(audio_start)
+    window = audio_file.read(_MP3_SYNC_SCAN_BYTES)
+    offset = _find_mp3_frame(window)
+    if offset is None:
+        return None
+    audio_start += offset
+    frame = window[offset : offset + 200]
+
+    version_bits = (frame[1] >> 3) & 0b11
+    is_mpeg1 = version_bits == 0b11
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][(frame[2] >> 2) & 0b11]
+    bitrate_kbps = _MP3_BITRATES[is_mpeg1][frame[2] >> 4]
+    mono = (frame[3] >> 6) == 0b11
+    samples_per_frame = 1152 if is_mpeg1 else 576
+
+    # Xing/Info (LAME) header sits right after the side information.
+    side_info = (17 if mono else 32) if is_mpeg1 else (9 if mono else 17)
+    xing = frame[4 + side_info : 4 + side_info + 12]
+    if xing[:4] in (b"Xing", b"Info") and len(xing) >= 12:
+        flags = struct.unpack(">I", xing[4:8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+            return frames * samples_per_frame / sample_rate
+
+    # Fraunhofer VBRI header is always 32 bytes after the frame header.
+    vbri = frame[36:54]
+    if vbri[:4] == b"VBRI" and len(vbri) >= 18:
+        frames = struct.unpack(">I", vbri[14:18])[0]
+        return frames * samples_per_frame / sample_rate
+
+    if not bitrate_kbps:
+        return None
+    audio_bytes = file_size - audio_start
+    if file_size - audio_start >= 128:
+        audio_file.seek(-128, 2)
+        if audio_file.read(3) == b"TAG":
+            audio_bytes -= 128
+    return audio_bytes * 8 / (bitrate_kbps * 1000)
+
+
+def _find_mp3_frame(data: bytes) -> Optional[int]:
+    index = data.find(b"\xff")
+    while 0 <= index < len(data) - 3:
+        b1, b2 = data[index + 1], data[index + 2]
+        if (
+            b1 & 0xE0 == 0xE0
+            and (b1 >> 3) & 0b11 != 0b01  # reserved version
+            and (b1 >> 1) & 0b11 == 0b01  # Layer III
+            and b2 >> 4 not in (0, 0xF)
+            and (b2 >> 2) & 0b11 != 0b11
+        ):
+            return index
+        index = data.find(b"\xff", index + 1)
+    return None
+
+
+def _mp4_duration(audio_file: BinaryIO, file_size: int) -> Optional[float]:
+    moov = _find_atom(audio_file, b"moov", 0, file_size)
+    if moov is None:
+        return None
+    mvhd = _find_atom(audio_file, b"mvhd", *moov)
+    if mvhd is None:
+        return None
+
+    audio_file.seek(mvhd[0])
+    version = audio_file.read(4)[0]
+    if version == 1:
+        audio_file.seek(16, 1)
+        timescale, duration = struct.unpack(">IQ", audio_file.read(12))
+    else:
+        audio_file.seek(8, 1)
+        timescale, duration = struct.unpack(">II", audio_file.read(8))
+    if not timescale:
+        return None
+    return duration / timescale
+
+
+def _find_atom(audio_file: BinaryIO, name: bytes, start: int, end: int):
+    """
+    Return the (payload_start, payload_end) of the first ``name`` atom
+    between ``start`` and ``end``, skipping over other atoms without reading
+    their payloads.
+    """
+    position = start
+    while position + 8 <= end:
+        audio_file.seek(position)
+        size, atom_type = struct.unpack(">I4s", audio_file.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", audio_file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return None
+        if atom_type == name:
+            return position + header_size, position + size
+        position += size
+    return None
+
+
+_PARSERS = {
+    "wav": _wav_duration,
+    "mp3": _mp3_duration,
+    "m4a": _mp4_duration,
+}
+
+
+def _ffprobe_duration_seconds(path: Path) -> Optional[float]:
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "default=noprint_wrappers=1:nokey=1",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return float(result.stdout.strip())
+    except FileNotFoundError:
+        logger.warning("ffprobe is not installed; duration of %s is unknown", path)
+    except (subprocess.CalledProcessError, ValueError) as exc:
+        logger.warning("ffprobe could not read the duration of %s: %s", path, exc)
+    return None
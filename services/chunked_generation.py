@@ -0,0 +1,84 @@
+"""
+Quiz and flashcard generation over texts longer than one prompt.
+
+A long transcript is split into token-budgeted chunks that are generated
+concurrently with a share of the requested items each, then merged.
+"""
+import asyncio
+import logging
+import math
+import re
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from services.chunking import allocate_quota, estimate_tokens, split_by_token_budget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_NON_WORDS = re.compile(r"\W+")
+
+
+async def generate_in_chunks(
+    text: str,
+    total: int,
+    *,
+    generate_chunk: Callable[[str, int], Awaitable[List[T]]],
+    item_key: Callable[[T], Optional[str]],
+    chunk_tokens: int,
+    max_items_per_chunk: int,
+    max_concurrency: int,
+    min_chunk_tokens: int = 500,
+) -> List[T]:
+    """
+    Generate ``total`` items (quiz questions, flashcards) from text that may
+    not fit in one prompt.
+
+    The text is split by ``chunk_tokens``, and into enough chunks that none
+    is asked for more than ``max_items_per_chunk`` items, as long as chunks
+    stay above ``min_chunk_tokens`` (splitting a short note only produces
+    overlapping items). The quota is spread over the chunks in proportion
+    to their size, and ``generate_chunk(chunk, count)`` runs for each chunk, at most
+    ``max_concurrency`` at a time. Results are merged in text order,
+    de-duplicated by ``item_key``, and cut to ``total``. A failed chunk only
+    costs its own items; the call fails if every chunk failed.
+    """
+    text = (text or "").strip()
+    if not text or total <= 0:
+        return []
+    min_chunks = math.ceil(total / max(1, max_items_per_chunk))
+    budget = min(chunk_tokens, max(min_chunk_tokens, math.ceil(estimate_tokens(text) / min_chunks)))
+    chunks = split_by_token_budget(text, budget)
+    jobs = [(chunk, count) for chunk, count in zip(chunks, allocate_quota(total, chunks)) if count]
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(chunk: str, count: int):
+        async with semaphore:
+            try:
+                return await generate_chunk(chunk, count)
+            except Exception as exc:
+                logger.warning("Chunk of %d items failed: %s", count, exc)
+                return exc
+
+    results = await asyncio.gather(*(run(chunk, count) for chunk, count in jobs))
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures and len(failures) == len(results):
+        raise failures[0]
+    if failures:
+        logger.warning("%d of %d chunks failed; returning items from the rest", len(failures), len(results))
+
+    merged: List[T] = []
+    seen = set()
+    for result in results:
+        if isinstance(result, Exception):
+            continue
+        for item in result:
+            key = item_key(item)
+            if isinstance(key, str):
+                normalized = _NON_WORDS.sub(" ", key.lower()).strip()
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+            merged.append(item)
+    return merged[:total]
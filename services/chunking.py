@@ -0,0 +1,78 @@
+import math
+import re
+from typing import List
+
+# Rough English average for GPT/Llama style BPE vocabularies. Good enough to
+# stay under a context budget without pulling in a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+_SENT_SPLIT_REGEX = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_by_token_budget(text: str, max_tokens: int) -> List[str]:
+    """
+    Split ``text`` into chunks of at most ``max_tokens`` estimated tokens,
+    breaking on sentence boundaries where possible and on words otherwise.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    def flush() -> None:
+        nonlocal current, current_len
+        if current:
+            chunks.append(" ".join(current))
+        current, current_len = [], 0
+
+    for piece in _pieces(text, max_chars):
+        extra = len(piece) + (1 if current else 0)
+        if current and current_len + extra > max_chars:
+            flush()
+            extra = len(piece)
+        current.append(piece)
+        current_len += extra
+    flush()
+    return chunks
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    pieces: List[str] = []
+    for sentence in _SENT_SPLIT_REGEX.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        # Unpunctuated run-on (common in raw transcripts): fall back to words.
+        pieces.extend(sentence.split())
+    return pieces
+
+
+def allocate_quota(total: int, chunks: List[str]) -> List[int]:
+    """
+    Spread ``total`` items (questions, cards) over ``chunks`` in proportion
+    to their estimated tokens. Uses largest remainders, so the counts add up
+    to exactly ``total``; chunks too small for a share get 0.
+    """
+    if total <= 0 or not chunks:
+        return [0] * len(chunks)
+    weights = [max(1, estimate_tokens(chunk)) for chunk in chunks]
+    whole = sum(weights)
+    shares = [total * weight / whole for weight in weights]
+    quotas = [math.floor(share) for share in shares]
+    by_remainder = sorted(range(len(chunks)), key=lambda i: (shares[i] - quotas[i], weights[i]), reverse=True)
+    for i in by_remainder[: total - sum(quotas)]:
+        quotas[i] += 1
+    return quotas
@@ -0,0 +1,162 @@
+"""
+Circuit breaker for calls to the model provider.
+
+After HF_BREAKER_FAILURE_THRESHOLD consecutive failures (timeouts,
+connection errors, 5xx answers) the circuit opens and calls fail at once,
+with a retry-after, instead of each waiting for the read timeout. After
+HF_BREAKER_OPEN_SECONDS it is half-open: one probe call is let through,
+and its outcome closes the circuit or opens it for another period. The
+state is per process; every worker sees the same outage on its own.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HF_BREAKER_FAILURE_THRESHOLD = int(os.getenv("HF_BREAKER_FAILURE_THRESHOLD", "5"))
+HF_BREAKER_OPEN_SECONDS = float(os.getenv("HF_BREAKER_OPEN_SECONDS", "30"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The circuit is open (or its probe is in flight); retry later."""
+
+    def __init__(self, state: str, retry_after: float):
+        super().__init__(f"circuit {state}, retry after {retry_after:.1f}s")
+        self.state = state
+        self.retry_after = retry_after
+
+
+@dataclass
+class CircuitBreakerStats:
+    successes: int = 0
+    failures: int = 0
+    rejected: int = 0
+    opened: int = 0
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = HF_BREAKER_FAILURE_THRESHOLD,
+        open_seconds: float = HF_BREAKER_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._stats = CircuitBreakerStats()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = STATE_HALF_OPEN
+        return self._state
+
+    def _retry_after(self) -> float:
+        if self._state == STATE_OPEN:
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+        # Half-open with the probe in flight: its outcome is due soon.
+        return 1.0 if self._probing else 0.0
+
+    def _reject_if_open(self, state: str) -> None:
+        if state == STATE_OPEN or (state == STATE_HALF_OPEN and self._probing):
+            self._stats.rejected += 1
+            raise CircuitOpen(state, self._retry_after())
+
+    def check(self) -> None:
+        """Raise CircuitOpen unless a call could go through now."""
+        with self._lock:
+            self._reject_if_open(self._current_state())
+
+    async def call(self, send: Callable[[], Awaitable[T]], *, is_failure: Callable[[object], bool]) -> T:
+        """
+        Run ``send()`` unless the circuit is open, and record its outcome.
+        ``is_failure`` is given the result or the exception raised. A call
+        that is cancelled (client gone) counts as neither.
+        """
+        probe = self._before_call()
+        try:
+            result = await send()
+        except Exception as exc:
+            self._after_call(probe, failed=is_failure(exc))
+            raise
+        except BaseException:
+            self._after_call(probe, failed=None)
+            raise
+        self._after_call(probe, failed=is_failure(result))
+        return result
+
+    def _before_call(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            self._reject_if_open(state)
+            if state == STATE_HALF_OPEN:
+                self._probing = True
+                return True
+            return False
+
+    def _after_call(self, probe: bool, failed: Optional[bool]) -> None:
+        with self._lock:
+            if probe:
+                self._probing = False
+            if failed is None:
+                return
+            if not failed:
+                self._stats.successes += 1
+                self._consecutive_failures = 0
+                if probe:
+                    logger.info("Circuit breaker: probe succeeded, closing")
+                    self._state = STATE_CLOSED
+                return
+            self._stats.failures += 1
+            self._consecutive_failures += 1
+            if probe or (self._state == STATE_CLOSED and self._consecutive_failures >= self.failure_threshold):
+                logger.warning(
+                    "Circuit breaker: opening for %.0fs after %d consecutive failures",
+                    self.open_seconds,
+                    self._consecutive_failures,
+                )
+                self._state = STATE_OPEN
+                self._opened_at = self._clock()
+                self._stats.opened += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_after": 0.0 if state == STATE_CLOSED else self._retry_after(),
+                **asdict(self._stats),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probing = False
+            self._stats = CircuitBreakerStats()
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,87 @@
+"""
+One pooled HTTP client for the Hugging Face inference router.
+
+Opened and closed by the application lifespan (main.py). Requests reuse
+kept-alive connections, so only the first call per connection pays for
+the TCP and TLS handshakes, and with HTTP/2 concurrent calls share one
+connection.
+"""
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HF_URL = os.getenv("HF_URL", "https://router.huggingface.co/v1/chat/completions")
+# HTTP/2 needs the h2 package (httpx[http2]); without it HTTP/1.1 is used.
+HF_HTTP2 = os.getenv("HF_HTTP2", "on").lower() not in ("0", "off", "false")
+HF_MAX_CONNECTIONS = int(os.getenv("HF_MAX_CONNECTIONS", "20"))
+HF_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HF_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HF_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HF_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HF_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HF_CONNECT_TIMEOUT_SECONDS", "5"))
+# How long a request may wait for a free connection when the pool is full.
+HF_POOL_TIMEOUT_SECONDS = float(os.getenv("HF_POOL_TIMEOUT_SECONDS", "10"))
+# Read timeouts per endpoint: generation of quizzes and flashcards produces
+# four times the tokens of a summary.
+HF_SUMMARIZE_TIMEOUT_SECONDS = float(os.getenv("HF_SUMMARIZE_TIMEOUT_SECONDS", "60"))
+HF_GENERATE_TIMEOUT_SECONDS = float(os.getenv("HF_GENERATE_TIMEOUT_SECONDS", "90"))
+
+_hf_client: Optional[httpx.AsyncClient] = None
+
+
+def hf_timeout(read_seconds: float) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=HF_CONNECT_TIMEOUT_SECONDS,
+        read=read_seconds,
+        write=read_seconds,
+        pool=HF_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def _http2_available() -> bool:
+    if not HF_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HF_HTTP2 is on but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def create_hf_client(**overrides) -> httpx.AsyncClient:
+    """A client with the pool and timeout settings above; ``overrides`` go to httpx."""
+    options = dict(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HF_MAX_CONNECTIONS,
+            max_keepalive_connections=HF_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HF_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=hf_timeout(HF_SUMMARIZE_TIMEOUT_SECONDS),
+    )
+    options.update(overrides)
+    return httpx.AsyncClient(**options)
+
+
+def open_hf_client() -> httpx.AsyncClient:
+    global _hf_client
+    if _hf_client is None:
+        _hf_client = create_hf_client()
+    return _hf_client
+
+
+def get_hf_client() -> httpx.AsyncClient:
+    """
+    The shared client. Opened on first use when the lifespan did not run
+    (scripts and tests that do not start the app).
+    """
+    return _hf_client or open_hf_client()
+
+
+async def close_hf_client() -> None:
+    global _hf_client
+    if _hf_client is not None:
+        client, _hf_client = _hf_client, None
+        await client.aclose()
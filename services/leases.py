@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from db.models import Transcription as TranscriptionModel, TranscriptionStatus
+from db.sessions import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv("TRANSCRIPTION_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = max(1, LEASE_SECONDS // 4)
+MAX_ATTEMPTS = int(os.getenv("TRANSCRIPTION_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_SECONDS = int(os.getenv("TRANSCRIPTION_RETRY_BACKOFF_SECONDS", "30"))
+REAPER_BATCH_SIZE = 100
+# Rows left PROCESSING by workers that predate leases have no lease at all.
+# They count as expired once untouched for this long, which is the RQ job
+# timeout, so a legacy job that is still running is not taken over.
+UNLEASED_STALE_SECONDS = int(os.getenv("TRANSCRIPTION_UNLEASED_STALE_SECONDS", "1800"))
+
+
+def lease_deadline(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(seconds=LEASE_SECONDS)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+
+
+class LeaseKeeper:
+    """
+    Background heartbeat that keeps a PROCESSING row's lease alive.
+
+    ``lost`` is set when the row no longer belongs to this attempt, e.g. the
+    reaper gave the job to another worker; the caller must then discard its
+    results instead of committing them.
+    """
+
+    def __init__(self, transcription_id: str, owner: str, session_factory=SessionLocal):
+        self.transcription_id = transcription_id
+        self.owner = owner
+        self.session_factory = session_factory
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{transcription_id}", daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join(timeout=HEARTBEAT_SECONDS)
+
+    def _run(self) -> None:
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not self.renew():
+                    self.lost.set()
+                    return
+            except Exception:
+                # A missed heartbeat is not fatal; the lease has slack for several.
+                logger.warning("Lease heartbeat for %s failed", self.transcription_id, exc_info=True)
+
+    def renew(self) -> bool:
+        db = self.session_factory()
+        try:
+            renewed = (
+                db.query(TranscriptionModel)
+                .filter(
+                    TranscriptionModel.id == self.transcription_id,
+                    TranscriptionModel.lease_owner == self.owner,
+                    TranscriptionModel.status == TranscriptionStatus.PROCESSING,
+                )
+                .update({TranscriptionModel.lease_expires_at: lease_deadline()}, synchronize_session=False)
+            )
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+
+def reap_expired_leases(
+    db: Session, *, now: Optional[datetime] = None
+) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """
+    Requeue PROCESSING rows whose worker stopped heartbeating, with
+    exponential backoff, or mark them FAILED once attempts are used up.
+    Returns ``(id, user_id)`` pairs for the requeued and the failed rows.
+    The sweep reads through the (status, lease_expires_at) index and claims
+    at most one batch.
+    """
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(TranscriptionModel)
+        .filter(
+            TranscriptionModel.status == TranscriptionStatus.PROCESSING,
+            or_(
+                TranscriptionModel.lease_expires_at < now,
+                and_(
+                    TranscriptionModel.lease_expires_at.is_(None),
+                    TranscriptionModel.updated_at < now - timedelta(seconds=UNLEASED_STALE_SECONDS),
+                ),
+            ),
+        )
+        .order_by(TranscriptionModel.lease_expires_at)
+        .limit(REAPER_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    requeued: List[Tuple[str, int]] = []
+    failed: List[Tuple[str, int]] = []
+    for row in rows:
+        row.lease_owner = None
+        row.lease_expires_at = None
+        if (row.attempts or 0) >= MAX_ATTEMPTS:
+            row.status = TranscriptionStatus.FAILED
+            row.error_message = f"Worker stopped responding; gave up after {row.attempts} attempts"
+            failed.append((row.id, row.user_id))
+        else:
+            row.status = TranscriptionStatus.PENDING
+            row.next_attempt_at = now + retry_delay(row.attempts or 0)
+            row.error_message = f"Worker stopped responding on attempt {row.attempts}; retry scheduled"
+            requeued.append((row.id, row.user_id))
+    db.commit()
+    return requeued, failed
+
+
+def claim_due_retries(db: Session, *, now: Optional[datetime] = None):
+    """
+    Return ``(id, user_id, duration_seconds)`` for PENDING rows whose backoff
+    has elapsed, clearing ``next_attempt_at`` so each is handed out once.
+    """
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(TranscriptionModel)
+        .filter(
+            TranscriptionModel.status == TranscriptionStatus.PENDING,
+            TranscriptionModel.next_attempt_at <= now,
+        )
+        .order_by(TranscriptionModel.next_attempt_at)
+        .limit(REAPER_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    due = [(row.id, row.user_id, row.duration_seconds) for row in rows]
+    for row in rows:
+        row.next_attempt_at = None
+    db.commit()
+    return due
@@ -0,0 +1,147 @@
+"""
+Cache of LLM completions for the /ai endpoints.
+
+Students regenerate summaries, quizzes and flashcards from the same note
+text all the time; identical requests (same model, messages, temperature
+and max_tokens) are answered from here instead of another round trip to
+the model. Entries live in an in-process LRU and, when Redis is available,
+in a shared Redis tier so every API process benefits. Both tiers expire
+entries after LLM_CACHE_TTL_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from services.queue import redis_conn
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "on").lower() not in ("0", "off", "false")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Completions are a few KiB each, so the default bounds the LRU to a few MiB.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_REDIS = os.getenv("LLM_CACHE_REDIS", "on").lower() not in ("0", "off", "false")
+REDIS_KEY_PREFIX = "llm-cache:"
+# The fields that decide what the model returns.
+_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens")
+
+
+def cache_key(payload: dict) -> str:
+    canonical = json.dumps(
+        {field: payload.get(field) for field in _KEY_FIELDS}, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class LLMCacheStats:
+    memory_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    redis_errors: int = 0
+    entries: int = 0
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        if not lookups:
+            return None
+        return (self.memory_hits + self.redis_hits) / lookups
+
+
+class LLMCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        redis=None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, completion), least recently used first.
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._stats = LLMCacheStats()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self._stats.memory_hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats.expirations += 1
+
+        value = await self._redis_get(key)
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self._stats.redis_hits += 1
+            return value
+        with self._lock:
+            self._stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        with self._lock:
+            self._stats.stores += 1
+        if self.redis is not None:
+            try:
+                await run_in_threadpool(self.redis.setex, REDIS_KEY_PREFIX + key, self.ttl_seconds, value)
+            except Exception:
+                self._redis_failed()
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    async def _redis_get(self, key: str) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            value = await run_in_threadpool(self.redis.get, REDIS_KEY_PREFIX + key)
+        except Exception:
+            # The cache is an optimization: a Redis outage only costs hits.
+            self._redis_failed()
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _redis_failed(self) -> None:
+        logger.warning("LLM cache: Redis unavailable, using the in-process tier only", exc_info=True)
+        with self._lock:
+            self._stats.redis_errors += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats = LLMCacheStats(**{**asdict(self._stats), "entries": len(self._entries)})
+        return {**asdict(stats), "hit_ratio": stats.hit_ratio}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = LLMCacheStats()
+
+
+llm_cache = LLMCache(redis=redis_conn if LLM_CACHE_REDIS else None)
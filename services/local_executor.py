@@ -0,0 +1,227 @@
+import importlib
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, List, Optional
+
+from db.models import LocalJob, LocalJobStatus
+from db.sessions import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_NAME = "transcriptions"
+
+
+def _func_path(fn: Callable) -> str:
+    return f"{fn.__module__}:{fn.__qualname__}"
+
+
+def _resolve(func_path: str) -> Callable:
+    module_name, _, qualname = func_path.partition(":")
+    target = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class LocalExecutor:
+    """
+    Single-node stand-in for an RQ queue.
+
+    Jobs are recorded in the ``local_jobs`` table and run on a fixed number
+    of worker threads, so ``enqueue`` returns immediately. Jobs that were
+    queued or running when the process stopped are picked up again by
+    ``recover``. Threads are used rather than processes because the jobs
+    spend their time waiting on the transcription and summary APIs. They are
+    daemon threads: a job still running when ``drain`` gives up must not keep
+    the interpreter alive, since its row is left for ``recover`` anyway.
+
+    Only one process may own the table: ``recover`` assumes any RUNNING job
+    was orphaned. Run the API with a single worker process when Redis is not
+    configured; multi-process deployments need Redis and RQ.
+    """
+
+    def __init__(self, max_workers: int, session_factory=SessionLocal):
+        self.max_workers = max(1, max_workers)
+        self.session_factory = session_factory
+        self._pending: Deque[str] = deque()
+        self._running = 0
+        self._threads: List[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._accepting = True
+        self._stopped = False
+
+    def enqueue(self, fn: Callable, *args, **kwargs) -> str:
+        return self.enqueue_on(DEFAULT_QUEUE_NAME, fn, *args, **kwargs)
+
+    def enqueue_on(self, queue_name: str, fn: Callable, *args, **kwargs) -> str:
+        db = self.session_factory()
+        try:
+            job = LocalJob(
+                queue_name=queue_name,
+                func_path=_func_path(fn),
+                payload={"args": list(args), "kwargs": kwargs},
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        self._submit(job_id)
+        return job_id
+
+    def queue(self, name: str) -> "LocalQueue":
+        return LocalQueue(self, name)
+
+    def count_queued(self, queue_name: Optional[str] = None) -> int:
+        db = self.session_factory()
+        try:
+            query = db.query(LocalJob).filter(LocalJob.status == LocalJobStatus.QUEUED)
+            if queue_name is not None:
+                query = query.filter(LocalJob.queue_name == queue_name)
+            return query.count()
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        return self.count_queued()
+
+    def active_payloads(self) -> List[dict]:
+        """Payloads of jobs that are still QUEUED or RUNNING."""
+        db = self.session_factory()
+        try:
+            return [
+                row.payload
+                for row in db.query(LocalJob.payload).filter(
+                    LocalJob.status.in_([LocalJobStatus.QUEUED, LocalJobStatus.RUNNING])
+                )
+            ]
+        finally:
+            db.close()
+
+    def recover(self) -> int:
+        """
+        Re-submit jobs left QUEUED or RUNNING by a previous process. Call it
+        once at startup, before this process runs anything.
+        """
+        db = self.session_factory()
+        try:
+            db.query(LocalJob).filter(LocalJob.status == LocalJobStatus.RUNNING).update(
+                {LocalJob.status: LocalJobStatus.QUEUED, LocalJob.started_at: None},
+                synchronize_session=False,
+            )
+            db.commit()
+            job_ids = [
+                row.id
+                for row in db.query(LocalJob.id)
+                .filter(LocalJob.status == LocalJobStatus.QUEUED)
+                .order_by(LocalJob.created_at)
+            ]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self._submit(job_id)
+        return len(job_ids)
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Stop accepting work and wait up to ``timeout`` seconds for submitted
+        jobs. On timeout, jobs that never started stay QUEUED and running ones
+        stay RUNNING; the next ``recover`` resumes both. Returns True when
+        everything finished in time.
+        """
+        with self._cond:
+            self._accepting = False
+            self._cond.notify_all()
+            finished = self._cond.wait_for(lambda: not self._pending and not self._running, timeout)
+            if not finished:
+                self._stopped = True
+                self._pending.clear()
+                self._cond.notify_all()
+        return finished
+
+    def _submit(self, job_id: str) -> None:
+        with self._cond:
+            if not self._accepting:
+                return
+            self._pending.append(job_id)
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"local-job-{len(self._threads)}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self._accepting or self._stopped)
+                if self._stopped or not self._pending:
+                    return
+                job_id = self._pending.popleft()
+                self._running += 1
+            try:
+                self._run(job_id)
+            except Exception:
+                logger.exception("Local job %s could not be run", job_id)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job_id: str) -> None:
+        db = self.session_factory()
+        try:
+            # Claim atomically so a job is never run twice.
+            claimed = (
+                db.query(LocalJob)
+                .filter(LocalJob.id == job_id, LocalJob.status == LocalJobStatus.QUEUED)
+                .update(
+                    {LocalJob.status: LocalJobStatus.RUNNING, LocalJob.started_at: _now()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return
+            job = db.get(LocalJob, job_id)
+
+            # Anything that escapes here would leave the row RUNNING, and
+            # every later recover() would try it again.
+            try:
+                fn = _resolve(job.func_path)
+                args, kwargs = job.payload.get("args", []), job.payload.get("kwargs", {})
+                fn(*args, **kwargs)
+            except Exception as exc:
+                logger.exception("Local job %s (%s) failed", job_id, job.func_path)
+                job.status = LocalJobStatus.FAILED
+                job.error_message = str(exc)
+            else:
+                job.status = LocalJobStatus.FINISHED
+            job.finished_at = _now()
+            db.commit()
+        finally:
+            db.close()
+
+
+class LocalQueue:
+    """
+    RQ-style handle for one named queue. All names share the executor's
+    worker threads; the name only keeps per-queue counts apart.
+    """
+
+    def __init__(self, executor: LocalExecutor, name: str):
+        self.executor = executor
+        self.name = name
+
+    def enqueue(self, fn: Callable, *args, **kwargs) -> str:
+        return self.executor.enqueue_on(self.name, fn, *args, **kwargs)
+
+    def __len__(self) -> int:
+        return self.executor.count_queued(self.name)
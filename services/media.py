@@ -0,0 +1,121 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from services.storage import StorageBackend, StoredFile, audio_media_type, get_media_root, get_storage
+
+# Stored audio is content-addressed: a path never changes content, so
+# clients may keep it for a year without revalidating. "private" keeps
+# shared caches from handing one user's recording to another.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# When set (e.g. "/protected-media/"), responses only authorize the request
+# and hand the file to nginx via X-Accel-Redirect, which serves it with
+# sendfile and handles Range itself. The prefix must map to MEDIA_ROOT in
+# an ``internal`` nginx location.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+_SINGLE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+def media_file_response(headers: Headers, stored: StoredFile, storage: Optional[StorageBackend] = None) -> Response:
+    """
+    Serve a stored file with Range support and conditional requests.
+
+    Files with a content hash get it as a strong ETag and are cached as
+    immutable; ``If-None-Match`` then answers 304 without touching the file.
+    Local files go through Starlette's FileResponse (Range, multi-range,
+    If-Range, and the server's pathsend extension for zero-copy when the
+    ASGI server offers it). Objects with no local path are streamed from the
+    storage backend with ranged reads.
+    """
+    cache_headers: Dict[str, str] = {}
+    if stored.sha256:
+        cache_headers = {"ETag": f'"{stored.sha256}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if _etag_matches(headers.get("if-none-match"), cache_headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    path = stored.absolute_path
+    if path is None:
+        return _backend_response(headers, stored, storage or get_storage(), cache_headers)
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio file not found")
+
+    media_type = audio_media_type(path)
+    if MEDIA_ACCEL_REDIRECT_PREFIX:
+        relative = path.resolve().relative_to(get_media_root().resolve())
+        return Response(
+            media_type=media_type,
+            headers={
+                **cache_headers,
+                "X-Accel-Redirect": MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative.as_posix(),
+            },
+        )
+    return FileResponse(path, media_type=media_type, headers=cache_headers)
+
+
+def _backend_response(
+    headers: Headers, stored: StoredFile, storage: StorageBackend, cache_headers: Dict[str, str]
+) -> Response:
+    if not storage.exists(stored.key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio file not found")
+    size = storage.size(stored.key)
+    media_type = audio_media_type(Path(stored.key))
+    response_headers = {**cache_headers, "Accept-Ranges": "bytes"}
+
+    byte_range = _single_range(headers, size, cache_headers.get("ETag"))
+    if byte_range is None:
+        response_headers["Content-Length"] = str(size)
+        return StreamingResponse(storage.iter_range(stored.key), media_type=media_type, headers=response_headers)
+    if byte_range == ():
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**response_headers, "Content-Range": f"bytes */{size}"},
+        )
+    start, end = byte_range
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response_headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.iter_range(stored.key, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=response_headers,
+    )
+
+
+def _single_range(headers: Headers, size: int, etag: Optional[str]):
+    """
+    (start, end) for a satisfiable single range, () for an unsatisfiable
+    one, or None to send the whole object. Multi-range requests get the
+    whole object, which RFC 9110 allows.
+    """
+    requested = headers.get("range")
+    if not requested:
+        return None
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        return None
+    match = _SINGLE_RANGE.match(requested.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes.
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return ()
+    return start, end
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from services.queue import REDIS_URL, redis_conn
+
+CHANNEL_PREFIX = "transcription-progress:"
+TERMINAL_STATUSES = {"COMPLETED", "FAILED"}
+
+
+def _channel(transcription_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{transcription_id}"
+
+
+class _LocalBroker:
+    """
+    In-process fan-out used when Redis is unavailable. Jobs then run inside
+    the API process, so publishers and subscribers share this object.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publish(self, transcription_id: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(transcription_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Subscriber's loop already closed; it will unregister itself.
+                pass
+
+    def register(self, transcription_id: str) -> Tuple[asyncio.AbstractEventLoop, asyncio.Queue]:
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(transcription_id, set()).add(entry)
+        return entry
+
+    def unregister(self, transcription_id: str, entry) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(transcription_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[transcription_id]
+
+
+local_broker = _LocalBroker()
+
+
+class LocalSubscription:
+    def __init__(self, transcription_id: str):
+        self.transcription_id = transcription_id
+        self._entry = local_broker.register(transcription_id)
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self._entry[1].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        local_broker.unregister(self.transcription_id, self._entry)
+
+
+_async_redis = None
+
+
+def _shared_async_redis():
+    """
+    One asyncio Redis client per process. Each subscription checks a
+    connection out of its pool instead of opening a client of its own.
+    """
+    global _async_redis
+    if _async_redis is None:
+        from redis import asyncio as aioredis
+
+        _async_redis = aioredis.Redis.from_url(REDIS_URL)
+    return _async_redis
+
+
+async def close_async_redis() -> None:
+    global _async_redis
+    if _async_redis is not None:
+        client, _async_redis = _async_redis, None
+        await client.aclose()
+
+
+class RedisSubscription:
+    def __init__(self, transcription_id: str):
+        self._pubsub = _shared_async_redis().pubsub()
+        self._channel = _channel(transcription_id)
+
+    async def open(self) -> "RedisSubscription":
+        await self._pubsub.subscribe(self._channel)
+        return self
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    async def close(self) -> None:
+        await self._pubsub.unsubscribe(self._channel)
+        await self._pubsub.aclose()
+
+
+async def open_subscription(transcription_id: str):
+    """
+    Subscribe to progress events for one transcription. ``next_event``
+    returns None when nothing arrived within the timeout.
+    """
+    if redis_conn is not None:
+        return await RedisSubscription(transcription_id).open()
+    return LocalSubscription(transcription_id)
+
+
+def publish_progress(transcription_id: str, event: dict) -> None:
+    """
+    Fan a progress event out to connected clients. Never raises: progress is
+    best-effort and must not fail the job that reports it.
+    """
+    if redis_conn is not None:
+        try:
+            redis_conn.publish(_channel(transcription_id), json.dumps(event))
+        except Exception:
+            pass
+        return
+    local_broker.publish(transcription_id, event)
@@ -4,6 +4,9 @@ from redis import Redis
 from rq import Queue
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+JOB_TIMEOUT_SECONDS = 60 * 30
+LOCAL_EXECUTOR_WORKERS = int(os.getenv("LOCAL_EXECUTOR_WORKERS", "2"))
+LOCAL_EXECUTOR_DRAIN_SECONDS = float(os.getenv("LOCAL_EXECUTOR_DRAIN_SECONDS", "30"))
 redis_conn = None
 transcription_queue = None
 
@@ -11,19 +14,38 @@ try:
 	redis_conn = Redis.from_url(REDIS_URL)
 	# verify connection
 	redis_conn.ping()
-	transcription_queue = Queue("transcriptions", connection=redis_conn, default_timeout=60 * 30)
+	transcription_queue = Queue("transcriptions", connection=redis_conn, default_timeout=JOB_TIMEOUT_SECONDS)
 except Exception:
-	# Fallback to a lightweight in-memory stub queue so tests and dev can run
-	# without redis. The stub supports enqueue(job_fn, **kwargs) and simply
-	# executes the function synchronously.
-	class _StubQueue:
-		def enqueue(self, fn, **kwargs):
-			# execute synchronously for local dev/testing
-			try:
-				fn(**kwargs)
-			except TypeError:
-				# some job entrypoints expect positional args
-				fn(*kwargs.values())
-
-	transcription_queue = _StubQueue()
+	redis_conn = None
+	# Fallback to an in-process executor so single-node deployments and
+	# tests run without redis. Jobs are persisted and run on a bounded
+	# thread pool, so enqueue() returns immediately like it does with RQ.
+	from services.local_executor import LocalExecutor
 
+	transcription_queue = LocalExecutor(max_workers=LOCAL_EXECUTOR_WORKERS)
+
+
+def get_queue(name: str):
+	"""
+	Return the RQ queue called ``name``, or the fallback queue when Redis is
+	unavailable.
+	"""
+	if redis_conn is None:
+		return transcription_queue.queue(name)
+	if name == "transcriptions":
+		return transcription_queue
+	return Queue(name, connection=redis_conn, default_timeout=JOB_TIMEOUT_SECONDS)
+
+
+def recover_local_jobs() -> int:
+	"""Resume jobs a previous process left behind (no-op with Redis)."""
+	if redis_conn is None:
+		return transcription_queue.recover()
+	return 0
+
+
+def drain_local_jobs() -> bool:
+	"""Let running in-process jobs finish on shutdown (no-op with Redis)."""
+	if redis_conn is None:
+		return transcription_queue.drain(LOCAL_EXECUTOR_DRAIN_SECONDS)
+	return True
@@ -0,0 +1,201 @@
+"""
+Token-bucket rate limiting of calls to the model provider.
+
+Every API worker draws from one bucket in Redis, so bursts are smoothed to
+HF_RATE_LIMIT_PER_MINUTE with up to HF_RATE_LIMIT_BURST calls at once,
+instead of reaching the provider and coming back as 429s. A call that
+finds the bucket empty reserves the next token and waits its turn; if its
+turn is further away than HF_RATE_LIMIT_MAX_WAIT_SECONDS it is refused
+with the time after which a retry would be admitted. Without Redis (or
+when it fails) each process keeps its own bucket.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from services.queue import redis_conn
+
+logger = logging.getLogger(__name__)
+
+# 0 disables rate limiting.
+HF_RATE_LIMIT_PER_MINUTE = float(os.getenv("HF_RATE_LIMIT_PER_MINUTE", "120"))
+HF_RATE_LIMIT_BURST = int(os.getenv("HF_RATE_LIMIT_BURST", "20"))
+HF_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("HF_RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+RATE_LIMIT_KEY = "hf-rate-limit"
+# Returns the milliseconds to wait for the reserved token, or minus the
+# wait if that is over the limit (nothing is reserved then). Uses the
+# Redis clock so workers with skewed clocks share one refill timeline.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local clock = redis.call("time")
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local state = redis.call("hmget", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate)
+end
+if wait > max_wait then
+    return -wait
+end
+redis.call("hset", KEYS[1], "tokens", tostring(tokens - 1), "ts", tostring(now))
+redis.call("pexpire", KEYS[1], math.ceil(capacity / rate) + 1000)
+return wait
+"""
+
+
+class RateLimited(Exception):
+    """The bucket will not have a token for this call within the wait limit."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class _RedisUnavailable(Exception):
+    pass
+
+
+@dataclass
+class RateLimiterStats:
+    admitted: int = 0
+    queued: int = 0
+    rejected: int = 0
+    queue_seconds_total: float = 0.0
+    queue_seconds_max: float = 0.0
+    redis_errors: int = 0
+
+
+def reserve(
+    tokens: float, elapsed_ms: float, rate_per_ms: float, capacity: float, max_wait_ms: float
+) -> Tuple[int, float]:
+    """
+    The in-process twin of ``_RESERVE_SCRIPT``: refill a bucket holding
+    ``tokens`` after ``elapsed_ms`` and reserve one token. Returns the wait
+    in milliseconds (negative when refused) and the tokens left.
+    """
+    tokens = min(capacity, tokens + max(0.0, elapsed_ms) * rate_per_ms)
+    wait = math.ceil((1 - tokens) / rate_per_ms) if tokens < 1 else 0
+    if wait > max_wait_ms:
+        return -wait, tokens
+    return wait, tokens - 1
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        redis=None,
+        *,
+        per_minute: float = HF_RATE_LIMIT_PER_MINUTE,
+        burst: int = HF_RATE_LIMIT_BURST,
+        max_wait_seconds: float = HF_RATE_LIMIT_MAX_WAIT_SECONDS,
+        key: str = RATE_LIMIT_KEY,
+    ):
+        self.redis = redis
+        self.per_minute = per_minute
+        self.burst = max(1, burst)
+        self.max_wait_seconds = max_wait_seconds
+        self.key = key
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated: Optional[float] = None
+        self._stats = RateLimiterStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    async def acquire(self) -> float:
+        """
+        Wait for a token and return the seconds spent queueing. Raises
+        RateLimited when the wait would exceed ``max_wait_seconds``.
+        """
+        if not self.enabled:
+            return 0.0
+        rate_per_ms = self.per_minute / 60000
+        max_wait_ms = self.max_wait_seconds * 1000
+        wait_ms = None
+        if self.redis is not None:
+            try:
+                wait_ms = await self._redis_reserve(rate_per_ms, max_wait_ms)
+            except _RedisUnavailable:
+                pass
+        if wait_ms is None:
+            wait_ms = self._local_reserve(rate_per_ms, max_wait_ms)
+
+        if wait_ms < 0:
+            self._record(rejected=True)
+            raise RateLimited(-wait_ms / 1000)
+        waited = wait_ms / 1000
+        if waited:
+            await asyncio.sleep(waited)
+        self._record(waited=waited)
+        return waited
+
+    async def _redis_reserve(self, rate_per_ms: float, max_wait_ms: float) -> int:
+        try:
+            return int(
+                await run_in_threadpool(
+                    self.redis.eval, _RESERVE_SCRIPT, 1, self.key, repr(rate_per_ms), self.burst, int(max_wait_ms)
+                )
+            )
+        except Exception as exc:
+            logger.warning("Rate limiter: Redis unavailable, limiting per process", exc_info=True)
+            with self._lock:
+                self._stats.redis_errors += 1
+            raise _RedisUnavailable() from exc
+
+    def _local_reserve(self, rate_per_ms: float, max_wait_ms: float) -> int:
+        with self._lock:
+            now = time.monotonic()
+            elapsed_ms = 0.0 if self._updated is None else (now - self._updated) * 1000
+            wait_ms, tokens = reserve(self._tokens, elapsed_ms, rate_per_ms, self.burst, max_wait_ms)
+            if wait_ms >= 0:
+                self._tokens, self._updated = tokens, now
+            return wait_ms
+
+    def _record(self, *, waited: float = 0.0, rejected: bool = False) -> None:
+        with self._lock:
+            if rejected:
+                self._stats.rejected += 1
+                return
+            self._stats.admitted += 1
+            if waited:
+                self._stats.queued += 1
+                self._stats.queue_seconds_total += waited
+                self._stats.queue_seconds_max = max(self._stats.queue_seconds_max, waited)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = self._stats
+            return {
+                "enabled": self.enabled,
+                "per_minute": self.per_minute,
+                "burst": self.burst,
+                "admitted": stats.admitted,
+                "queued": stats.queued,
+                "rejected": stats.rejected,
+                "queue_seconds_mean": stats.queue_seconds_total / stats.admitted if stats.admitted else 0.0,
+                "queue_seconds_max": stats.queue_seconds_max,
+                "redis_errors": stats.redis_errors,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tokens = float(self.burst)
+            self._updated = None
+            self._stats = RateLimiterStats()
+
+
+rate_limiter = TokenBucket(redis=redis_conn)
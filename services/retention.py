@@ -0,0 +1,99 @@
+"""
+Cold tier for stored recordings.
+
+Once a transcription is finished its recording is rarely played again. The
+retention job (workers/archive_audio.py) gzips such recordings into the
+cold tier under ``archive/<key>.gz`` and removes the hot object; opening the
+player restores it. Objects are content-addressed, so one hot object may
+back several transcriptions and is only removed once none of them needs it.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from services.storage import READ_CHUNK_SIZE, LocalStorage, StorageBackend, get_storage
+
+logger = logging.getLogger(__name__)
+
+# transcriptions.audio_tier values. NULL is the hot tier.
+AUDIO_TIER_COLD = "cold"
+AUDIO_TIER_PURGED = "purged"
+
+# Recordings not played for this many days leave the hot tier.
+AUDIO_RETENTION_DAYS = int(os.getenv("AUDIO_RETENTION_DAYS", "90"))
+# "archive" keeps a compressed copy in the cold tier; "delete" drops the
+# recording (transcript, summary and segments are kept).
+AUDIO_RETENTION_POLICY = os.getenv("AUDIO_RETENTION_POLICY", "archive").lower()
+# With local storage the cold tier can live on a cheaper disk; defaults to
+# MEDIA_ROOT. With S3 it is the archive/ prefix of the same bucket, which a
+# lifecycle rule can move to an infrequent-access storage class.
+AUDIO_ARCHIVE_ROOT = os.getenv("AUDIO_ARCHIVE_ROOT", "")
+ARCHIVE_COMPRESS_LEVEL = 6
+
+
+def archive_key(key: str) -> str:
+    return f"archive/{key}.gz"
+
+
+def get_archive_storage() -> StorageBackend:
+    if AUDIO_ARCHIVE_ROOT and isinstance(get_storage(), LocalStorage):
+        return LocalStorage(Path(AUDIO_ARCHIVE_ROOT))
+    return get_storage()
+
+
+def archive_object(
+    key: str, storage: Optional[StorageBackend] = None, cold: Optional[StorageBackend] = None
+) -> int:
+    """
+    Write the gzipped copy of ``key`` to the cold tier, unless one is there
+    already. Returns the bytes written. The hot object is left in place.
+    """
+    storage = storage or get_storage()
+    cold = cold or get_archive_storage()
+    target = archive_key(key)
+    if cold.exists(target):
+        return 0
+    with storage.local_copy(key) as source, tempfile.TemporaryDirectory(prefix="archive-") as work_dir:
+        compressed = Path(work_dir) / Path(target).name
+        with source.open("rb") as raw, gzip.open(compressed, "wb", compresslevel=ARCHIVE_COMPRESS_LEVEL) as packed:
+            shutil.copyfileobj(raw, packed, READ_CHUNK_SIZE)
+        written = compressed.stat().st_size
+        cold.put_file(compressed, target)
+    return written
+
+
+def restore_object(
+    key: str,
+    sha256: Optional[str] = None,
+    storage: Optional[StorageBackend] = None,
+    cold: Optional[StorageBackend] = None,
+) -> None:
+    """
+    Put ``key`` back in the hot tier from its cold copy, checking the content
+    hash when one is given. Raises FileNotFoundError without a cold copy.
+    Safe to run concurrently for the same key.
+    """
+    storage = storage or get_storage()
+    cold = cold or get_archive_storage()
+    source_key = archive_key(key)
+    if not cold.exists(source_key):
+        raise FileNotFoundError(f"No archived copy of {key}")
+    with cold.local_copy(source_key) as source, tempfile.TemporaryDirectory(prefix="restore-") as work_dir:
+        restored = Path(work_dir) / Path(key).name
+        digest = hashlib.sha256()
+        with gzip.open(source, "rb") as packed, restored.open("wb") as raw:
+            while True:
+                chunk = packed.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                raw.write(chunk)
+        if sha256 and digest.hexdigest() != sha256:
+            raise RuntimeError(f"Archived copy of {key} does not match its content hash")
+        storage.put_file(restored, key)
+    logger.info("Restored %s from the cold tier", key)
@@ -0,0 +1,153 @@
+"""
+S3-compatible storage backend (AWS S3, MinIO, Ceph RGW, ...).
+
+Large files are uploaded as multipart uploads with parts sent in parallel,
+and downloaded with parallel ranged GETs written at their offsets, so a
+long recording moves at several connections' worth of bandwidth. boto3 is
+only needed when STORAGE_BACKEND=s3.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from services.storage import READ_CHUNK_SIZE, StorageBackend, audio_media_type
+
+logger = logging.getLogger(__name__)
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+# Set for MinIO and other S3-compatible services; unset for AWS.
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+# S3 requires parts of at least 5 MiB, except the last one.
+S3_PART_SIZE_BYTES = max(5, int(os.getenv("S3_PART_SIZE_MB", "8"))) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "4"))
+
+
+def _content_type(key: str) -> str:
+    return audio_media_type(Path(key))
+
+
+class S3Storage(StorageBackend):
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        client,
+        *,
+        part_size: int = S3_PART_SIZE_BYTES,
+        max_concurrency: int = S3_MAX_CONCURRENCY,
+    ):
+        self.bucket = bucket
+        self.client = client
+        self.part_size = part_size
+        self.max_concurrency = max(1, max_concurrency)
+
+    @classmethod
+    def from_env(cls) -> "S3Storage":
+        import boto3
+        from botocore.config import Config
+
+        if not S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        client = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL,
+            region_name=S3_REGION,
+            config=Config(
+                # One pooled connection per concurrent part, plus headroom
+                # for requests from other threads.
+                max_pool_connections=S3_MAX_CONCURRENCY * 2 + 2,
+                # Self-hosted endpoints rarely have per-bucket DNS.
+                s3={"addressing_style": "path" if S3_ENDPOINT_URL else "auto"},
+                retries={"max_attempts": 5, "mode": "standard"},
+            ),
+        )
+        return cls(S3_BUCKET, client)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def size(self, key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+
+    def put_file(self, source: Path, key: str) -> None:
+        size = source.stat().st_size
+        if size <= self.part_size:
+            with source.open("rb") as body:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=_content_type(key))
+            return
+        self._multipart_upload(source, key, size)
+
+    def _multipart_upload(self, source: Path, key: str, size: int) -> None:
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=_content_type(key)
+        )["UploadId"]
+
+        def upload_part(number: int) -> dict:
+            # Each part reads its own slice, so at most max_concurrency parts
+            # are in memory at once.
+            with source.open("rb") as body:
+                body.seek((number - 1) * self.part_size)
+                data = body.read(self.part_size)
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data
+            )
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        part_count = (size + self.part_size - 1) // self.part_size
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, part_count)) as pool:
+                parts: List[dict] = list(pool.map(upload_part, range(1, part_count + 1)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            # Parts of an abandoned upload are billed until aborted.
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except Exception:
+                logger.warning("Could not abort multipart upload %s for %s", upload_id, key, exc_info=True)
+            raise
+        logger.info("Uploaded %s in %d parts (%d bytes)", key, part_count, size)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+        body = self.client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)["Body"]
+        try:
+            yield from body.iter_chunks(READ_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def download(self, key: str, destination: Path) -> None:
+        size = self.size(key)
+        with destination.open("wb") as out_file:
+            out_file.truncate(size)
+        if size == 0:
+            return
+
+        def fetch(start: int) -> None:
+            end = min(start + self.part_size, size) - 1
+            with destination.open("r+b") as out_file:
+                out_file.seek(start)
+                for chunk in self.iter_range(key, start, end):
+                    out_file.write(chunk)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            list(pool.map(fetch, range(0, size, self.part_size)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
@@ -0,0 +1,282 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from db.models import Transcription as TranscriptionModel, TranscriptionStatus
+from db.sessions import SessionLocal
+from services.queue import JOB_TIMEOUT_SECONDS, get_queue, redis_conn, transcription_queue
+
+# Lanes in priority order: a worker always drains earlier lanes first. The
+# last lane keeps the historical "transcriptions" RQ queue name so existing
+# workers keep working.
+TRANSCRIPTION_LANES = [
+    lane.strip() for lane in os.getenv("TRANSCRIPTION_LANES", "short,standard").split(",") if lane.strip()
+]
+DEFAULT_LANE = TRANSCRIPTION_LANES[-1]
+SHORT_CLIP_SECONDS = int(os.getenv("SHORT_CLIP_SECONDS", "300"))
+MAX_JOBS_IN_FLIGHT_PER_USER = int(os.getenv("MAX_JOBS_IN_FLIGHT_PER_USER", "2"))
+# Wait-time samples kept per lane for the stats endpoint.
+_WAIT_SAMPLES = 200
+
+
+def queue_name_for_lane(lane: str) -> str:
+    return "transcriptions" if lane == DEFAULT_LANE else f"transcriptions-{lane}"
+
+
+def choose_lane(duration_seconds: Optional[int]) -> str:
+    if "short" in TRANSCRIPTION_LANES and duration_seconds is not None and duration_seconds <= SHORT_CLIP_SECONDS:
+        return "short"
+    return DEFAULT_LANE
+
+
+class _MemoryState:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users: Dict[str, deque] = {}
+        self._jobs: Dict[Tuple[str, str], deque] = {}
+        self._inflight: Dict[str, Dict[str, float]] = {}
+        self._waits: Dict[str, deque] = {}
+        self._dispatched: Dict[str, int] = {}
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            yield
+
+    def push(self, lane: str, user_id: str, job: dict) -> None:
+        jobs = self._jobs.setdefault((lane, user_id), deque())
+        jobs.append(job)
+        users = self._users.setdefault(lane, deque())
+        if user_id not in users:
+            users.append(user_id)
+
+    def lane_users(self, lane: str) -> List[str]:
+        return list(self._users.get(lane, ()))
+
+    def pop_job(self, lane: str, user_id: str) -> Optional[dict]:
+        jobs = self._jobs.get((lane, user_id))
+        job = jobs.popleft() if jobs else None
+        users = self._users.get(lane, deque())
+        if user_id in users:
+            users.remove(user_id)
+        if jobs:
+            users.append(user_id)
+        else:
+            self._jobs.pop((lane, user_id), None)
+        return job
+
+    def pending(self, lane: str) -> int:
+        return sum(len(jobs) for (job_lane, _), jobs in self._jobs.items() if job_lane == lane)
+
+    def inflight(self, user_id: str, now: float) -> int:
+        jobs = self._inflight.get(user_id, {})
+        for transcription_id, started in list(jobs.items()):
+            if now - started > JOB_TIMEOUT_SECONDS:
+                del jobs[transcription_id]
+        return len(jobs)
+
+    def mark_inflight(self, user_id: str, transcription_id: str, now: float) -> None:
+        self._inflight.setdefault(user_id, {})[transcription_id] = now
+
+    def clear_inflight(self, user_id: str, transcription_id: str) -> None:
+        self._inflight.get(user_id, {}).pop(transcription_id, None)
+
+    def record_wait(self, lane: str, seconds: float) -> None:
+        self._waits.setdefault(lane, deque(maxlen=_WAIT_SAMPLES)).appendleft(seconds)
+        self._dispatched[lane] = self._dispatched.get(lane, 0) + 1
+
+    def waits(self, lane: str) -> Tuple[int, List[float]]:
+        return self._dispatched.get(lane, 0), list(self._waits.get(lane, ()))
+
+
+class _RedisState:
+    """
+    Same operations as ``_MemoryState`` but shared between the API and the
+    workers through Redis. Mutations happen under a short Redis lock.
+    """
+
+    def __init__(self, conn, prefix: str = "sched"):
+        self.conn = conn
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + tuple(str(p) for p in parts))
+
+    @contextmanager
+    def lock(self):
+        with self.conn.lock(self._key("lock"), timeout=10, blocking_timeout=10):
+            yield
+
+    def push(self, lane: str, user_id: str, job: dict) -> None:
+        pipe = self.conn.pipeline()
+        pipe.rpush(self._key(lane, "user", user_id), json.dumps(job))
+        pipe.lrem(self._key(lane, "users"), 0, user_id)
+        pipe.rpush(self._key(lane, "users"), user_id)
+        pipe.incr(self._key(lane, "pending"))
+        pipe.execute()
+
+    def lane_users(self, lane: str) -> List[str]:
+        return [u.decode() for u in self.conn.lrange(self._key(lane, "users"), 0, -1)]
+
+    def pop_job(self, lane: str, user_id: str) -> Optional[dict]:
+        raw = self.conn.lpop(self._key(lane, "user", user_id))
+        self.conn.lrem(self._key(lane, "users"), 0, user_id)
+        if self.conn.llen(self._key(lane, "user", user_id)):
+            self.conn.rpush(self._key(lane, "users"), user_id)
+        if raw is None:
+            return None
+        self.conn.decr(self._key(lane, "pending"))
+        return json.loads(raw)
+
+    def pending(self, lane: str) -> int:
+        return int(self.conn.get(self._key(lane, "pending")) or 0)
+
+    def inflight(self, user_id: str, now: float) -> int:
+        key = self._key("inflight", user_id)
+        # Jobs whose worker died never report back; expire them with the RQ timeout.
+        self.conn.zremrangebyscore(key, "-inf", now - JOB_TIMEOUT_SECONDS)
+        return self.conn.zcard(key)
+
+    def mark_inflight(self, user_id: str, transcription_id: str, now: float) -> None:
+        self.conn.zadd(self._key("inflight", user_id), {transcription_id: now})
+
+    def clear_inflight(self, user_id: str, transcription_id: str) -> None:
+        self.conn.zrem(self._key("inflight", user_id), transcription_id)
+
+    def record_wait(self, lane: str, seconds: float) -> None:
+        pipe = self.conn.pipeline()
+        pipe.lpush(self._key(lane, "waits"), seconds)
+        pipe.ltrim(self._key(lane, "waits"), 0, _WAIT_SAMPLES - 1)
+        pipe.incr(self._key(lane, "dispatched"))
+        pipe.execute()
+
+    def waits(self, lane: str) -> Tuple[int, List[float]]:
+        dispatched = int(self.conn.get(self._key(lane, "dispatched")) or 0)
+        return dispatched, [float(w) for w in self.conn.lrange(self._key(lane, "waits"), 0, -1)]
+
+
+class TranscriptionScheduler:
+    """
+    Fair-share layer in front of the RQ queues.
+
+    Jobs wait here per lane and per user. A job is handed to its lane's RQ
+    queue only while its owner has fewer than ``max_in_flight`` jobs running,
+    and users with pending work are served round-robin, so one bulk upload
+    cannot starve everyone else.
+    """
+
+    def __init__(self, state, lanes: List[str], max_in_flight: int):
+        self.state = state
+        self.lanes = lanes
+        self.max_in_flight = max_in_flight
+
+    def submit(self, transcription_id: str, *, user_id: int, lane: str = DEFAULT_LANE) -> None:
+        if lane not in self.lanes:
+            lane = DEFAULT_LANE
+        job = {"transcription_id": transcription_id, "user_id": user_id, "enqueued_at": time.time()}
+        with self.state.lock():
+            self.state.push(lane, str(user_id), job)
+        self.dispatch()
+
+    def job_finished(self, transcription_id: str, *, user_id: int) -> None:
+        with self.state.lock():
+            self.state.clear_inflight(str(user_id), transcription_id)
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        # The queue call happens outside the lock: the fallback queue runs the
+        # job inline, and the job calls back into job_finished().
+        while True:
+            with self.state.lock():
+                picked = self._pick_next()
+            if picked is None:
+                return
+            lane, job = picked
+            from workers.transcription_job import transcription_job
+
+            get_queue(queue_name_for_lane(lane)).enqueue(
+                transcription_job,
+                transcription_id=job["transcription_id"],
+                user_id=job["user_id"],
+            )
+
+    def _pick_next(self):
+        now = time.time()
+        for lane in self.lanes:
+            for user_id in self.state.lane_users(lane):
+                if self.state.inflight(user_id, now) >= self.max_in_flight:
+                    continue
+                job = self.state.pop_job(lane, user_id)
+                if job is None:
+                    continue
+                self.state.mark_inflight(user_id, job["transcription_id"], now)
+                self.state.record_wait(lane, now - job["enqueued_at"])
+                return lane, job
+        return None
+
+    def stats(self) -> List[dict]:
+        lane_stats = []
+        for lane in self.lanes:
+            dispatched, waits = self.state.waits(lane)
+            ordered = sorted(waits)
+            queued = get_queue(queue_name_for_lane(lane))
+            lane_stats.append(
+                {
+                    "lane": lane,
+                    "pending": self.state.pending(lane),
+                    "queued": len(queued) if hasattr(queued, "__len__") else 0,
+                    "dispatched": dispatched,
+                    "avg_wait_seconds": sum(ordered) / len(ordered) if ordered else None,
+                    "p95_wait_seconds": ordered[int(0.95 * (len(ordered) - 1))] if ordered else None,
+                }
+            )
+        return lane_stats
+
+
+transcription_scheduler = TranscriptionScheduler(
+    _RedisState(redis_conn) if redis_conn is not None else _MemoryState(),
+    TRANSCRIPTION_LANES,
+    MAX_JOBS_IN_FLIGHT_PER_USER,
+)
+
+
+def recover_held_back_jobs(session_factory=SessionLocal) -> int:
+    """
+    Re-submit PENDING transcriptions that the in-memory scheduler was still
+    holding back when the process stopped. Jobs already handed to the local
+    executor are left to its own ``recover``; retries waiting on
+    ``next_attempt_at`` belong to the reaper. With Redis the held-back queue
+    survives restarts, so this is a no-op.
+    """
+    if redis_conn is not None:
+        return 0
+    # Read the dispatched jobs first: one finishing in between is then no
+    # longer PENDING, so nothing is submitted twice.
+    dispatched = {
+        payload.get("kwargs", {}).get("transcription_id") for payload in transcription_queue.active_payloads()
+    }
+    db = session_factory()
+    try:
+        rows = (
+            db.query(TranscriptionModel.id, TranscriptionModel.user_id, TranscriptionModel.duration_seconds)
+            .filter(
+                TranscriptionModel.status == TranscriptionStatus.PENDING,
+                TranscriptionModel.next_attempt_at.is_(None),
+            )
+            .order_by(TranscriptionModel.created_at)
+            .all()
+        )
+    finally:
+        db.close()
+
+    resubmitted = 0
+    for row in rows:
+        if row.id in dispatched:
+            continue
+        transcription_scheduler.submit(row.id, user_id=row.user_id, lane=choose_lane(row.duration_seconds))
+        resubmitted += 1
+    return resubmitted
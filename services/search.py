@@ -0,0 +1,339 @@
+"""
+Full-text search over a user's transcripts, notes and flashcards.
+
+Every searchable row is mirrored into ``search_documents`` (kind, ref_id,
+user_id, title, body). The inverted index depends on the database:
+
+- SQLite: an external-content FTS5 table, ``search_index``, kept in sync by
+  triggers on ``search_documents``. The owner is indexed as a token
+  (``u<user_id>``), so the per-user restriction is part of the index lookup
+  instead of a filter over every user's matches.
+- Postgres: a stored ``tsvector`` column with a GIN index, titles weighted
+  above bodies.
+
+Documents are written from ORM flush events, in the same transaction as the
+row they mirror. Bulk ``Query.update``/``delete`` bypass those events; run
+``python -m workers.reindex_search`` after changing rows that way.
+"""
+import logging
+import os
+import re
+import weakref
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+
+from db.models import FlashCard, Note, Transcription, TranscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+# Postgres text search configuration (stemming and stop words).
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "english")
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+SNIPPET_START, SNIPPET_END = "<b>", "</b>"
+
+KIND_TRANSCRIPTION = "transcription"
+KIND_NOTE = "note"
+KIND_FLASHCARD = "flashcard"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+# Engines known to have the index; a missing table is checked again next time.
+_indexed_engines: "weakref.WeakSet" = weakref.WeakSet()
+
+_documents = sa.table(
+    "search_documents",
+    sa.column("kind"),
+    sa.column("ref_id"),
+    sa.column("user_id"),
+    sa.column("title"),
+    sa.column("body"),
+)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str
+    ref_id: str
+    title: str
+    snippet: str
+    score: float
+
+
+# ---------- Schema ----------
+
+_SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_documents (
+        id INTEGER PRIMARY KEY,
+        kind VARCHAR(16) NOT NULL,
+        ref_id VARCHAR(36) NOT NULL,
+        user_id INTEGER NOT NULL,
+        owner VARCHAR(24) NOT NULL,
+        title TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        UNIQUE (kind, ref_id)
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        owner, title, body,
+        content='search_documents', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_index (rowid, owner, title, body) VALUES (new.id, new.owner, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_index (search_index, rowid, owner, title, body)
+        VALUES ('delete', old.id, old.owner, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_index (search_index, rowid, owner, title, body)
+        VALUES ('delete', old.id, old.owner, old.title, old.body);
+        INSERT INTO search_index (rowid, owner, title, body) VALUES (new.id, new.owner, new.title, new.body);
+    END
+    """,
+]
+
+
+def _postgres_ddl() -> List[str]:
+    config = SEARCH_TEXT_CONFIG
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS search_documents (
+            id BIGSERIAL PRIMARY KEY,
+            kind VARCHAR(16) NOT NULL,
+            ref_id VARCHAR(36) NOT NULL,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            body TEXT NOT NULL DEFAULT '',
+            document TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('{config}', title), 'A') || setweight(to_tsvector('{config}', body), 'B')
+            ) STORED,
+            UNIQUE (kind, ref_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_user_id ON search_documents (user_id)",
+    ]
+
+
+def create_search_index(connection: Connection) -> None:
+    """Create the search tables for ``connection``'s database if missing."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        statements = _SQLITE_DDL
+    elif dialect == "postgresql":
+        statements = _postgres_ddl()
+    else:
+        logger.warning("Full-text search is not supported on %s; search will return nothing", dialect)
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS search_documents")
+
+
+def _has_index(connection: Connection) -> bool:
+    engine = connection.engine
+    if engine in _indexed_engines:
+        return True
+    if not sa.inspect(connection).has_table("search_documents"):
+        return False
+    _indexed_engines.add(engine)
+    return True
+
+
+# ---------- Writes ----------
+
+def index_document(
+    connection: Connection, *, kind: str, ref_id, user_id: Optional[int], title: str, body: str
+) -> None:
+    """Insert or replace the document for (kind, ref_id)."""
+    if user_id is None:
+        # Rows without an owner can never be returned by a per-user search.
+        remove_document(connection, kind=kind, ref_id=ref_id)
+        return
+    values = {"kind": kind, "ref_id": str(ref_id), "user_id": user_id, "title": title or "", "body": body or ""}
+    if connection.dialect.name == "sqlite":
+        values["owner"] = f"u{user_id}"
+    columns = ", ".join(values)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in values if name not in ("kind", "ref_id"))
+    connection.execute(
+        sa.text(
+            f"INSERT INTO search_documents ({columns}) VALUES ({', '.join(':' + name for name in values)}) "
+            f"ON CONFLICT (kind, ref_id) DO UPDATE SET {updates}"
+        ),
+        values,
+    )
+
+
+def remove_document(connection: Connection, *, kind: str, ref_id) -> None:
+    connection.execute(
+        sa.delete(_documents).where(_documents.c.kind == kind, _documents.c.ref_id == str(ref_id))
+    )
+
+
+def _changed(target, *names: str) -> bool:
+    attrs = sa.inspect(target).attrs
+    return any(attrs[name].history.has_changes() for name in names)
+
+
+def _transcript_text(connection: Connection, transcription: Transcription) -> str:
+    # transcript_text is deferred; read it through the flush connection
+    # rather than letting the ORM lazy-load in the middle of a flush.
+    loaded = sa.inspect(transcription).attrs.transcript_text.loaded_value
+    if isinstance(loaded, str):
+        return loaded
+    column = Transcription.__table__.c.transcript_text
+    return (
+        connection.execute(sa.select(column).where(Transcription.__table__.c.id == transcription.id)).scalar()
+        or ""
+    )
+
+
+def _index_transcription(connection: Connection, target: Transcription, *, inserted: bool) -> None:
+    if target.status != TranscriptionStatus.COMPLETED:
+        if not inserted and _changed(target, "status"):
+            remove_document(connection, kind=KIND_TRANSCRIPTION, ref_id=target.id)
+        return
+    if inserted or _changed(target, "status", "title", "transcript_text", "user_id"):
+        index_document(
+            connection,
+            kind=KIND_TRANSCRIPTION,
+            ref_id=target.id,
+            user_id=target.user_id,
+            title=target.title,
+            body=_transcript_text(connection, target),
+        )
+
+
+def _index_note(connection: Connection, target: Note, *, inserted: bool) -> None:
+    if inserted or _changed(target, "title", "content", "user_id"):
+        index_document(
+            connection, kind=KIND_NOTE, ref_id=target.id, user_id=target.user_id, title=target.title, body=target.content
+        )
+
+
+def _index_flashcard(connection: Connection, target: FlashCard, *, inserted: bool) -> None:
+    if inserted or _changed(target, "prompt", "answer", "user_id"):
+        index_document(
+            connection,
+            kind=KIND_FLASHCARD,
+            ref_id=target.id,
+            user_id=target.user_id,
+            title=target.prompt,
+            body=target.answer,
+        )
+
+
+def _listen(model, kind: str, index) -> None:
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        if _has_index(connection):
+            index(connection, target, inserted=True)
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        if _has_index(connection):
+            index(connection, target, inserted=False)
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        if _has_index(connection):
+            remove_document(connection, kind=kind, ref_id=target.id)
+
+
+_listen(Transcription, KIND_TRANSCRIPTION, _index_transcription)
+_listen(Note, KIND_NOTE, _index_note)
+_listen(FlashCard, KIND_FLASHCARD, _index_flashcard)
+
+
+# ---------- Queries ----------
+
+def search_terms(query: str) -> List[str]:
+    return _TERM.findall(query.lower())
+
+
+def search(
+    connection: Connection,
+    *,
+    user_id: int,
+    query: str,
+    kinds: Optional[Sequence[str]] = None,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+) -> List[SearchHit]:
+    """
+    Best matches first. Every term must match, after stemming; punctuation
+    and query operators in ``query`` are ignored.
+    """
+    terms = search_terms(query)
+    if not terms or not _has_index(connection):
+        return []
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = _search_sqlite(connection, user_id, terms, kinds, limit, offset)
+    elif dialect == "postgresql":
+        rows = _search_postgres(connection, user_id, terms, kinds, limit, offset)
+    else:
+        return []
+    return [SearchHit(row.kind, row.ref_id, row.title, row.snippet, float(row.score)) for row in rows]
+
+
+def _kind_filter(kinds: Optional[Sequence[str]], column: str):
+    if not kinds:
+        return "", {}
+    params = {f"kind_{position}": kind for position, kind in enumerate(kinds)}
+    return f" AND {column} IN ({', '.join(':' + name for name in params)})", params
+
+
+def _search_sqlite(connection, user_id, terms, kinds, limit, offset):
+    phrases = " ".join(f'"{term}"' for term in terms)
+    kind_sql, kind_params = _kind_filter(kinds, "d.kind")
+    # bm25() is lower-is-better; titles weigh four times the body, the owner
+    # column not at all.
+    return connection.execute(
+        sa.text(
+            "SELECT d.kind, d.ref_id, d.title, "
+            f"snippet(search_index, 2, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet, "
+            "-bm25(search_index, 0.0, 4.0, 1.0) AS score "
+            "FROM search_index JOIN search_documents d ON d.id = search_index.rowid "
+            f"WHERE search_index MATCH :match{kind_sql} "
+            "ORDER BY bm25(search_index, 0.0, 4.0, 1.0), d.id LIMIT :limit OFFSET :offset"
+        ),
+        {"match": f"owner:u{user_id} AND {{title body}}: ({phrases})", "limit": limit, "offset": offset, **kind_params},
+    ).all()
+
+
+def _search_postgres(connection, user_id, terms, kinds, limit, offset):
+    kind_sql, kind_params = _kind_filter(kinds, "d.kind")
+    # ts_headline re-parses the body, so it only runs for the page of hits.
+    return connection.execute(
+        sa.text(
+            "SELECT page.kind, page.ref_id, page.title, "
+            f"ts_headline('{SEARCH_TEXT_CONFIG}', page.body, page.query, "
+            f"'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=24, MinWords=8') AS snippet, "
+            "page.score FROM ("
+            "  SELECT d.id, d.kind, d.ref_id, d.title, d.body, q.query, ts_rank_cd(d.document, q.query) AS score"
+            f"  FROM search_documents d, plainto_tsquery('{SEARCH_TEXT_CONFIG}', :terms) AS q(query)"
+            f"  WHERE d.user_id = :user_id AND d.document @@ q.query{kind_sql}"
+            "  ORDER BY score DESC, d.id LIMIT :limit OFFSET :offset"
+            ") page ORDER BY page.score DESC, page.id"
+        ),
+        {"terms": " ".join(terms), "user_id": user_id, "limit": limit, "offset": offset, **kind_params},
+    ).all()
@@ -0,0 +1,179 @@
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from services.storage import get_checkpoint_dir
+from services.timeline import Transcript
+
+_NORMALIZE_REGEX = re.compile(r"[^\w']+")
+
+
+@dataclass(frozen=True)
+class AudioWindow:
+    index: int
+    start: float
+    duration: float
+
+
+class CheckpointStore:
+    """
+    Per-window transcripts (text and timings) for one transcription, kept
+    on disk so a retried job only re-runs the windows that failed.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    @classmethod
+    def for_transcription(cls, transcription_id: str) -> "CheckpointStore":
+        return cls(get_checkpoint_dir(transcription_id))
+
+    def _path(self, index: int) -> Path:
+        return self.directory / f"window-{index:04d}.json"
+
+    def load(self, index: int) -> Optional[Transcript]:
+        path = self._path(index)
+        if not path.exists():
+            return None
+        return Transcript.from_json(json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, index: int, transcript: Transcript) -> None:
+        # Write then rename so a crash never leaves a half-written checkpoint.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(index)
+        partial = path.with_suffix(".part")
+        partial.write_text(json.dumps({"index": index, **transcript.to_json()}), encoding="utf-8")
+        partial.replace(path)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def plan_windows(total_seconds: float, window_seconds: float, overlap_seconds: float) -> List[AudioWindow]:
+    if window_seconds <= overlap_seconds:
+        raise ValueError("window_seconds must be larger than overlap_seconds")
+
+    windows: List[AudioWindow] = []
+    step = window_seconds - overlap_seconds
+    start = 0.0
+    while True:
+        windows.append(AudioWindow(len(windows), start, min(window_seconds, total_seconds - start)))
+        if start + window_seconds >= total_seconds:
+            return windows
+        start += step
+
+
+def cut_window(source: Path, window: AudioWindow, destination_dir: Path) -> Path:
+    destination = destination_dir / f"window-{window.index:04d}{source.suffix}"
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-y",
+            "-ss",
+            f"{window.start:.3f}",
+            "-t",
+            f"{window.duration:.3f}",
+            "-i",
+            str(source),
+            "-vn",
+            "-c",
+            "copy",
+            str(destination),
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return destination
+
+
+def transcribe_windows(
+    source: Path,
+    windows: List[AudioWindow],
+    transcribe: Callable[[Path], Transcript],
+    checkpoints: CheckpointStore,
+    *,
+    max_concurrency: int,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Transcript]:
+    """
+    Transcribe every window that has no checkpoint yet, at most
+    ``max_concurrency`` at a time, and return the transcripts in window
+    order, with timings relative to each window's start.
+    ``on_progress(done, total)`` is called as windows finish.
+    """
+    pending = [window for window in windows if checkpoints.load(window.index) is None]
+    done = len(windows) - len(pending)
+
+    def run(window: AudioWindow, work_dir: Path) -> None:
+        clip = cut_window(source, window, work_dir)
+        try:
+            checkpoints.save(window.index, transcribe(clip))
+        finally:
+            clip.unlink(missing_ok=True)
+
+    errors: List[Exception] = []
+    if pending:
+        with tempfile.TemporaryDirectory() as work_dir, ThreadPoolExecutor(
+            max_workers=max(1, max_concurrency)
+        ) as pool:
+            futures = [pool.submit(run, window, Path(work_dir)) for window in pending]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, len(windows))
+
+    if errors:
+        raise RuntimeError(
+            f"{len(errors)} of {len(windows)} audio windows failed to transcribe: {errors[0]}"
+        ) from errors[0]
+    return [checkpoints.load(window.index) or Transcript(text="") for window in windows]
+
+
+def join_overlapping_texts(texts: List[str], *, max_overlap_words: int = 80, min_match_words: int = 3) -> str:
+    """
+    Join consecutive window transcripts, dropping the words that were spoken
+    in the overlap between two windows.
+
+    The longest run of matching words between the tail of the previous text
+    and the head of the next one is used as the splice point; words around
+    the cut are often garbled, so the match does not need to touch either edge.
+    """
+    merged: List[str] = []
+    for text in texts:
+        words = text.split()
+        if not words:
+            continue
+        if not merged:
+            merged = words
+            continue
+
+        tail = merged[-max_overlap_words:]
+        head = words[:max_overlap_words]
+        match = SequenceMatcher(
+            None, [_normalize(w) for w in tail], [_normalize(w) for w in head], autojunk=False
+        ).find_longest_match(0, len(tail), 0, len(head))
+
+        if match.size >= min_match_words:
+            keep = len(merged) - len(tail) + match.a + match.size
+            merged = merged[:keep] + words[match.b + match.size :]
+        else:
+            merged.extend(words)
+    return " ".join(merged)
+
+
+def _normalize(word: str) -> str:
+    return _NORMALIZE_REGEX.sub("", word.lower())
@@ -0,0 +1,166 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+When a class pastes the same handout into /ai/summarize within seconds,
+only the first request goes to the model; the others wait for its answer.
+Within a process, callers share one task. Across API processes the first
+caller takes a short Redis lock and publishes the answer under a result
+key that the others poll; if the leader fails or dies, the lock is released
+or expires and a waiting caller takes over. Without Redis only in-process
+coalescing applies.
+"""
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+
+from services.queue import redis_conn
+
+logger = logging.getLogger(__name__)
+
+# Longest a leader may hold the lock; longer than the slowest generation.
+SINGLE_FLIGHT_LOCK_SECONDS = float(os.getenv("SINGLE_FLIGHT_LOCK_SECONDS", "120"))
+# How long a published answer stays readable for waiting processes.
+SINGLE_FLIGHT_RESULT_SECONDS = float(os.getenv("SINGLE_FLIGHT_RESULT_SECONDS", "15"))
+SINGLE_FLIGHT_POLL_SECONDS = 0.1
+LOCK_PREFIX = "llm-flight:lock:"
+RESULT_PREFIX = "llm-flight:result:"
+# Delete the lock only if this caller still holds it.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class _RedisUnavailable(Exception):
+    pass
+
+
+@dataclass
+class SingleFlightStats:
+    upstream_calls: int = 0
+    local_joins: int = 0
+    remote_joins: int = 0
+    redis_errors: int = 0
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        redis=None,
+        *,
+        lock_seconds: float = SINGLE_FLIGHT_LOCK_SECONDS,
+        result_seconds: float = SINGLE_FLIGHT_RESULT_SECONDS,
+        poll_seconds: float = SINGLE_FLIGHT_POLL_SECONDS,
+    ):
+        self.redis = redis
+        self.lock_seconds = lock_seconds
+        self.result_seconds = result_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._stats = SingleFlightStats()
+
+    async def run(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        """
+        ``fetch()``'s answer for ``key``, shared with every concurrent caller
+        of the same key. The shared call runs in its own task, so a caller
+        that disconnects does not cancel it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._coordinated(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._count("local_joins")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieved here so a failure nobody awaited any more is not
+            # reported as "never retrieved".
+            task.exception()
+
+    async def _coordinated(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        if self.redis is None:
+            return await self._fetch(fetch)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_seconds
+        joined = False
+        try:
+            while True:
+                token = uuid4().hex
+                if await self._redis(
+                    self.redis.set, LOCK_PREFIX + key, token, nx=True, px=int(self.lock_seconds * 1000)
+                ):
+                    return await self._lead(key, token, fetch)
+                if not joined:
+                    self._count("remote_joins")
+                    joined = True
+                # Another process is asking the model; wait for its answer.
+                while loop.time() < deadline:
+                    await asyncio.sleep(self.poll_seconds)
+                    value = await self._redis(self.redis.get, RESULT_PREFIX + key)
+                    if value is not None:
+                        return value.decode("utf-8") if isinstance(value, bytes) else value
+                    if not await self._redis(self.redis.exists, LOCK_PREFIX + key):
+                        # The leader failed without an answer: try to lead.
+                        break
+                else:
+                    return await self._fetch(fetch)
+        except _RedisUnavailable:
+            return await self._fetch(fetch)
+
+    async def _lead(self, key: str, token: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        try:
+            value = await self._fetch(fetch)
+            try:
+                await self._redis(
+                    self.redis.set, RESULT_PREFIX + key, value, px=int(self.result_seconds * 1000)
+                )
+            except _RedisUnavailable:
+                pass
+            return value
+        finally:
+            try:
+                await self._redis(self.redis.eval, _RELEASE_SCRIPT, 1, LOCK_PREFIX + key, token)
+            except _RedisUnavailable:
+                # The lock expires on its own.
+                pass
+
+    async def _fetch(self, fetch: Callable[[], Awaitable[str]]) -> str:
+        self._count("upstream_calls")
+        return await fetch()
+
+    async def _redis(self, command, *args, **kwargs):
+        try:
+            return await run_in_threadpool(command, *args, **kwargs)
+        except Exception as exc:
+            logger.warning("Single-flight: Redis unavailable, coalescing in-process only", exc_info=True)
+            self._count("redis_errors")
+            raise _RedisUnavailable() from exc
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self._stats, field, getattr(self._stats, field) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**asdict(self._stats), "in_flight": len(self._inflight)}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = SingleFlightStats()
+
+
+single_flight = SingleFlight(redis=redis_conn)
@@ -1,41 +1,302 @@
+import errno
+import hashlib
 import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator, Optional
 from uuid import uuid4
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Bytes copied per read off the spooled upload. Peak memory per upload is
+# bounded by this value regardless of how large the recording is.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Where stored audio lives: "local" (MEDIA_ROOT) or "s3" (S3_BUCKET on AWS
+# or any S3-compatible endpoint, see services/s3_storage.py).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+# Bytes per read when streaming a stored object.
+READ_CHUNK_SIZE = 256 * 1024
+
+# Enough leading bytes to recognise every container we accept.
+_SNIFF_BYTES = 16
+
+_AUDIO_MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".flac": "audio/flac",
+}
 
 
 @dataclass
 class StoredFile:
-    absolute_path: Path
-    public_url: str
+    """
+    A stored recording. ``key`` locates it in the storage backend;
+    ``absolute_path`` is set when it can also be read straight from local
+    disk.
+    """
+
+    absolute_path: Optional[Path]
+    sha256: Optional[str] = None
+    size_bytes: int = 0
+    detected_format: Optional[str] = None
+    key: Optional[str] = None
+
+
+class StorageBackend:
+    """
+    Where stored audio lives, addressed by key ("transcriptions/<sha256>.wav").
+    Keys are content-addressed, so an object is never rewritten once stored.
+    """
+
+    name = "base"
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def put_file(self, source: Path, key: str) -> None:
+        """Store a finished local file under ``key``; ``source`` may be consumed."""
+        raise NotImplementedError
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Stream bytes ``start``..``end`` (inclusive; None for end of object)."""
+        raise NotImplementedError
+
+    def download(self, key: str, destination: Path) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """A path the object can be read from directly, if the backend has one."""
+        return None
+
+    def uri(self, key: str) -> str:
+        raise NotImplementedError
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        """
+        A local file holding the object for the duration of the block.
+        Backends without local files download into a temporary directory.
+        """
+        path = self.local_path(key)
+        if path is not None:
+            if not path.exists():
+                raise FileNotFoundError(f"Stored audio not found at {path}")
+            yield path
+            return
+        with tempfile.TemporaryDirectory(prefix="audio-") as work_dir:
+            destination = Path(work_dir) / Path(key).name
+            self.download(key, destination)
+            yield destination
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under a root directory (MEDIA_ROOT)."""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def put_file(self, source: Path, key: str) -> None:
+        destination = self._path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists():
+            source.unlink(missing_ok=True)
+            return
+        try:
+            os.replace(source, destination)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            # Scratch files from another filesystem are copied next to the
+            # destination first, so readers never see a partial file.
+            partial = destination.with_name(f".{destination.name}.{uuid4().hex}.part")
+            try:
+                shutil.copyfile(source, partial)
+                os.replace(partial, destination)
+            finally:
+                partial.unlink(missing_ok=True)
+            source.unlink(missing_ok=True)
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with self._path(key).open("rb") as stored:
+            stored.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = stored.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
 
+    def download(self, key: str, destination: Path) -> None:
+        shutil.copyfile(self._path(key), destination)
 
-def _get_media_root() -> Path:
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def uri(self, key: str) -> str:
+        return str(self._path(key))
+
+
+_s3_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    global _s3_storage
+    if STORAGE_BACKEND == "s3":
+        if _s3_storage is None:
+            from services.s3_storage import S3Storage
+
+            _s3_storage = S3Storage.from_env()
+        return _s3_storage
+    return LocalStorage(get_media_root())
+
+
+def audio_media_type(path: Path) -> str:
+    return _AUDIO_MEDIA_TYPES.get(path.suffix.lower(), "application/octet-stream")
+
+
+def audio_key(sha256: str, extension: str) -> str:
+    return f"transcriptions/{sha256}{extension}"
+
+
+def get_media_root() -> Path:
     root = Path(os.getenv("MEDIA_ROOT", "media"))
     root.mkdir(parents=True, exist_ok=True)
     return root
 
 
 def _get_transcription_dir() -> Path:
-    directory = _get_media_root() / "transcriptions"
+    directory = get_media_root() / "transcriptions"
     directory.mkdir(parents=True, exist_ok=True)
     return directory
 
 
+def get_checkpoint_dir(transcription_id: str) -> Path:
+    return get_media_root() / "checkpoints" / transcription_id
+
+
+def sniff_audio_format(header: bytes) -> Optional[str]:
+    """
+    Identify an audio container from its leading magic bytes.
+    """
+    if len(header) >= 12 and header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if len(header) >= 8 and header[4:8] == b"ftyp":
+        return "m4a"
+    if header[:3] == b"ID3":
+        return "mp3"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if len(header) >= 2 and header[0] == 0xFF:
+        # ADTS AAC sets layer bits to 00; MPEG audio frames use 01/10/11.
+        if header[1] & 0xF6 == 0xF0:
+            return "aac"
+        if header[1] & 0xE0 == 0xE0:
+            return "mp3"
+    return None
+
+
 async def store_audio_file(upload: UploadFile, user_id: int) -> StoredFile:
     """
-    Persist an uploaded audio file locally so it can be processed later.
+    Spool an upload and hand it to the storage backend. Callers that need to
+    inspect the file before it is stored use ``spool_upload`` and
+    ``persist_upload`` directly.
+    """
+    spooled = await spool_upload(upload, user_id)
+    try:
+        return await run_in_threadpool(persist_upload, spooled)
+    finally:
+        discard_spool(spooled)
+
+
+async def spool_upload(upload: UploadFile, user_id: int) -> StoredFile:
+    """
+    Copy an upload to a local spool file in ``UPLOAD_CHUNK_SIZE`` pieces
+    while a running SHA-256, byte count and format sniff are computed, so
+    callers never need to read the file back.
     """
     extension = Path(upload.filename or "").suffix.lower() or ".wav"
-    random_segment = uuid4().hex[:8]
-    destination = _get_transcription_dir() / f"user-{user_id}-{random_segment}{extension}"
+    # Next to the local store so persisting is a rename on the same disk.
+    partial = _get_transcription_dir() / f".upload-{user_id}-{uuid4().hex}.part"
+
+    digest = hashlib.sha256()
+    size_bytes = 0
+    header = b""
+
+    try:
+        with partial.open("wb") as out_file:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(header) < _SNIFF_BYTES:
+                    header += chunk[: _SNIFF_BYTES - len(header)]
+                digest.update(chunk)
+                size_bytes += len(chunk)
+                out_file.write(chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    sha256 = digest.hexdigest()
+    return StoredFile(
+        absolute_path=partial,
+        sha256=sha256,
+        size_bytes=size_bytes,
+        detected_format=sniff_audio_format(header),
+        key=audio_key(sha256, extension),
+    )
 
-    with destination.open("wb") as out_file:
-        contents = await upload.read()
-        out_file.write(contents)
 
-    public_url = f"/media/transcriptions/{destination.name}"
-    return StoredFile(absolute_path=destination, public_url=public_url)
+def persist_upload(spooled: StoredFile, storage: Optional[StorageBackend] = None) -> StoredFile:
+    """
+    Store a spooled upload under its content-hash key. Identical recordings
+    share a single stored object. Blocking: uploads to S3 happen here.
+    """
+    storage = storage or get_storage()
+    if storage.exists(spooled.key):
+        discard_spool(spooled)
+    else:
+        storage.put_file(spooled.absolute_path, spooled.key)
+    return StoredFile(
+        absolute_path=storage.local_path(spooled.key),
+        sha256=spooled.sha256,
+        size_bytes=spooled.size_bytes,
+        detected_format=spooled.detected_format,
+        key=spooled.key,
+    )
+
 
+def discard_spool(spooled: StoredFile) -> None:
+    spooled.absolute_path.unlink(missing_ok=True)
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from services.chunking import estimate_tokens, split_by_token_budget
+
+
+def map_reduce_summary(
+    text: str,
+    *,
+    summarize_chunk: Callable[[str], str],
+    reduce_summaries: Callable[[str], str],
+    chunk_tokens: int,
+    max_concurrency: int,
+) -> str:
+    """
+    Summarize text that may not fit in one prompt.
+
+    The text is split by ``chunk_tokens``, each chunk is condensed with
+    ``summarize_chunk`` concurrently, and the partial summaries are folded
+    again until they fit in a single ``reduce_summaries`` call. Text that
+    already fits goes straight to ``reduce_summaries``.
+    """
+    chunks = split_by_token_budget(text, chunk_tokens)
+    if not chunks:
+        return ""
+
+    while len(chunks) > 1:
+        partials = _map_concurrently(summarize_chunk, chunks, max_concurrency)
+        combined = "\n\n".join(p.strip() for p in partials if p and p.strip())
+        if estimate_tokens(combined) <= chunk_tokens:
+            chunks = [combined]
+            break
+        next_chunks = split_by_token_budget(combined, chunk_tokens)
+        if len(next_chunks) >= len(chunks):
+            # Partial summaries are not getting shorter; stop folding.
+            chunks = [combined]
+            break
+        chunks = next_chunks
+
+    return reduce_summaries(chunks[0])
+
+
+def _map_concurrently(fn: Callable[[str], str], items: List[str], max_concurrency: int) -> List[str]:
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as pool:
+        return list(pool.map(fn, items))
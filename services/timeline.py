@@ -0,0 +1,127 @@
+import struct
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from services.segments import AudioWindow
+
+
+@dataclass(frozen=True)
+class TimedWord:
+    start: float
+    end: float
+    word: str
+
+
+@dataclass(frozen=True)
+class TimedSegment:
+    start: float
+    end: float
+    text: str
+    words: Tuple[TimedWord, ...] = ()
+
+
+@dataclass
+class Transcript:
+    """Transcript text plus segment and word timings, in seconds."""
+
+    text: str
+    segments: List[TimedSegment] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        return {
+            "text": self.text,
+            "segments": [
+                [s.start, s.end, s.text, [[w.start, w.end, w.word] for w in s.words]] for s in self.segments
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Transcript":
+        return cls(
+            text=data.get("text", ""),
+            segments=[
+                TimedSegment(start, end, text, tuple(TimedWord(*word) for word in words))
+                for start, end, text, words in data.get("segments", [])
+            ],
+        )
+
+
+def _field(item, name: str, default=None):
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def transcript_from_response(response) -> Transcript:
+    """
+    Build a Transcript from a Whisper ``verbose_json`` response. The API
+    returns words in a flat list next to the segments; each word is assigned
+    to the segment it starts in. Plain-text responses give no segments.
+    """
+    words = [
+        TimedWord(float(_field(w, "start")), float(_field(w, "end")), str(_field(w, "word")).strip())
+        for w in _field(response, "words") or []
+    ]
+    segments: List[TimedSegment] = []
+    next_word = 0
+    raw_segments = list(_field(response, "segments") or [])
+    for position, raw in enumerate(raw_segments):
+        start, end = float(_field(raw, "start")), float(_field(raw, "end"))
+        is_last = position == len(raw_segments) - 1
+        first_word = next_word
+        while next_word < len(words) and (is_last or words[next_word].start < end):
+            next_word += 1
+        segments.append(
+            TimedSegment(start, end, str(_field(raw, "text", "")).strip(), tuple(words[first_word:next_word]))
+        )
+    return Transcript(text=_field(response, "text", "") or "", segments=segments)
+
+
+def shift_segment(segment: TimedSegment, mapper: Callable[[float], float]) -> TimedSegment:
+    return replace(
+        segment,
+        start=mapper(segment.start),
+        end=mapper(segment.end),
+        words=tuple(replace(w, start=mapper(w.start), end=mapper(w.end)) for w in segment.words),
+    )
+
+
+def merge_window_segments(windows: Sequence["AudioWindow"], transcripts: Sequence[Transcript]) -> List[TimedSegment]:
+    """
+    Put per-window segments on one timeline. Window timings are relative to
+    the window start; where two windows overlap, each segment is kept by the
+    window whose half of the overlap holds the segment's midpoint.
+    """
+    merged: List[TimedSegment] = []
+    for position, (window, transcript) in enumerate(zip(windows, transcripts)):
+        lower = 0.0
+        if position > 0:
+            previous = windows[position - 1]
+            lower = (window.start + previous.start + previous.duration) / 2
+        upper = float("inf")
+        if position + 1 < len(windows):
+            following = windows[position + 1]
+            upper = (following.start + window.start + window.duration) / 2
+
+        for segment in transcript.segments:
+            shifted = shift_segment(segment, lambda seconds: seconds + window.start)
+            midpoint = (shifted.start + shifted.end) / 2
+            if lower <= midpoint < upper:
+                merged.append(shifted)
+    return merged
+
+
+def pack_word_times(words: Sequence[TimedWord]) -> bytes:
+    """Word start/end times as interleaved little-endian uint32 milliseconds."""
+    times = [ms for word in words for ms in (to_ms(word.start), to_ms(word.end))]
+    return struct.pack(f"<{len(times)}I", *times)
+
+
+def unpack_word_times(data: bytes) -> List[Tuple[int, int]]:
+    times = struct.unpack(f"<{len(data or b'') // 4}I", data or b"")
+    return list(zip(times[0::2], times[1::2]))
+
+
+def to_ms(seconds: float) -> int:
+    return max(0, int(round(seconds * 1000)))
@@ -0,0 +1,198 @@
+import bisect
+import os
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from services.audio import NORMALIZED_SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# Frames converted to float at a time; keeps memory flat for long lectures.
+_BLOCK_FRAMES = 10_000
+# Frames quieter than this are always silence, whatever the noise floor.
+SILENCE_FLOOR_DB = -55.0
+# Frames louder than this are never silence, so quiet speakers survive
+# recordings that have no real pauses.
+SILENCE_CEILING_DB = -35.0
+
+
+@dataclass
+class TimeOffsetMap:
+    """
+    Maps times in trimmed audio back to the original recording.
+
+    ``spans`` holds ``(trimmed_start, original_start, duration)`` for every
+    stretch of audio that was kept, in order.
+    """
+
+    spans: List[Tuple[float, float, float]] = field(default_factory=list)
+
+    def to_original(self, seconds: float) -> float:
+        if not self.spans:
+            return seconds
+        starts = [span[0] for span in self.spans]
+        index = max(0, bisect.bisect_right(starts, seconds) - 1)
+        trimmed_start, original_start, duration = self.spans[index]
+        return original_start + min(max(seconds - trimmed_start, 0.0), duration)
+
+    def to_json(self) -> List[List[float]]:
+        return [[round(value, 3) for value in span] for span in self.spans]
+
+    @classmethod
+    def from_json(cls, data) -> "TimeOffsetMap":
+        return cls([tuple(span) for span in data or []])
+
+
+@dataclass
+class TrimResult:
+    path: Path
+    original_seconds: float
+    trimmed_seconds: float
+    offset_map: TimeOffsetMap
+
+    @property
+    def trimmed_percent(self) -> float:
+        if not self.original_seconds:
+            return 0.0
+        return 100.0 * (1 - self.trimmed_seconds / self.original_seconds)
+
+
+def decode_pcm(source: Path, destination: Path, sample_rate: int = NORMALIZED_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode ``source`` to raw mono 16-bit PCM on disk and return it memory
+    mapped, so a two-hour lecture never has to fit in RAM.
+    """
+    with destination.open("wb") as raw:
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", str(source), "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+            stdout=raw,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    if destination.stat().st_size < 2:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(destination, dtype=np.int16, mode="r")
+
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    RMS level of each complete frame in dBFS, vectorized per block of frames.
+    """
+    frame_count = len(samples) // frame_length
+    energy = np.empty(frame_count)
+    for first in range(0, frame_count, _BLOCK_FRAMES):
+        last = min(first + _BLOCK_FRAMES, frame_count)
+        frames = np.asarray(samples[first * frame_length : last * frame_length], dtype=np.float32)
+        frames = frames.reshape(last - first, frame_length) / 32768.0
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        energy[first:last] = 20 * np.log10(np.maximum(rms, 1e-10))
+    return energy
+
+
+def find_speech_spans(
+    samples: np.ndarray,
+    sample_rate: int,
+    *,
+    min_silence_seconds: float,
+    keep_silence_seconds: float,
+    margin_db: float,
+) -> List[Tuple[int, int]]:
+    """
+    Return ``(start_sample, end_sample)`` ranges to keep. Silent runs longer
+    than ``min_silence_seconds`` are cut down to ``keep_silence_seconds``,
+    half kept on each side so words are not clipped.
+    """
+    frame_length = int(sample_rate * FRAME_SECONDS)
+    energy = frame_energy_db(samples, frame_length)
+    if energy.size == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    # Adaptive threshold: a margin above the quietest tenth of the recording.
+    threshold = float(np.percentile(energy, 10)) + margin_db
+    threshold = min(max(threshold, SILENCE_FLOOR_DB), SILENCE_CEILING_DB)
+    silent = energy < threshold
+
+    # Run-length encode the silent mask to find silent stretches.
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    run_starts, run_ends = edges[0::2], edges[1::2]
+    min_frames = int(np.ceil(min_silence_seconds / FRAME_SECONDS))
+    pad = int(keep_silence_seconds / 2 * sample_rate)
+
+    spans: List[Tuple[int, int]] = []
+    cursor = 0
+    for start, end in zip(run_starts, run_ends):
+        if end - start < min_frames:
+            continue
+        cut_start = start * frame_length + pad
+        cut_end = min(end * frame_length, len(samples)) - pad
+        if cut_end <= cut_start:
+            continue
+        if cut_start > cursor:
+            spans.append((cursor, cut_start))
+        cursor = cut_end
+    if cursor < len(samples):
+        spans.append((cursor, len(samples)))
+    return spans
+
+
+def trim_silence(
+    source: Path,
+    destination: Path,
+    *,
+    min_silence_seconds: float,
+    keep_silence_seconds: float,
+    margin_db: float,
+) -> TrimResult:
+    """
+    Decode ``source``, drop long silent stretches and write the remaining
+    speech to ``destination`` as mono 16 kHz WAV. The file is written under
+    a temporary name and renamed into place. The returned offset map
+    converts timestamps in the trimmed audio back to the original.
+    """
+    sample_rate = NORMALIZED_SAMPLE_RATE
+    partial = destination.with_name(f".{destination.name}.{uuid4().hex}.part")
+    block_samples = _BLOCK_FRAMES * int(sample_rate * FRAME_SECONDS)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        samples = decode_pcm(source, Path(work_dir) / "pcm.raw", sample_rate)
+        spans = find_speech_spans(
+            samples,
+            sample_rate,
+            min_silence_seconds=min_silence_seconds,
+            keep_silence_seconds=keep_silence_seconds,
+            margin_db=margin_db,
+        )
+
+        offset_spans = []
+        trimmed_samples = 0
+        try:
+            with wave.open(str(partial), "wb") as out:
+                out.setnchannels(1)
+                out.setsampwidth(2)
+                out.setframerate(sample_rate)
+                for start, end in spans:
+                    offset_spans.append(
+                        (trimmed_samples / sample_rate, start / sample_rate, (end - start) / sample_rate)
+                    )
+                    trimmed_samples += end - start
+                    for block_start in range(start, end, block_samples):
+                        block = samples[block_start : min(block_start + block_samples, end)]
+                        out.writeframes(np.asarray(block, dtype="<i2").tobytes())
+            os.replace(partial, destination)
+        finally:
+            partial.unlink(missing_ok=True)
+        original_samples = len(samples)
+        del samples
+
+    return TrimResult(
+        path=destination,
+        original_seconds=original_samples / sample_rate,
+        trimmed_seconds=trimmed_samples / sample_rate,
+        offset_map=TimeOffsetMap(offset_spans),
+    )
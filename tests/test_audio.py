@@ -0,0 +1,68 @@
+import struct
+import wave
+
+import pytest
+
+from services import audio
+
+
+def test_probe_wav_duration(tmp_path):
+    path = tmp_path / "clip.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(b"\x00\x00\x00\x00" * 44100 * 3)
+
+    assert audio.probe_duration_seconds(path) == pytest.approx(3.0)
+
+
+def test_probe_cbr_mp3_duration(tmp_path):
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417 bytes per frame.
+    frame = b"\xff\xfb\x90\x00" + b"\x00" * 413
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10 + frame * 300)
+
+    assert audio.probe_duration_seconds(path) == pytest.approx(300 * 417 * 8 / 128000)
+
+
+def test_probe_xing_mp3_duration(tmp_path):
+    xing = b"Xing" + struct.pack(">II", 0x1, 1000)
+    frame = b"\xff\xfb\x90\x00" + b"\x00" * 32 + xing
+    path = tmp_path / "vbr.mp3"
+    path.write_bytes(frame + b"\x00" * 4000)
+
+    assert audio.probe_duration_seconds(path) == pytest.approx(1000 * 1152 / 44100)
+
+
+def test_probe_m4a_duration_with_trailing_moov(tmp_path):
+    def atom(kind: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+    mvhd = atom(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">IIII", 0, 0, 1000, 95_500) + b"\x00" * 80)
+    path = tmp_path / "clip.m4a"
+    path.write_bytes(atom(b"ftyp", b"M4A \x00\x00\x00\x00") + atom(b"mdat", b"\x00" * 5000) + atom(b"moov", mvhd))
+
+    assert audio.probe_duration_seconds(path) == pytest.approx(95.5)
+
+
+def test_probe_falls_back_to_ffprobe_for_unknown_formats(tmp_path, monkeypatch):
+    path = tmp_path / "clip.ogg"
+    path.write_bytes(b"OggS" + b"\x00" * 100)
+    monkeypatch.setattr(audio, "_ffprobe_duration_seconds", lambda p: 12.0)
+
+    assert audio.probe_duration_seconds(path) == 12.0
+
+
+def test_normalize_reuses_cached_artifact(tmp_path, monkeypatch):
+    source = tmp_path / "abc.wav"
+    source.write_bytes(b"RIFF")
+    cached = audio.normalized_path(source, "opus")
+    cached.write_bytes(b"OggS compact")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("ffmpeg should not run for a cached artifact")
+
+    monkeypatch.setattr(audio.subprocess, "run", fail)
+
+    assert audio.normalize_for_transcription(source, "opus") == tmp_path / "abc.16k.ogg"
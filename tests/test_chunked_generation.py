@@ -0,0 +1,143 @@
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from Routes import ai
+from services import hf_client
+from services.chunked_generation import generate_in_chunks
+from services.chunking import allocate_quota, estimate_tokens
+from services.llm_cache import llm_cache
+from services.single_flight import single_flight
+
+
+def _lecture(paragraphs, sentences=40):
+    return " ".join(
+        f"Topic {p} sentence {s} explains part {s} of subject {p}." for p in range(paragraphs) for s in range(sentences)
+    )
+
+
+def test_quota_follows_chunk_size_and_adds_up():
+    chunks = ["word " * 300, "word " * 100, "word " * 100, "x"]
+    quotas = allocate_quota(10, chunks)
+    assert sum(quotas) == 10
+    assert quotas[0] > quotas[1] and quotas[1] == quotas[2]
+    assert quotas[3] == 0
+    assert allocate_quota(0, chunks) == [0, 0, 0, 0]
+    assert allocate_quota(3, []) == []
+
+
+def _run(text, total, generate_chunk, **options):
+    settings = {"chunk_tokens": 400, "max_items_per_chunk": 5, "max_concurrency": 2, "min_chunk_tokens": 50}
+    settings.update(options)
+    return asyncio.run(
+        generate_in_chunks(text, total, generate_chunk=generate_chunk, item_key=lambda item: item, **settings)
+    )
+
+
+def test_chunks_run_concurrently_up_to_the_cap_and_merge_in_order():
+    text = _lecture(6)
+    in_flight, peak, counts = 0, 0, []
+
+    async def generate_chunk(chunk, count):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        counts.append(count)
+        first = re.search(r"Topic (\d+) sentence (\d+)", chunk).groups()
+        return [f"Q {first[0]}.{first[1]} #{i}" for i in range(count)]
+
+    items = _run(text, 12, generate_chunk)
+
+    assert len(counts) > 2 and sum(counts) == 12
+    assert max(counts) <= 5
+    assert peak == 2
+    assert len(items) == 12
+    # In text order, whatever order the chunks finished in.
+    assert items == sorted(items, key=lambda item: tuple(int(n) for n in re.findall(r"\d+", item)))
+
+
+def test_duplicates_across_chunks_are_dropped_and_the_total_is_kept():
+    async def generate_chunk(chunk, count):
+        return ["What is entropy?", "what is  ENTROPY"] + [f"{chunk[:20]} {i}" for i in range(count)]
+
+    items = _run(_lecture(4), 6, generate_chunk)
+    assert items[0] == "What is entropy?"
+    assert sum(item.lower().startswith("what is") for item in items) == 1
+    assert len(items) == 6
+
+
+def test_short_texts_are_not_split_into_fragments():
+    calls = []
+
+    async def generate_chunk(chunk, count):
+        calls.append((chunk, count))
+        return [f"card {i}" for i in range(count)]
+
+    text = "Photosynthesis turns light into chemical energy."
+    assert estimate_tokens(text) < 50
+    assert len(_run(text, 20, generate_chunk)) == 20
+    assert calls == [(text, 20)]
+
+
+def test_a_failed_chunk_only_loses_its_own_items():
+    calls = []
+
+    async def generate_chunk(chunk, count):
+        calls.append(count)
+        if len(calls) == 1:
+            raise RuntimeError("upstream 503")
+        return [f"{chunk[:30]} {i}" for i in range(count)]
+
+    items = _run(_lecture(4), 8, generate_chunk, max_concurrency=1)
+    assert len(calls) > 1
+    assert len(items) == 8 - calls[0]
+
+
+def test_every_chunk_failing_raises():
+    async def generate_chunk(chunk, count):
+        raise RuntimeError("upstream 503")
+
+    with pytest.raises(RuntimeError):
+        _run(_lecture(4), 8, generate_chunk)
+
+
+def test_long_transcript_quiz_is_generated_per_chunk_and_saved(monkeypatch):
+    prompts = []
+
+    async def router(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        prompts.append(prompt)
+        count = int(re.search(r"Generate (\d+) multiple-choice", prompt).group(1))
+        start = re.search(r"Topic (\d+) sentence (\d+)", prompt).group(0)
+        questions = [
+            {"question": f"{start}, question {i}?", "options": ["a", "b", "c", "d"], "correct_index": i % 4}
+            for i in range(count)
+        ]
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(questions)}}]})
+
+    monkeypatch.setattr(hf_client, "_hf_client", httpx.AsyncClient(transport=httpx.MockTransport(router)))
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+    monkeypatch.setattr(ai, "AI_CHUNK_TOKENS", 400)
+    monkeypatch.setattr(single_flight, "redis", None)
+    llm_cache.clear()
+
+    from main import app
+
+    response = TestClient(app).post(
+        "/ai/generate-quiz?user_id=1", json={"text": _lecture(8), "num_questions": 15, "fresh": True}
+    )
+
+    assert response.status_code == 200
+    questions = response.json()["questions"]
+    assert len(questions) == 15
+    assert len(prompts) > 1
+    assert questions[0]["question"].startswith("Topic 0 sentence 0,")
+    assert len({q["question"] for q in questions}) == 15
+    llm_cache.clear()
+    asyncio.run(hf_client.close_hf_client())
@@ -0,0 +1,149 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from Routes import ai
+from services import hf_client
+from services.circuit_breaker import CircuitBreaker, CircuitOpen, circuit_breaker
+from services.llm_cache import llm_cache
+from services.rate_limiter import rate_limiter
+from services.single_flight import single_flight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _failed(outcome):
+    return isinstance(outcome, Exception)
+
+
+async def _ok():
+    return "ok"
+
+
+async def _down():
+    raise httpx.ConnectTimeout("router unreachable")
+
+
+def test_breaker_opens_fails_fast_and_probes_once_when_half_open():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=30, clock=clock)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectTimeout):
+                await breaker.call(_down, is_failure=_failed)
+        assert breaker.state == "open"
+        clock.now = 10
+        with pytest.raises(CircuitOpen) as rejected:
+            await breaker.call(_ok, is_failure=_failed)
+        assert rejected.value.retry_after == 20
+
+        # Half-open: one probe goes through, the others are turned away.
+        clock.now = 31
+        probe_started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_probe():
+            probe_started.set()
+            await release.wait()
+            raise httpx.ReadTimeout("still down")
+
+        probe = asyncio.ensure_future(breaker.call(slow_probe, is_failure=_failed))
+        await probe_started.wait()
+        with pytest.raises(CircuitOpen) as during_probe:
+            breaker.check()
+        assert during_probe.value.state == "half_open"
+        release.set()
+        with pytest.raises(httpx.ReadTimeout):
+            await probe
+        # The failed probe reopened the circuit for another period.
+        assert breaker.state == "open"
+
+        clock.now = 62
+        assert await breaker.call(_ok, is_failure=_failed) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+    stats = breaker.stats()
+    assert (stats["opened"], stats["failures"], stats["successes"], stats["rejected"]) == (2, 4, 1, 2)
+
+
+def test_successes_reset_the_failure_count_and_cancellations_do_not_count():
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=30)
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    async def scenario():
+        for send in (_down, _ok, _down, cancelled):
+            try:
+                await breaker.call(send, is_failure=_failed)
+            except (httpx.ConnectTimeout, asyncio.CancelledError):
+                pass
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
+    assert breaker.stats()["consecutive_failures"] == 1
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    state = {"calls": 0, "response": None}
+
+    def router(request: httpx.Request) -> httpx.Response:
+        state["calls"] += 1
+        if state["response"] is None:
+            raise httpx.ReadTimeout("router did not answer", request=request)
+        return state["response"]
+
+    monkeypatch.setattr(hf_client, "_hf_client", httpx.AsyncClient(transport=httpx.MockTransport(router)))
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+    monkeypatch.setattr(single_flight, "redis", None)
+    monkeypatch.setattr(circuit_breaker, "failure_threshold", 2)
+    circuit_breaker.reset()
+    rate_limiter.reset()
+    llm_cache.clear()
+    yield state
+    circuit_breaker.reset()
+    llm_cache.clear()
+    asyncio.run(hf_client.close_hf_client())
+
+
+def test_an_outage_is_answered_with_a_structured_retry_after(upstream):
+    from main import app
+
+    client = TestClient(app, raise_server_exceptions=False)
+    for i in range(2):
+        assert client.post("/ai/summarize", json={"text": f"Lecture {i}"}).status_code == 500
+
+    response = client.post("/ai/summarize/stream", json={"text": "Lecture 3"})
+    assert response.status_code == 503
+    retry_after = int(response.headers["Retry-After"])
+    assert 0 < retry_after <= circuit_breaker.open_seconds
+    assert response.json()["detail"] == {"error": "upstream_unavailable", "retry_after": retry_after, "circuit": "open"}
+    assert upstream["calls"] == 2
+
+    stats = client.get("/ai/upstream/stats").json()
+    assert stats["circuit_breaker"]["state"] == "open"
+    assert stats["circuit_breaker"]["rejected"] == 1
+    assert stats["rate_limiter"]["admitted"] == 2
+
+
+def test_provider_429s_keep_their_retry_after(upstream):
+    from main import app
+
+    upstream["response"] = httpx.Response(429, headers={"Retry-After": "7"}, text="Too many requests")
+    response = TestClient(app).post("/ai/summarize", json={"text": "Lecture"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["detail"]["error"] == "upstream_rate_limited"
+    # The provider is up; 429s do not trip the breaker.
+    assert circuit_breaker.stats()["consecutive_failures"] == 0
@@ -0,0 +1,46 @@
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Transcription
+from db.types import RAW_UTF8, ZLIB_UTF8, decode_text, encode_text
+from workers import compress_text
+
+LECTURE = "Today we cover the second law of thermodynamics. " * 200
+
+
+def test_encode_round_trips_and_only_compresses_when_it_helps():
+    packed = encode_text(LECTURE)
+    assert packed[0] == ZLIB_UTF8
+    assert len(packed) < len(LECTURE) / 10
+    assert decode_text(packed) == LECTURE
+
+    short = encode_text("Short summary.")
+    assert short[0] == RAW_UTF8
+    assert decode_text(short) == "Short summary."
+    assert decode_text(encode_text("")) == ""
+    assert encode_text(None) is None
+
+
+def test_backfill_compresses_legacy_rows_once(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'text.db'}")
+    Transcription.__table__.create(engine)
+    with engine.begin() as connection:
+        # A value written as plain TEXT before the column was compressed.
+        connection.execute(
+            sa.text(
+                "INSERT INTO transcriptions (id, user_id, title, audio_url, audio_path, status, attempts, "
+                "transcript_text, summary_text) VALUES ('legacy', 1, 't', 'u', 'p', 'COMPLETED', 0, :text, 'Short')"
+            ),
+            {"text": LECTURE},
+        )
+    session_factory = sessionmaker(bind=engine)
+
+    report = compress_text.backfill(session_factory, batch_size=1)
+
+    assert (report.rows_scanned, report.rows_rewritten) == (1, 1)
+    assert report.ratio > 10
+    db = session_factory()
+    row = db.get(Transcription, "legacy")
+    assert (row.transcript_text, row.summary_text) == (LECTURE, "Short")
+    db.close()
+    assert compress_text.backfill(session_factory).rows_rewritten == 0
@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from Routes import ai
+from services import hf_client
+
+
+def test_ai_routes_share_one_pooled_client(monkeypatch):
+    seen = []
+
+    def router(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        content = "- Entropy rises" if json.loads(request.content)["max_tokens"] == 256 else "[]"
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(router))
+    monkeypatch.setattr(hf_client, "_hf_client", shared)
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+
+    from main import app
+
+    # Not entered as a context manager: the lifespan would drain the local
+    # executor other tests share.
+    client = TestClient(app)
+    for text in ("Entropy of a closed system.", "Entropy of an isolated system."):
+        response = client.post("/ai/summarize", json={"text": text})
+        assert response.json() == {"summary": "- Entropy rises"}
+    assert hf_client.get_hf_client() is shared
+    # The model returned no cards, so nothing is saved.
+    assert client.post("/ai/generate-flashcards?user_id=1", json={"text": "t"}).status_code == 500
+
+    assert len(seen) == 3
+    assert seen[0].headers["authorization"] == "Bearer test-token"
+    timeouts = [request.extensions["timeout"] for request in seen]
+    assert timeouts[0]["read"] == hf_client.HF_SUMMARIZE_TIMEOUT_SECONDS
+    assert timeouts[2]["read"] == hf_client.HF_GENERATE_TIMEOUT_SECONDS
+    assert timeouts[0]["connect"] == hf_client.HF_CONNECT_TIMEOUT_SECONDS
+
+    # What the lifespan runs on shutdown.
+    asyncio.run(hf_client.close_hf_client())
+    assert shared.is_closed and hf_client._hf_client is None
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Transcription, TranscriptionStatus
+from services import leases
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}")
+    Transcription.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _row(db, status, *, attempts=1, lease_expires_at=None, next_attempt_at=None, owner=None):
+    row = Transcription(
+        user_id=1,
+        title="Lecture",
+        audio_url="/media/x.wav",
+        audio_path="/tmp/x.wav",
+        status=status,
+        attempts=attempts,
+        lease_owner=owner,
+        lease_expires_at=lease_expires_at,
+        next_attempt_at=next_attempt_at,
+    )
+    db.add(row)
+    db.commit()
+    return row.id
+
+
+def test_reaper_requeues_with_backoff_then_fails(db):
+    now = datetime.utcnow()
+    expired = now - timedelta(seconds=1)
+    retry_id = _row(db, TranscriptionStatus.PROCESSING, attempts=2, lease_expires_at=expired)
+    exhausted_id = _row(db, TranscriptionStatus.PROCESSING, attempts=leases.MAX_ATTEMPTS, lease_expires_at=expired)
+    alive_id = _row(db, TranscriptionStatus.PROCESSING, lease_expires_at=now + timedelta(seconds=60))
+
+    requeued, failed = leases.reap_expired_leases(db, now=now)
+
+    assert requeued == [(retry_id, 1)]
+    assert failed == [(exhausted_id, 1)]
+    retry = db.get(Transcription, retry_id)
+    assert retry.status == TranscriptionStatus.PENDING
+    assert retry.next_attempt_at == now + leases.retry_delay(2)
+    assert db.get(Transcription, exhausted_id).status == TranscriptionStatus.FAILED
+    assert db.get(Transcription, alive_id).status == TranscriptionStatus.PROCESSING
+
+
+def test_reaper_reclaims_stale_rows_that_never_had_a_lease(db):
+    now = datetime.utcnow()
+    stale_id = _row(db, TranscriptionStatus.PROCESSING, attempts=0)
+    fresh_id = _row(db, TranscriptionStatus.PROCESSING, attempts=0)
+    db.get(Transcription, stale_id).updated_at = now - timedelta(seconds=leases.UNLEASED_STALE_SECONDS + 60)
+    db.get(Transcription, fresh_id).updated_at = now
+    db.commit()
+
+    requeued, failed = leases.reap_expired_leases(db, now=now)
+
+    assert requeued == [(stale_id, 1)]
+    assert failed == []
+    assert db.get(Transcription, fresh_id).status == TranscriptionStatus.PROCESSING
+
+
+def test_claim_due_retries_hands_each_retry_out_once(db):
+    now = datetime.utcnow()
+    due_id = _row(db, TranscriptionStatus.PENDING, next_attempt_at=now - timedelta(seconds=1))
+    _row(db, TranscriptionStatus.PENDING, next_attempt_at=now + timedelta(minutes=5))
+    _row(db, TranscriptionStatus.PENDING)
+
+    assert [row[0] for row in leases.claim_due_retries(db, now=now)] == [due_id]
+    assert leases.claim_due_retries(db, now=now) == []
+
+
+def test_lease_keeper_renews_only_its_own_lease(db):
+    session_factory = sessionmaker(bind=db.get_bind())
+    transcription_id = _row(
+        db, TranscriptionStatus.PROCESSING, owner="worker-a", lease_expires_at=datetime.utcnow()
+    )
+
+    assert leases.LeaseKeeper(transcription_id, "worker-a", session_factory).renew()
+    assert not leases.LeaseKeeper(transcription_id, "worker-b", session_factory).renew()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from Routes import ai
+from services import hf_client
+from services.llm_cache import LLMCache, cache_key, llm_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.down = False
+
+    def get(self, key):
+        if self.down:
+            raise ConnectionError("redis is down")
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        if self.down:
+            raise ConnectionError("redis is down")
+        self.values[key] = value.encode("utf-8")
+
+
+def test_key_covers_the_fields_that_change_the_answer():
+    payload = {"model": "m", "messages": [{"role": "user", "content": "x"}], "temperature": 0.4, "max_tokens": 256}
+    assert cache_key(payload) == cache_key({**payload, "stream": False})
+    for field, value in (("model", "n"), ("temperature", 0.3), ("max_tokens", 512), ("messages", [])):
+        assert cache_key({**payload, field: value}) != cache_key(payload)
+
+
+def test_lru_evicts_least_recently_used_and_entries_expire():
+    now = [0.0]
+    cache = LLMCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+
+    async def scenario():
+        await cache.set("a", "A")
+        await cache.set("b", "B")
+        assert await cache.get("a") == "A"
+        await cache.set("c", "C")  # evicts b, the least recently used
+        assert await cache.get("b") is None
+        now[0] = 61
+        assert await cache.get("a") is None
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (1, 2, 1, 1)
+    assert stats["entries"] == 1 and stats["hit_ratio"] == pytest.approx(1 / 3)
+
+
+def test_redis_tier_is_shared_between_processes_and_optional():
+    redis = FakeRedis()
+    first, second = LLMCache(redis=redis), LLMCache(redis=redis)
+
+    async def scenario():
+        await first.set("k", "summary")
+        assert await second.get("k") == "summary"
+        assert await second.get("k") == "summary"
+        redis.down = True
+        await second.set("other", "value")
+        assert await second.get("other") == "value"
+        assert await first.get("missing") is None
+
+    asyncio.run(scenario())
+    assert (second.stats()["redis_hits"], second.stats()["memory_hits"]) == (1, 2)
+    assert first.stats()["redis_errors"] == 1 and second.stats()["redis_errors"] == 1
+
+
+def test_routes_reuse_cached_completions_unless_fresh(monkeypatch):
+    calls = []
+
+    def router(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        content = "- Entropy rises" if len(calls) != 2 else "- Entropy never falls"
+        if "multiple-choice" in calls[-1]["messages"][1]["content"]:
+            content = "not json"
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    monkeypatch.setattr(hf_client, "_hf_client", httpx.AsyncClient(transport=httpx.MockTransport(router)))
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+    llm_cache.clear()
+
+    from main import app
+
+    client = TestClient(app)
+    body = {"text": "The second law of thermodynamics."}
+    assert client.post("/ai/summarize", json=body).json() == {"summary": "- Entropy rises"}
+    assert client.post("/ai/summarize", json={**body, "fresh": True}).json() == {"summary": "- Entropy never falls"}
+    # The fresh answer replaced the cached one.
+    assert client.post("/ai/summarize", json=body).json() == {"summary": "- Entropy never falls"}
+    assert len(calls) == 2
+
+    # Output the route rejects is not cached.
+    for _ in range(2):
+        assert client.post("/ai/generate-quiz?user_id=1", json=body).status_code == 500
+    assert len(calls) == 4
+
+    stats = client.get("/ai/cache/stats").json()
+    assert (stats["memory_hits"], stats["misses"], stats["stores"]) == (1, 3, 2)
+    llm_cache.clear()
+    asyncio.run(hf_client.close_hf_client())
@@ -0,0 +1,137 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import LocalJob, LocalJobStatus
+from services.local_executor import LocalExecutor
+
+_calls = []
+_release = threading.Event()
+
+
+def record_job(value, suffix=""):
+    _calls.append(f"{value}{suffix}")
+
+
+def blocking_job(value):
+    _release.wait(timeout=5)
+    _calls.append(value)
+
+
+def failing_job():
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    LocalJob.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def _statuses(session_factory):
+    db = session_factory()
+    try:
+        return sorted(row.status for row in db.query(LocalJob))
+    finally:
+        db.close()
+
+
+def test_enqueue_returns_immediately_and_drains(session_factory):
+    _calls.clear()
+    _release.clear()
+    executor = LocalExecutor(max_workers=1, session_factory=session_factory)
+
+    executor.enqueue(blocking_job, "slow")
+    executor.enqueue(record_job, "fast", suffix="!")
+    executor.enqueue(failing_job)
+    assert _calls == []
+
+    _release.set()
+    assert executor.drain(timeout=5)
+    assert _calls == ["slow", "fast!"]
+    assert _statuses(session_factory) == [LocalJobStatus.FAILED, LocalJobStatus.FINISHED, LocalJobStatus.FINISHED]
+
+
+def test_recover_resumes_jobs_left_by_a_previous_process(session_factory):
+    _calls.clear()
+    db = session_factory()
+    db.add(LocalJob(func_path=f"{__name__}:record_job", payload={"args": ["queued"], "kwargs": {}}))
+    db.add(
+        LocalJob(
+            func_path=f"{__name__}:record_job",
+            payload={"args": ["interrupted"], "kwargs": {}},
+            status=LocalJobStatus.RUNNING,
+        )
+    )
+    db.commit()
+    db.close()
+
+    executor = LocalExecutor(max_workers=2, session_factory=session_factory)
+    assert executor.recover() == 2
+    assert executor.drain(timeout=5)
+
+    assert sorted(_calls) == ["interrupted", "queued"]
+    assert _statuses(session_factory) == [LocalJobStatus.FINISHED, LocalJobStatus.FINISHED]
+
+
+def test_named_queues_share_the_pool_but_count_separately(session_factory):
+    _calls.clear()
+    _release.clear()
+    executor = LocalExecutor(max_workers=1, session_factory=session_factory)
+
+    executor.queue("transcriptions").enqueue(blocking_job, "long")
+    executor.queue("transcriptions-short").enqueue(record_job, "clip")
+    executor.queue("transcriptions-short").enqueue(record_job, "clip-2")
+
+    assert len(executor.queue("transcriptions-short")) == 2
+    _release.set()
+    assert executor.drain(timeout=5)
+    assert _calls == ["long", "clip", "clip-2"]
+
+
+def test_job_with_unresolvable_function_is_marked_failed(session_factory):
+    db = session_factory()
+    db.add(LocalJob(func_path=f"{__name__}:missing_job", payload={"args": [], "kwargs": {}}))
+    db.commit()
+    db.close()
+
+    executor = LocalExecutor(max_workers=1, session_factory=session_factory)
+    assert executor.recover() == 1
+    assert executor.drain(timeout=5)
+
+    assert _statuses(session_factory) == [LocalJobStatus.FAILED]
+
+
+def test_drain_timeout_leaves_rows_for_recover_and_does_not_block_exit(tmp_path):
+    # Runs in a child process: the interpreter must exit right after drain
+    # gives up, with the sleeping job still RUNNING and the next one QUEUED.
+    script = f"""
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.models import LocalJob
+from services.local_executor import LocalExecutor
+
+engine = create_engine("sqlite:///{tmp_path / 'exit.db'}")
+LocalJob.__table__.create(engine)
+executor = LocalExecutor(max_workers=1, session_factory=sessionmaker(bind=engine))
+executor.enqueue(time.sleep, 60)
+executor.enqueue(time.sleep, 60)
+time.sleep(0.5)
+assert not executor.drain(timeout=0.2)
+"""
+    started = time.monotonic()
+    subprocess.run(
+        [sys.executable, "-c", script], cwd=Path(__file__).resolve().parent.parent, check=True, timeout=30
+    )
+    assert time.monotonic() - started < 20
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'exit.db'}")
+    assert _statuses(sessionmaker(bind=engine)) == [LocalJobStatus.QUEUED, LocalJobStatus.RUNNING]
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _upgrade(engine, revision="head"):
+    config = Config(str(ROOT / "alembic.ini"))
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+        connection.commit()
+
+
+def _downgrade(engine, revision):
+    config = Config(str(ROOT / "alembic.ini"))
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, revision)
+        connection.commit()
+
+
+def test_migrations_add_pipeline_columns_to_a_legacy_table(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        # transcriptions as create_all built it before the pipeline changes.
+        connection.exec_driver_sql(
+            "CREATE TABLE transcriptions (id VARCHAR(36) PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "title VARCHAR(255) NOT NULL, audio_url VARCHAR(512) NOT NULL, audio_path VARCHAR(1024) NOT NULL, "
+            "status VARCHAR(10) NOT NULL DEFAULT 'PROCESSING', created_at DATETIME, updated_at DATETIME)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO transcriptions (id, user_id, title, audio_url, audio_path) VALUES ('old', 1, 't', 'u', 'p')"
+        )
+
+    _upgrade(engine)
+    # Re-running against an up-to-date schema is a no-op.
+    _upgrade(engine)
+
+    inspector = sa.inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("transcriptions")}
+    assert {"audio_sha256", "attempts", "lease_expires_at", "next_attempt_at"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("transcriptions")}
+    assert {"ix_transcriptions_status_lease_expires_at", "ix_transcriptions_user_id_created_at"} <= indexes
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT attempts FROM transcriptions").scalar() == 0
+
+
+def test_migrations_skip_tables_create_all_has_not_built_yet(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    _upgrade(engine)
+
+    assert sa.inspect(engine).get_table_names() == ["alembic_version"]
+
+
+def test_text_downgrade_writes_compressed_values_back_as_text(tmp_path):
+    from db.types import encode_text
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'downgrade.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE transcriptions (id VARCHAR(36) PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "title VARCHAR(255) NOT NULL, audio_url VARCHAR(512) NOT NULL, audio_path VARCHAR(1024) NOT NULL, "
+            "status VARCHAR(10) NOT NULL DEFAULT 'PROCESSING', transcript_text TEXT, summary_text TEXT, "
+            "created_at DATETIME, updated_at DATETIME)"
+        )
+    _upgrade(engine)
+
+    long_text = "entropy always rises " * 50
+    with engine.begin() as connection:
+        for position, (transcript, summary) in enumerate(
+            [(encode_text(long_text), encode_text("short")), ("legacy text", None)]
+        ):
+            connection.execute(
+                sa.text(
+                    "INSERT INTO transcriptions (id, user_id, title, audio_url, audio_path, transcript_text, "
+                    "summary_text) VALUES (:id, 1, 't', 'u', 'p', :transcript, :summary)"
+                ),
+                {"id": f"row-{position}", "transcript": transcript, "summary": summary},
+            )
+
+    _downgrade(engine, "0002")
+
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT transcript_text, summary_text FROM transcriptions ORDER BY id"
+        ).all()
+    assert [tuple(row) for row in rows] == [(long_text, "short"), ("legacy text", None)]
@@ -0,0 +1,24 @@
+import asyncio
+import threading
+
+from services.progress import LocalSubscription, local_broker
+
+
+def test_local_broker_delivers_events_from_worker_threads():
+    async def scenario():
+        subscription = LocalSubscription("abc")
+        worker = threading.Thread(
+            target=local_broker.publish, args=("abc", {"id": "abc", "status": "COMPLETED"})
+        )
+        worker.start()
+        event = await subscription.next_event(timeout=1.0)
+        idle = await subscription.next_event(timeout=0.01)
+        await subscription.close()
+        worker.join()
+        return event, idle
+
+    event, idle = asyncio.run(scenario())
+
+    assert event == {"id": "abc", "status": "COMPLETED"}
+    assert idle is None
+    assert "abc" not in local_broker._subscribers
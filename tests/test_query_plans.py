@@ -0,0 +1,61 @@
+"""
+Check that the per-user listings are answered from their indexes.
+
+SQLite always runs. Postgres runs when POSTGRES_TEST_URL points at a
+scratch database; sequential scans are disabled there because the planner
+prefers them on near-empty tables.
+"""
+import os
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from db.models import Exam, FlashCard, Note, Transcription, TranscriptionStatus
+from db.sessions import Base
+
+
+def _listing_queries():
+    return {
+        "ix_exam_user_id_created_at": sa.select(Exam.id).where(Exam.user_id == 1).order_by(Exam.created_at.desc()),
+        "ix_notes_user_id_created_at": sa.select(Note.id).where(Note.user_id == 1).order_by(Note.created_at.desc()),
+        "ix_transcriptions_user_id_created_at": sa.select(Transcription.id)
+        .where(Transcription.user_id == 1)
+        .order_by(Transcription.created_at.desc(), Transcription.id.desc())
+        .limit(50),
+        "ix_flashcard_set_id": sa.select(FlashCard.id).where(FlashCard.set_id == 1),
+        "ix_transcriptions_status": sa.select(Transcription.id).where(
+            Transcription.status == TranscriptionStatus.PENDING
+        ),
+    }
+
+
+def _plan(session: Session, prefix: str, statement) -> str:
+    sql = statement.compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return "\n".join(str(row[-1]) for row in session.execute(sa.text(f"{prefix} {sql}")))
+
+
+def test_sqlite_listings_use_their_indexes(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for index, statement in _listing_queries().items():
+            plan = _plan(session, "EXPLAIN QUERY PLAN", statement)
+            assert f"INDEX {index}" in plan, plan
+            # Newest-first comes straight off the index, without a sort step.
+            assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.skipif(not os.getenv("POSTGRES_TEST_URL"), reason="POSTGRES_TEST_URL not set")
+def test_postgres_listings_use_their_indexes():
+    engine = sa.create_engine(os.environ["POSTGRES_TEST_URL"])
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            session.execute(sa.text("SET enable_seqscan = off"))
+            for index, statement in _listing_queries().items():
+                plan = _plan(session, "EXPLAIN", statement)
+                assert index in plan and "Index" in plan, plan
+                assert "Sort" not in plan, plan
+    finally:
+        Base.metadata.drop_all(engine)
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.rate_limiter import RATE_LIMIT_KEY, RateLimited, TokenBucket, reserve
+
+
+class FakeRedis:
+    """Runs the reservation script against one shared hash, like Redis would."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = {}
+        self.down = False
+
+    def eval(self, script, numkeys, key, rate_per_ms, capacity, max_wait_ms):
+        if self.down:
+            raise ConnectionError("redis is down")
+        with self._lock:
+            now = time.monotonic() * 1000
+            tokens, ts = self.buckets.get(key, (float(capacity), now))
+            wait, left = reserve(tokens, now - ts, float(rate_per_ms), float(capacity), float(max_wait_ms))
+            if wait >= 0:
+                self.buckets[key] = (left, now)
+            return wait
+
+
+def test_bursts_are_admitted_then_queued_then_refused():
+    # 600/min is one token every 100 ms.
+    bucket = TokenBucket(per_minute=600, burst=3, max_wait_seconds=0.25)
+
+    async def scenario():
+        return [await bucket.acquire() for _ in range(3)], await asyncio.gather(bucket.acquire(), bucket.acquire())
+
+    immediate, queued = asyncio.run(scenario())
+    assert immediate == [0.0, 0.0, 0.0]
+    assert sorted(queued) == pytest.approx([0.1, 0.2], abs=0.02)
+
+    # Tokens came back while waiting; a third burst past the wait limit is refused.
+    async def flood():
+        results = await asyncio.gather(*(bucket.acquire() for _ in range(6)), return_exceptions=True)
+        return [r for r in results if isinstance(r, RateLimited)]
+
+    refused = asyncio.run(flood())
+    assert refused and all(0.25 < r.retry_after <= 0.4 for r in refused)
+    stats = bucket.stats()
+    assert stats["rejected"] == len(refused)
+    assert stats["queued"] >= 2 and stats["queue_seconds_max"] <= 0.25
+
+
+def test_workers_share_one_bucket_through_redis():
+    redis = FakeRedis()
+    first, second = (TokenBucket(redis, per_minute=60, burst=2, max_wait_seconds=0) for _ in range(2))
+
+    async def scenario():
+        await first.acquire()
+        await second.acquire()
+        with pytest.raises(RateLimited) as refused:
+            await first.acquire()
+        return refused.value
+
+    refused = asyncio.run(scenario())
+    assert refused.retry_after == pytest.approx(1.0, abs=0.05)
+    assert RATE_LIMIT_KEY in redis.buckets
+
+
+def test_redis_outage_falls_back_to_a_bucket_per_process():
+    redis = FakeRedis()
+    redis.down = True
+    bucket = TokenBucket(redis, per_minute=60, burst=1, max_wait_seconds=0)
+
+    async def scenario():
+        await bucket.acquire()
+        with pytest.raises(RateLimited):
+            await bucket.acquire()
+
+    asyncio.run(scenario())
+    assert bucket.stats()["redis_errors"] == 2
+
+
+def test_zero_rate_disables_the_limiter():
+    bucket = TokenBucket(per_minute=0, burst=1)
+
+    async def scenario():
+        return await asyncio.gather(*(bucket.acquire() for _ in range(50)))
+
+    assert asyncio.run(scenario()) == [0.0] * 50
+    assert bucket.stats()["admitted"] == 0
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from Controllers.transcription_controller import get_transcription_audio
+from db.models import Transcription, TranscriptionStatus
+from db.sessions import Base
+from services import retention
+from services.storage import LocalStorage
+from workers.archive_audio import apply_retention
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "media"))
+    monkeypatch.setattr(retention, "AUDIO_ARCHIVE_ROOT", str(tmp_path / "cold"))
+    return LocalStorage(tmp_path / "media"), LocalStorage(tmp_path / "cold")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _store(hot, tmp_path, key, data):
+    source = tmp_path / "upload.part"
+    source.write_bytes(data)
+    hot.put_file(source, key)
+
+
+def _transcription(key, *, age_days, status=TranscriptionStatus.COMPLETED, user_id=1):
+    return Transcription(
+        user_id=user_id,
+        title=key,
+        audio_url="u",
+        audio_path=key,
+        audio_key=key,
+        audio_sha256=None,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(days=age_days),
+    )
+
+
+def test_old_recordings_move_to_the_cold_tier_in_batches(media, session_factory, tmp_path):
+    hot, cold = media
+    lecture = b"RIFF\x00\x00\x00\x00WAVEfmt " + b"\x00\x01" * 50_000
+    _store(hot, tmp_path, "transcriptions/shared.wav", lecture)
+    _store(hot, tmp_path, "transcriptions/recent.wav", b"recent")
+    _store(hot, tmp_path, "transcriptions/retried.wav", b"retried")
+
+    db = session_factory()
+    shared = [_transcription("transcriptions/shared.wav", age_days=60, user_id=u) for u in (1, 2)]
+    recent = _transcription("transcriptions/recent.wav", age_days=2)
+    old = _transcription("transcriptions/retried.wav", age_days=60)
+    # A fresh upload of the same recording still needs the hot copy.
+    pending = _transcription("transcriptions/retried.wav", age_days=0, status=TranscriptionStatus.PENDING)
+    db.add_all([*shared, recent, old, pending])
+    db.commit()
+
+    report = apply_retention(session_factory, days=30, policy="archive", batch_size=1)
+
+    assert (report.rows_moved, report.objects_archived, report.objects_deleted, report.failures) == (3, 2, 1, 0)
+    assert report.hot_bytes_freed == len(lecture)
+    assert 0 < report.cold_bytes_written < len(lecture) // 10
+    assert report.reclaimed_bytes == report.hot_bytes_freed - report.cold_bytes_written
+    assert not hot.exists("transcriptions/shared.wav")
+    assert hot.exists("transcriptions/recent.wav") and hot.exists("transcriptions/retried.wav")
+    assert cold.exists("archive/transcriptions/shared.wav.gz")
+
+    db.expire_all()
+    assert [row.audio_tier for row in shared] == ["cold", "cold"]
+    assert shared[0].audio_path == cold.uri("archive/transcriptions/shared.wav.gz")
+    assert (recent.audio_tier, old.audio_tier, pending.audio_tier) == (None, "cold", None)
+    db.close()
+
+    # Nothing left to do on a second run.
+    assert apply_retention(session_factory, days=30, policy="archive").rows_moved == 0
+
+
+def test_opening_the_player_restores_archived_audio(media, session_factory, tmp_path):
+    hot, cold = media
+    recording = b"ID3" + b"lecture audio " * 1000
+    _store(hot, tmp_path, "transcriptions/lecture.mp3", recording)
+    db = session_factory()
+    rows = [_transcription("transcriptions/lecture.mp3", age_days=120, user_id=u) for u in (5, 6)]
+    db.add_all(rows)
+    db.commit()
+    apply_retention(session_factory, days=90, policy="archive")
+    assert not hot.exists("transcriptions/lecture.mp3")
+
+    db.expire_all()
+    stored = get_transcription_audio(db, user_id=5, transcription_id=rows[0].id)
+
+    assert stored.absolute_path.read_bytes() == recording
+    db.expire_all()
+    # Both owners share the restored object, and the play resets the clock.
+    assert [row.audio_tier for row in rows] == [None, None]
+    assert rows[0].audio_path == hot.uri("transcriptions/lecture.mp3")
+    assert rows[0].audio_accessed_at is not None and rows[1].audio_accessed_at is None
+    assert apply_retention(session_factory, days=90, policy="archive").rows_moved == 1
+    db.close()
+
+
+def test_delete_policy_purges_and_the_endpoint_reports_gone(media, session_factory, tmp_path):
+    hot, cold = media
+    _store(hot, tmp_path, "transcriptions/old.wav", b"RIFF old lecture")
+    db = session_factory()
+    row = _transcription("transcriptions/old.wav", age_days=400)
+    db.add(row)
+    db.commit()
+
+    report = apply_retention(session_factory, days=365, policy="delete")
+
+    assert (report.rows_moved, report.objects_archived, report.objects_deleted) == (1, 0, 1)
+    assert report.reclaimed_bytes == len(b"RIFF old lecture")
+    assert not hot.exists("transcriptions/old.wav") and not cold.exists("archive/transcriptions/old.wav.gz")
+    with pytest.raises(HTTPException) as error:
+        get_transcription_audio(db, user_id=1, transcription_id=row.id)
+    assert error.value.status_code == 410
+    db.close()
@@ -0,0 +1,121 @@
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from services import storage
+from services.media import media_file_response
+from services.s3_storage import S3Storage
+from services.storage import StoredFile
+
+boto3 = pytest.importorskip("boto3")
+from botocore.config import Config  # noqa: E402
+
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    # Point S3_TEST_ENDPOINT at a MinIO server to run against it instead.
+    endpoint = os.getenv("S3_TEST_ENDPOINT")
+    if endpoint:
+        yield endpoint
+        return
+    moto_server = pytest.importorskip("moto.server")
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(s3_endpoint, request):
+    client = boto3.client(
+        "s3",
+        endpoint_url=s3_endpoint,
+        region_name="us-east-1",
+        aws_access_key_id=os.getenv("S3_TEST_ACCESS_KEY", "minioadmin"),
+        aws_secret_access_key=os.getenv("S3_TEST_SECRET_KEY", "minioadmin"),
+        config=Config(s3={"addressing_style": "path"}),
+    )
+    bucket = f"notly-test-{request.node.name.replace('_', '-')[:40]}".lower()
+    client.create_bucket(Bucket=bucket)
+    yield S3Storage(bucket, client, part_size=PART_SIZE, max_concurrency=3)
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket):
+        for item in page.get("Contents", []):
+            client.delete_object(Bucket=bucket, Key=item["Key"])
+    client.delete_bucket(Bucket=bucket)
+
+
+def _recording(size):
+    # A period that does not divide the part size, so misplaced parts show.
+    return (bytes(range(251)) * (size // 251 + 1))[:size]
+
+
+def test_large_files_use_parallel_multipart_and_ranged_reads(s3, tmp_path):
+    data = _recording(2 * PART_SIZE + 12345)
+    source = tmp_path / "lecture.wav"
+    source.write_bytes(data)
+
+    s3.put_file(source, "transcriptions/abc.wav")
+
+    head = s3.client.head_object(Bucket=s3.bucket, Key="transcriptions/abc.wav")
+    # Multipart objects carry an ETag of the form "<md5 of md5s>-<parts>".
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentType"] == "audio/wav"
+    assert s3.exists("transcriptions/abc.wav") and s3.size("transcriptions/abc.wav") == len(data)
+    assert not s3.exists("transcriptions/missing.wav")
+
+    start = PART_SIZE - 10
+    assert b"".join(s3.iter_range("transcriptions/abc.wav", start, start + 19)) == data[start : start + 20]
+
+    with s3.local_copy("transcriptions/abc.wav") as copy:
+        assert copy.read_bytes() == data
+    assert not copy.exists()
+
+
+def test_upload_is_stored_by_key_and_streamed_back_with_ranges(s3, tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(storage, "_s3_storage", s3)
+    audio_bytes = b"RIFF\x10\x00\x00\x00WAVEfmt " + bytes(range(256)) * 4
+
+    from main import app
+
+    client = TestClient(app)
+    upload = client.post(
+        "/api/v1/transcriptions/upload?user_id=61",
+        files={"file": ("s3.wav", io.BytesIO(audio_bytes), "audio/wav")},
+        data={"title": "Stored in S3"},
+    )
+    assert upload.status_code == 201
+    transcription_id = upload.json()["id"]
+    # The job pulls the recording by key; nothing is left on local disk.
+    client.get(f"/api/v1/transcriptions/{transcription_id}/events?user_id=61")
+    assert client.get(f"/api/v1/transcriptions/{transcription_id}/status?user_id=61").json()["status"] == "COMPLETED"
+    assert [p for p in (tmp_path / "transcriptions").iterdir()] == []
+
+    url = f"/api/v1/transcriptions/{transcription_id}/audio?user_id=61"
+    full = client.get(url)
+    assert full.status_code == 200 and full.content == audio_bytes
+    etag = full.headers["etag"]
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.content == audio_bytes[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(audio_bytes)}"
+    assert client.get(url, headers={"Range": "bytes=-4"}).content == audio_bytes[-4:]
+    assert client.get(url, headers={"Range": "bytes=100-199", "If-Range": '"old"'}).status_code == 200
+    assert client.get(url, headers={"Range": f"bytes={len(audio_bytes)}-"}).status_code == 416
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_missing_object_is_not_found(s3):
+    from fastapi import HTTPException
+
+    with pytest.raises(HTTPException) as error:
+        media_file_response(Headers({}), StoredFile(absolute_path=None, key="transcriptions/gone.wav"), s3)
+    assert error.value.status_code == 404
@@ -0,0 +1,99 @@
+from services import scheduler
+from services.scheduler import TranscriptionScheduler, _MemoryState
+
+
+class _RecordingQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, fn, **kwargs):
+        self.jobs.append(kwargs["transcription_id"])
+
+
+def test_scheduler_round_robins_users_and_caps_jobs_in_flight(monkeypatch):
+    queue = _RecordingQueue()
+    monkeypatch.setattr(scheduler, "get_queue", lambda name: queue)
+    sched = TranscriptionScheduler(_MemoryState(), ["short", "standard"], max_in_flight=1)
+
+    for i in range(3):
+        sched.submit(f"bulk-{i}", user_id=1, lane="standard")
+    sched.submit("other-0", user_id=2, lane="standard")
+
+    # Each user gets one job in flight; the bulk uploader's backlog waits.
+    assert queue.jobs == ["bulk-0", "other-0"]
+
+    sched.submit("clip-0", user_id=3, lane="short")
+    sched.job_finished("bulk-0", user_id=1)
+
+    assert queue.jobs == ["bulk-0", "other-0", "clip-0", "bulk-1"]
+    stats = {lane["lane"]: lane for lane in sched.stats()}
+    assert stats["standard"]["pending"] == 1
+    assert stats["standard"]["dispatched"] == 3
+
+
+def test_scheduler_serves_higher_priority_lanes_first(monkeypatch):
+    queue = _RecordingQueue()
+    monkeypatch.setattr(scheduler, "get_queue", lambda name: queue)
+    state = _MemoryState()
+    sched = TranscriptionScheduler(state, ["short", "standard"], max_in_flight=1)
+
+    with state.lock():
+        state.push("standard", "1", {"transcription_id": "long", "user_id": 1, "enqueued_at": 0.0})
+        state.push("short", "1", {"transcription_id": "short", "user_id": 1, "enqueued_at": 0.0})
+    sched.dispatch()
+
+    assert queue.jobs == ["short"]
+
+
+def test_choose_lane_sends_short_clips_to_the_short_lane():
+    assert scheduler.choose_lane(60) == "short"
+    assert scheduler.choose_lane(3600) == scheduler.DEFAULT_LANE
+    assert scheduler.choose_lane(None) == scheduler.DEFAULT_LANE
+
+
+def test_recover_held_back_jobs_resubmits_undispatched_pending_rows(monkeypatch, tmp_path):
+    from datetime import datetime
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from db.models import Transcription, TranscriptionStatus
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'sched.db'}")
+    Transcription.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    for transcription_id, status, next_attempt_at in [
+        ("held", TranscriptionStatus.PENDING, None),
+        ("dispatched", TranscriptionStatus.PENDING, None),
+        ("retrying", TranscriptionStatus.PENDING, datetime.utcnow()),
+        ("done", TranscriptionStatus.COMPLETED, None),
+    ]:
+        db.add(
+            Transcription(
+                id=transcription_id,
+                user_id=1,
+                title=transcription_id,
+                audio_path="a.wav",
+                audio_url="/media/a.wav",
+                status=status,
+                next_attempt_at=next_attempt_at,
+            )
+        )
+    db.commit()
+    db.close()
+
+    class _Executor:
+        def active_payloads(self):
+            return [{"args": [], "kwargs": {"transcription_id": "dispatched", "user_id": 1}}]
+
+    queue = _RecordingQueue()
+    monkeypatch.setattr(scheduler, "redis_conn", None)
+    monkeypatch.setattr(scheduler, "transcription_queue", _Executor())
+    monkeypatch.setattr(scheduler, "get_queue", lambda name: queue)
+    monkeypatch.setattr(
+        scheduler, "transcription_scheduler", TranscriptionScheduler(_MemoryState(), ["short", "standard"], 2)
+    )
+
+    assert scheduler.recover_held_back_jobs(session_factory) == 1
+    assert queue.jobs == ["held"]
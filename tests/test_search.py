@@ -0,0 +1,132 @@
+import pytest
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from db.models import FlashCard, Note, Transcription, TranscriptionStatus
+from db.sessions import Base
+from services.search import create_search_index, search
+from workers import reindex_search
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        create_search_index(connection)
+    return sessionmaker(bind=engine)
+
+
+def _hits(db, user_id, query, **kwargs):
+    return [(hit.kind, hit.ref_id) for hit in search(db.connection(), user_id=user_id, query=query, **kwargs)]
+
+
+def test_index_follows_writes_and_is_scoped_per_user(session_factory):
+    db = session_factory()
+    note = Note(user_id=1, title="Thermodynamics", content="Entropy rises in a closed system.")
+    card = FlashCard(user_id=1, prompt="What always rises?", answer="Entropy")
+    other = Note(user_id=2, title="Entropy", content="Someone else's entropy notes.")
+    lecture = Transcription(
+        user_id=1, title="Lecture 3", audio_url="u", audio_path="p", status=TranscriptionStatus.PROCESSING
+    )
+    db.add_all([note, card, other, lecture])
+    db.commit()
+
+    # Stemmed, every term required; the card's title match ranks it first.
+    assert _hits(db, 1, "entropy rising") == [("flashcard", str(card.id)), ("note", str(note.id))]
+    assert _hits(db, 1, "entropy heat") == []
+    assert _hits(db, 2, "entropy") == [("note", str(other.id))]
+
+    # Transcriptions only become searchable once completed.
+    assert _hits(db, 1, "carnot") == []
+    lecture.transcript_text = "The Carnot cycle bounds the efficiency of heat engines."
+    lecture.status = TranscriptionStatus.COMPLETED
+    db.commit()
+    assert _hits(db, 1, "carnot efficiency") == [("transcription", lecture.id)]
+    hit = search(db.connection(), user_id=1, query="carnot")[0]
+    assert hit.title == "Lecture 3" and "<b>Carnot</b>" in hit.snippet
+
+    note.content = "Energy is conserved."
+    db.commit()
+    assert _hits(db, 1, "entropy", kinds=["note"]) == []
+    assert _hits(db, 1, "conserved") == [("note", str(note.id))]
+
+    db.delete(card)
+    db.commit()
+    assert _hits(db, 1, "entropy") == []
+    # Query syntax in user input is treated as plain words.
+    assert _hits(db, 1, 'energy" OR owner:u2') == []
+    db.close()
+
+
+def test_pages_are_disjoint(session_factory):
+    db = session_factory()
+    db.add_all(Note(user_id=3, title=f"Week {week}", content="Kinematics practice problems") for week in range(5))
+    db.commit()
+
+    first = _hits(db, 3, "kinematics", limit=3)
+    second = _hits(db, 3, "kinematics", limit=3, offset=3)
+    assert len(first) == 3 and len(second) == 2
+    assert not set(first) & set(second)
+    db.close()
+
+
+def test_search_uses_the_fts_index(session_factory):
+    db = session_factory()
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT d.id FROM search_index JOIN search_documents d ON d.id = search_index.rowid "
+        "WHERE search_index MATCH 'owner:u1 AND entropy'"
+    ).all()
+    details = " | ".join(row[-1] for row in plan)
+    assert "VIRTUAL TABLE INDEX" in details
+    assert "SCAN d" not in details
+    db.close()
+
+
+def test_reindex_covers_rows_written_before_the_index(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'reindex.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add(Note(user_id=4, title="Optics", content="Snell's law relates refraction angles."))
+    db.add(
+        Transcription(
+            user_id=4,
+            title="Optics lecture",
+            audio_url="u",
+            audio_path="p",
+            status=TranscriptionStatus.COMPLETED,
+            transcript_text="Total internal reflection and refraction.",
+        )
+    )
+    db.commit()
+    db.close()
+
+    report = reindex_search.reindex(session_factory, batch_size=1)
+    assert (report.transcriptions, report.notes, report.flashcards) == (1, 1, 0)
+
+    db = session_factory()
+    assert sorted(kind for kind, _ in _hits(db, 4, "refraction")) == ["note", "transcription"]
+    db.close()
+
+
+def test_search_endpoint_pages_with_cursor():
+    from db.sessions import engine
+    from main import app
+
+    with engine.begin() as connection:
+        create_search_index(connection)
+    client = TestClient(app)
+    for week in range(3):
+        assert client.post(f"/lectures/create?title=Vectors%20{week}&user_id=41").status_code == 200
+
+    first = client.get("/search/?user_id=41&q=vectors&limit=2")
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    assert first.json()[0]["kind"] == "note"
+    cursor = first.headers["X-Next-Cursor"]
+    rest = client.get(f"/search/?user_id=41&q=vectors&limit=2&cursor={cursor}")
+    assert len(rest.json()) == 1 and "X-Next-Cursor" not in rest.headers
+    assert client.get("/search/?user_id=42&q=vectors").json() == []
+    assert client.get("/search/?user_id=41&q=vectors&kind=flashcard").json() == []
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+from services import segments
+from services.segments import AudioWindow, CheckpointStore
+from services.timeline import TimedSegment, Transcript
+
+
+def test_plan_windows_overlap_and_cover_the_recording():
+    windows = segments.plan_windows(1500, 600, 10)
+
+    assert [w.start for w in windows] == [0, 590, 1180]
+    assert windows[-1].start + windows[-1].duration == 1500
+
+
+def test_join_overlapping_texts_drops_repeated_words():
+    texts = [
+        "welcome to the lecture today we will cover sorting algorithms",
+        "we will cover sorting algorithms starting with merge sort",
+        "",
+    ]
+
+    joined = segments.join_overlapping_texts(texts)
+
+    assert joined == "welcome to the lecture today we will cover sorting algorithms starting with merge sort"
+
+
+def test_transcribe_windows_only_reruns_failed_windows(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "cut_window", lambda source, window, work_dir: work_dir / f"{window.index}.wav")
+    windows = [AudioWindow(i, i * 10.0, 12.0) for i in range(3)]
+    checkpoints = CheckpointStore(tmp_path / "ckpt")
+    calls = []
+
+    def flaky(clip: Path) -> Transcript:
+        calls.append(clip.stem)
+        if clip.stem == "1" and calls.count("1") == 1:
+            raise RuntimeError("provider timeout")
+        return Transcript(text=f"text {clip.stem}", segments=[TimedSegment(0.5, 2.0, f"text {clip.stem}")])
+
+    with pytest.raises(RuntimeError):
+        segments.transcribe_windows(Path("a.wav"), windows, flaky, checkpoints, max_concurrency=2)
+
+    transcripts = segments.transcribe_windows(Path("a.wav"), windows, flaky, checkpoints, max_concurrency=2)
+
+    assert [t.text for t in transcripts] == ["text 0", "text 1", "text 2"]
+    assert transcripts[0].segments == [TimedSegment(0.5, 2.0, "text 0")]
+    assert sorted(calls) == ["0", "1", "1", "2"]
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from Routes import ai
+from services import hf_client
+from services.llm_cache import llm_cache
+from services.single_flight import SingleFlight, single_flight
+
+
+class FakeRedis:
+    """The handful of Redis commands single-flight uses, with expiry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self.down = False
+
+    def _live(self, key):
+        value, expires_at = self._values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis is down")
+
+    def set(self, key, value, nx=False, px=None):
+        self._check()
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._values[key] = (value.encode("utf-8"), time.monotonic() + px / 1000 if px else None)
+            return True
+
+    def get(self, key):
+        self._check()
+        with self._lock:
+            return self._live(key)
+
+    def exists(self, key):
+        self._check()
+        with self._lock:
+            return int(self._live(key) is not None)
+
+    def eval(self, script, numkeys, key, token):
+        self._check()
+        with self._lock:
+            if self._live(key) == token.encode("utf-8"):
+                del self._values[key]
+                return 1
+            return 0
+
+
+def test_concurrent_identical_requests_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def router(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "- One shared summary"}}]})
+
+    monkeypatch.setattr(hf_client, "_hf_client", httpx.AsyncClient(transport=httpx.MockTransport(router)))
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+    monkeypatch.setattr(single_flight, "redis", None)
+    llm_cache.clear()
+    single_flight.reset_stats()
+
+    from main import app
+
+    async def whole_class():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            handout = {"text": "Handout: the Krebs cycle.", "fresh": True}
+            other = {"text": "A different handout.", "fresh": True}
+            return await asyncio.gather(
+                *(client.post("/ai/summarize", json=handout) for _ in range(10)),
+                client.post("/ai/summarize", json=other),
+            )
+
+    responses = asyncio.run(whole_class())
+
+    assert [r.json()["summary"] for r in responses] == ["- One shared summary"] * 11
+    assert len(calls) == 2
+    stats = single_flight.stats()
+    assert (stats["upstream_calls"], stats["local_joins"], stats["in_flight"]) == (2, 9, 0)
+    llm_cache.clear()
+    asyncio.run(hf_client.close_hf_client())
+
+
+def _worker(redis):
+    # One SingleFlight per API process, sharing Redis.
+    return SingleFlight(redis=redis, lock_seconds=5, result_seconds=5, poll_seconds=0.01)
+
+
+def test_processes_wait_for_the_leader_through_redis():
+    redis = FakeRedis()
+    leader, follower = _worker(redis), _worker(redis)
+    calls = []
+
+    async def fetch(answer):
+        calls.append(answer)
+        await asyncio.sleep(0.1)
+        return answer
+
+    async def scenario():
+        first = asyncio.ensure_future(leader.run("k", lambda: fetch("from the leader")))
+        await asyncio.sleep(0.02)
+        second = await follower.run("k", lambda: fetch("from the follower"))
+        return await first, second
+
+    assert asyncio.run(scenario()) == ("from the leader", "from the leader")
+    assert calls == ["from the leader"]
+    assert follower.stats()["remote_joins"] == 1 and follower.stats()["upstream_calls"] == 0
+    # The lock was released once the answer was published.
+    assert redis.get("llm-flight:lock:k") is None
+
+
+def test_a_waiting_process_takes_over_when_the_leader_fails():
+    redis = FakeRedis()
+    leader, follower = _worker(redis), _worker(redis)
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream 503")
+
+    async def succeeding():
+        return "second attempt"
+
+    async def scenario():
+        first = asyncio.ensure_future(leader.run("k", failing))
+        await asyncio.sleep(0.01)
+        second = await follower.run("k", succeeding)
+        with pytest.raises(RuntimeError):
+            await first
+        return second
+
+    assert asyncio.run(scenario()) == "second attempt"
+    assert follower.stats()["upstream_calls"] == 1
+
+
+def test_redis_outage_falls_back_to_in_process_coalescing():
+    redis = FakeRedis()
+    redis.down = True
+    flight = _worker(redis)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("k", fetch) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["answer"] * 3
+    assert len(calls) == 1
+    assert flight.stats()["redis_errors"] == 1
@@ -0,0 +1,46 @@
+import asyncio
+import hashlib
+import io
+
+from fastapi import UploadFile
+
+from services import storage
+
+
+def test_store_audio_file_streams_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(storage, "UPLOAD_CHUNK_SIZE", 7)
+
+    audio_bytes = b"RIFF\x24\x00\x00\x00WAVEfmt " + b"\x00" * 100
+    upload = UploadFile(file=io.BytesIO(audio_bytes), filename="lecture.wav")
+
+    stored = asyncio.run(storage.store_audio_file(upload, user_id=1))
+
+    assert stored.absolute_path.read_bytes() == audio_bytes
+    assert stored.size_bytes == len(audio_bytes)
+    assert stored.sha256 == hashlib.sha256(audio_bytes).hexdigest()
+    assert stored.detected_format == "wav"
+    assert stored.absolute_path.name == f"{stored.sha256}.wav"
+
+
+def test_store_audio_file_reuses_existing_content(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path))
+    audio_bytes = b"ID3" + b"\x01" * 64
+
+    first = asyncio.run(
+        storage.store_audio_file(UploadFile(file=io.BytesIO(audio_bytes), filename="a.mp3"), user_id=1)
+    )
+    second = asyncio.run(
+        storage.store_audio_file(UploadFile(file=io.BytesIO(audio_bytes), filename="b.mp3"), user_id=2)
+    )
+
+    assert first.absolute_path == second.absolute_path
+    assert sorted(p.name for p in (tmp_path / "transcriptions").iterdir()) == [first.absolute_path.name]
+
+
+def test_sniff_audio_format():
+    assert storage.sniff_audio_format(b"ID3\x04\x00") == "mp3"
+    assert storage.sniff_audio_format(b"\xff\xfb\x90\x00") == "mp3"
+    assert storage.sniff_audio_format(b"\xff\xf1\x50\x80") == "aac"
+    assert storage.sniff_audio_format(b"\x00\x00\x00\x20ftypM4A ") == "m4a"
+    assert storage.sniff_audio_format(b"not audio") is None
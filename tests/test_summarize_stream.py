@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from Routes import ai
+from services import hf_client
+from services.llm_cache import llm_cache
+
+TOKENS = ["- Entropy", " rises", "\n- Energy", " is conserved"]
+
+
+class UpstreamStream(httpx.AsyncByteStream):
+    """An OpenAI-compatible completion stream that records being closed."""
+
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        yield b": ping\n\n"
+        for token in self.tokens:
+            await asyncio.sleep(self.delay)
+            chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            self.sent += 1
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    state = {"requests": [], "streams": [], "status": 200, "delay": 0.0}
+
+    def router(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        state["requests"].append(body)
+        if state["status"] != 200:
+            return httpx.Response(state["status"], text="model is loading")
+        if not body.get("stream"):
+            return httpx.Response(200, json={"choices": [{"message": {"content": "".join(TOKENS)}}]})
+        stream = UpstreamStream(TOKENS, state["delay"])
+        state["streams"].append(stream)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+
+    monkeypatch.setattr(hf_client, "_hf_client", httpx.AsyncClient(transport=httpx.MockTransport(router)))
+    monkeypatch.setattr(ai, "HF_API_TOKEN", "test-token")
+    llm_cache.clear()
+    yield state
+    llm_cache.clear()
+    asyncio.run(hf_client.close_hf_client())
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_tokens_are_relayed_as_server_sent_events_and_cached(upstream):
+    from main import app
+
+    client = TestClient(app)
+    text = {"text": "The laws of thermodynamics."}
+    response = client.post("/ai/summarize/stream", json=text)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response.text) == [
+        *[("message", {"delta": token}) for token in TOKENS],
+        ("done", {"summary": "".join(TOKENS)}),
+    ]
+    assert upstream["requests"][0]["stream"] is True
+    assert upstream["streams"][0].closed
+
+    # The streamed summary is cached for both endpoints.
+    assert client.post("/ai/summarize", json=text).json() == {"summary": "".join(TOKENS)}
+    again = _events(client.post("/ai/summarize/stream", json=text).text)
+    assert again == [("message", {"delta": "".join(TOKENS)}), ("done", {"summary": "".join(TOKENS)})]
+    assert len(upstream["requests"]) == 1
+
+
+def test_upstream_errors_keep_their_status(upstream):
+    from main import app
+
+    upstream["status"] = 503
+    response = TestClient(app).post("/ai/summarize/stream", json={"text": "x"})
+    assert response.status_code == 503
+    assert "model is loading" in response.json()["detail"]
+
+
+def test_client_disconnect_closes_the_upstream_request(upstream):
+    from main import app
+
+    upstream["delay"] = 0.05
+    body = json.dumps({"text": "A long lecture.", "fresh": True}).encode()
+
+    async def scenario():
+        first_chunk = asyncio.Event()
+        messages = []
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await first_chunk.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and message.get("body"):
+                first_chunk.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/ai/summarize/stream",
+            "raw_path": b"/ai/summarize/stream",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("test", 80),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        return messages
+
+    messages = asyncio.run(scenario())
+
+    stream = upstream["streams"][0]
+    assert stream.closed
+    assert stream.sent < len(TOKENS)
+    assert [m for m in messages if m["type"] == "http.response.body" and m.get("body")]
+    # Nothing partial was cached.
+    assert llm_cache.stats()["stores"] == 0
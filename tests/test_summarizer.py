@@ -0,0 +1,50 @@
+from services.chunking import estimate_tokens, split_by_token_budget
+from services.summarizer import map_reduce_summary
+
+
+def test_split_by_token_budget_respects_budget_and_keeps_text():
+    text = " ".join(f"Sentence number {i} talks about entropy." for i in range(200))
+
+    chunks = split_by_token_budget(text, 50)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_by_token_budget_handles_unpunctuated_transcripts():
+    chunks = split_by_token_budget("word " * 1000, 20)
+
+    assert all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) == 1000
+
+
+def test_map_reduce_summary_short_text_is_a_single_call():
+    calls = []
+
+    result = map_reduce_summary(
+        "Short lecture.",
+        summarize_chunk=lambda chunk: calls.append("map") or chunk,
+        reduce_summaries=lambda text: calls.append("reduce") or f"notes: {text}",
+        chunk_tokens=100,
+        max_concurrency=2,
+    )
+
+    assert result == "notes: Short lecture."
+    assert calls == ["reduce"]
+
+
+def test_map_reduce_summary_folds_long_text_before_reducing():
+    text = " ".join(f"Point {i} is important." for i in range(400))
+    reduced_inputs = []
+
+    map_reduce_summary(
+        text,
+        summarize_chunk=lambda chunk: chunk[:20],
+        reduce_summaries=lambda combined: reduced_inputs.append(combined) or "notes",
+        chunk_tokens=100,
+        max_concurrency=4,
+    )
+
+    assert len(reduced_inputs) == 1
+    assert estimate_tokens(reduced_inputs[0]) <= 100
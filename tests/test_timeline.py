@@ -0,0 +1,53 @@
+import pytest
+
+from services.segments import AudioWindow
+from services.timeline import (
+    TimedSegment,
+    TimedWord,
+    Transcript,
+    merge_window_segments,
+    pack_word_times,
+    transcript_from_response,
+    unpack_word_times,
+)
+
+
+def test_transcript_from_verbose_json_assigns_words_to_segments():
+    response = {
+        "text": "Hello class. Today entropy.",
+        "segments": [{"start": 0.0, "end": 1.2, "text": " Hello class."}, {"start": 1.2, "end": 3.0, "text": " Today entropy."}],
+        "words": [
+            {"word": "Hello", "start": 0.0, "end": 0.5},
+            {"word": "class", "start": 0.5, "end": 1.1},
+            {"word": "Today", "start": 1.3, "end": 1.8},
+            {"word": "entropy", "start": 1.8, "end": 3.1},
+        ],
+    }
+
+    transcript = transcript_from_response(response)
+
+    assert [s.text for s in transcript.segments] == ["Hello class.", "Today entropy."]
+    assert [w.word for w in transcript.segments[1].words] == ["Today", "entropy"]
+    assert transcript_from_response({"text": "plain"}).segments == []
+
+
+def test_merge_window_segments_keeps_each_overlapping_segment_once():
+    windows = [AudioWindow(0, 0.0, 600.0), AudioWindow(1, 590.0, 400.0)]
+    transcripts = [
+        Transcript("a", [TimedSegment(580.0, 588.0, "before overlap"), TimedSegment(591.0, 597.0, "in overlap")]),
+        Transcript("b", [TimedSegment(1.0, 7.0, "in overlap"), TimedSegment(10.0, 20.0, "after")]),
+    ]
+
+    merged = merge_window_segments(windows, transcripts)
+
+    assert [(s.start, s.text) for s in merged] == [(580.0, "before overlap"), (591.0, "in overlap"), (600.0, "after")]
+
+
+def test_word_times_pack_to_eight_bytes_per_word():
+    words = [TimedWord(0.0, 0.25, "a"), TimedWord(3600.5, 3601.0, "b")]
+
+    packed = pack_word_times(words)
+
+    assert len(packed) == 16
+    assert unpack_word_times(packed) == [(0, 250), (3600500, 3601000)]
+    assert unpack_word_times(b"") == []
@@ -1,4 +1,5 @@
 import io
+import json
 import os
 
 from fastapi.testclient import TestClient
@@ -40,3 +41,240 @@ def test_upload_and_history_and_detail(tmp_path):
     assert detail["id"] == transcription_id
     # transcript_text should exist (stubbed if no API key)
     assert "transcript_text" in detail
+
+
+def test_duplicate_audio_reuses_completed_transcription():
+    audio_bytes = b"RIFF\x10\x00\x00\x00WAVEfmt duplicate-lecture"
+
+    first = client.post(
+        "/api/v1/transcriptions/upload?user_id=2",
+        files={"file": ("a.wav", io.BytesIO(audio_bytes), "audio/wav")},
+        data={"title": "Original"},
+    )
+    assert first.status_code == 201
+    # The events stream only ends once the first job has finished.
+    client.get(f"/api/v1/transcriptions/{first.json()['id']}/events?user_id=2")
+
+    second = client.post(
+        "/api/v1/transcriptions/upload?user_id=3",
+        files={"file": ("b.wav", io.BytesIO(audio_bytes), "audio/wav")},
+        data={"title": "Re-upload"},
+    )
+    assert second.status_code == 201
+    assert second.json()["status"] == "COMPLETED"
+
+    original = client.get(f"/api/v1/transcriptions/{first.json()['id']}?user_id=2").json()
+    copy = client.get(f"/api/v1/transcriptions/{second.json()['id']}?user_id=3").json()
+    assert copy["transcript_text"] == original["transcript_text"]
+    # One stored file, served to each owner under their own transcription.
+    assert copy["audio_url"] != original["audio_url"]
+    assert (
+        client.get(f"{copy['audio_url']}?user_id=3").headers["etag"]
+        == client.get(f"{original['audio_url']}?user_id=2").headers["etag"]
+    )
+
+
+def test_events_stream_ends_with_terminal_status():
+    files = {"file": ("events.wav", io.BytesIO(b"RIFF\x10\x00\x00\x00WAVEfmt events"), "audio/wav")}
+    upload = client.post(
+        "/api/v1/transcriptions/upload?user_id=4", files=files, data={"title": "Events"}
+    )
+    transcription_id = upload.json()["id"]
+
+    resp = client.get(f"/api/v1/transcriptions/{transcription_id}/events?user_id=4")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    assert events[-1]["status"] == "COMPLETED"
+    assert all(event["id"] == transcription_id for event in events)
+
+    assert client.get(f"/api/v1/transcriptions/{transcription_id}/events?user_id=5").status_code == 404
+
+
+def test_history_pages_with_cursor():
+    uploaded = set()
+    for i in range(5):
+        files = {"file": (f"page-{i}.wav", io.BytesIO(f"RIFF\x10\x00\x00\x00WAVEpage-{i}".encode()), "audio/wav")}
+        resp = client.post("/api/v1/transcriptions/upload?user_id=6", files=files, data={"title": f"Page {i}"})
+        uploaded.add(resp.json()["id"])
+
+    seen = []
+    url = "/api/v1/transcriptions/history?user_id=6&limit=2"
+    for _ in range(10):
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert len(resp.json()) <= 2
+        seen.extend(item["id"] for item in resp.json())
+        next_cursor = resp.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        url = f"/api/v1/transcriptions/history?user_id=6&limit=2&cursor={next_cursor}"
+    else:
+        raise AssertionError("history cursor never reached the last page")
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) == uploaded
+    assert client.get("/api/v1/transcriptions/history?user_id=6&cursor=bogus").status_code == 400
+
+
+def test_segments_endpoint_answers_time_range_queries():
+    from db.models import TranscriptSegment
+    from db.sessions import SessionLocal
+    from services.timeline import TimedWord, pack_word_times
+
+    files = {"file": ("segments.wav", io.BytesIO(b"RIFF\x10\x00\x00\x00WAVEfmt segments"), "audio/wav")}
+    upload = client.post("/api/v1/transcriptions/upload?user_id=7", files=files, data={"title": "Segments"})
+    transcription_id = upload.json()["id"]
+    client.get(f"/api/v1/transcriptions/{transcription_id}/events?user_id=7")
+
+    db = SessionLocal()
+    for position, start in enumerate([0, 700, 760, 900]):
+        words = [TimedWord(start, start + 1.5, "entropy"), TimedWord(start + 1.5, start + 3, "rises")]
+        db.add(
+            TranscriptSegment(
+                transcription_id=transcription_id,
+                position=position,
+                start_ms=start * 1000,
+                end_ms=(start + 30) * 1000,
+                text="Entropy rises.",
+                words=[word.word for word in words],
+                word_times=pack_word_times(words),
+            )
+        )
+    db.commit()
+    db.close()
+
+    url = f"/api/v1/transcriptions/{transcription_id}/segments?user_id=7"
+    # 12:00-15:00 overlaps the segment that started at 11:40 and the one at 12:40.
+    resp = client.get(f"{url}&start=720&end=900")
+    assert resp.status_code == 200
+    assert [segment["start"] for segment in resp.json()] == [700, 760, 900]
+    assert resp.json()[0]["words"][1] == {"word": "rises", "start": 701.5, "end": 703.0}
+
+    assert [segment["start"] for segment in client.get(f"{url}&start=710&end=720").json()] == [700]
+    assert client.get(f"{url}&start=740&end=750").json() == []
+    assert len(client.get(url).json()) == 4
+    assert client.get(f"{url}&start=10&end=5").status_code == 400
+    assert client.get(f"/api/v1/transcriptions/{transcription_id}/segments?user_id=8").status_code == 404
+
+
+def test_job_stores_segments_and_completes_on_file_backed_sqlite(tmp_path, monkeypatch):
+    # Segment rows used to be written before summarization, so the job held
+    # SQLite's write lock while the lease heartbeat tried to renew.
+    import functools
+    import time
+
+    import openai
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from Controllers import transcription_controller as controller
+    from db.models import Transcription, TranscriptionStatus, TranscriptSegment
+    from services import leases
+    from services.timeline import TimedSegment, TimedWord, Transcript
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'job.db'}", connect_args={"timeout": 0.5})
+    Transcription.__table__.create(engine)
+    TranscriptSegment.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    audio_path = tmp_path / "lecture.wav"
+    audio_path.write_bytes(b"RIFF")
+    db = session_factory()
+    row = Transcription(
+        user_id=1,
+        title="Lecture",
+        audio_url="/media/lecture.wav",
+        audio_path=str(audio_path),
+        duration_seconds=60,
+        status=TranscriptionStatus.PENDING,
+    )
+    db.add(row)
+    db.commit()
+
+    def slow_summary(text):
+        time.sleep(0.3)
+        return "Summary."
+
+    transcript = Transcript(
+        text="Entropy rises. Heat flows.",
+        segments=[
+            TimedSegment(0.0, 4.0, "Entropy rises.", (TimedWord(0.0, 1.5, "Entropy"), TimedWord(1.5, 4.0, "rises."))),
+            TimedSegment(4.0, 9.5, "Heat flows.", (TimedWord(4.0, 6.0, "Heat"), TimedWord(6.0, 9.5, "flows."))),
+        ],
+    )
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    monkeypatch.setattr(leases, "HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(controller, "LeaseKeeper", functools.partial(leases.LeaseKeeper, session_factory=session_factory))
+    monkeypatch.setattr(controller, "_transcribe_recording", lambda transcription, path: transcript)
+    monkeypatch.setattr(controller, "_generate_summary", slow_summary)
+    monkeypatch.setattr(controller, "_infer_course_name", lambda summary: "Physics")
+
+    controller.process_transcription_job(db, row.id)
+    db.close()
+
+    check = session_factory()
+    stored = check.get(Transcription, row.id)
+    assert stored.status == TranscriptionStatus.COMPLETED
+    assert stored.lease_owner is None
+    segments = check.query(TranscriptSegment).order_by(TranscriptSegment.position).all()
+    assert [(s.start_ms, s.end_ms) for s in segments] == [(0, 4000), (4000, 9500)]
+    assert segments[1].words == ["Heat", "flows."]
+    check.close()
+
+
+def test_audio_is_served_to_its_owner_with_ranges_and_etag():
+    audio_bytes = b"RIFF\x10\x00\x00\x00WAVEfmt " + bytes(range(200))
+    upload = client.post(
+        "/api/v1/transcriptions/upload?user_id=9",
+        files={"file": ("range.wav", io.BytesIO(audio_bytes), "audio/wav")},
+        data={"title": "Ranges"},
+    )
+    audio_url = client.get(f"/api/v1/transcriptions/{upload.json()['id']}?user_id=9").json()["audio_url"]
+    url = f"{audio_url}?user_id=9"
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == audio_bytes
+    assert full.headers["content-type"] == "audio/wav"
+    assert full.headers["accept-ranges"] == "bytes"
+    assert "immutable" in full.headers["cache-control"]
+    etag = full.headers["etag"]
+    assert not etag.startswith("W/") and len(etag) == 66
+
+    partial = client.get(url, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == audio_bytes[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(audio_bytes)}"
+    # A stale validator gets the whole (changed) file instead of a range.
+    assert client.get(url, headers={"Range": "bytes=10-19", "If-Range": '"stale"'}).status_code == 200
+    assert client.get(url, headers={"Range": "bytes=10-19", "If-Range": etag}).status_code == 206
+    assert client.get(url, headers={"Range": f"bytes={len(audio_bytes)}-"}).status_code == 416
+
+    not_modified = client.get(url, headers={"If-None-Match": f"W/{etag}"})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    assert client.get(f"{audio_url}?user_id=10").status_code == 404
+    assert client.get(f"/media/transcriptions/{etag.strip(chr(34))}.wav").status_code == 404
+
+
+def test_audio_can_be_handed_to_nginx(monkeypatch):
+    from pathlib import Path
+
+    from services import media
+    from services.storage import StoredFile, get_media_root
+    from starlette.datastructures import Headers
+
+    path = get_media_root() / "transcriptions" / "accel-test.mp3"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"ID3")
+    monkeypatch.setattr(media, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+    try:
+        response = media.media_file_response(Headers({}), StoredFile(absolute_path=Path(path), sha256="ab" * 32))
+    finally:
+        path.unlink()
+    assert response.headers["x-accel-redirect"] == "/protected-media/transcriptions/accel-test.mp3"
+    assert response.headers["etag"] == f'"{"ab" * 32}"'
+    assert response.media_type == "audio/mpeg"
+    assert response.body == b""
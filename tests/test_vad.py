@@ -0,0 +1,54 @@
+import wave
+
+import numpy as np
+import pytest
+
+from services import vad
+from services.vad import TimeOffsetMap
+
+RATE = 16000
+
+
+def _lecture():
+    rng = np.random.default_rng(0)
+    speech = (rng.standard_normal(RATE * 2) * 6000).astype(np.int16)
+    silence = (rng.standard_normal(RATE * 10) * 20).astype(np.int16)
+    # 2s speech, 10s near-silence, 2s speech
+    return np.concatenate([speech, silence, speech])
+
+
+def test_find_speech_spans_compresses_long_silence():
+    spans = vad.find_speech_spans(
+        _lecture(), RATE, min_silence_seconds=2.0, keep_silence_seconds=0.5, margin_db=12
+    )
+
+    assert len(spans) == 2
+    kept_seconds = sum(end - start for start, end in spans) / RATE
+    assert kept_seconds == pytest.approx(4.5, abs=0.1)
+
+
+def test_trim_silence_writes_speech_and_offset_map(tmp_path, monkeypatch):
+    samples = _lecture()
+    monkeypatch.setattr(vad, "decode_pcm", lambda source, destination, sample_rate: samples)
+    source = tmp_path / "abc.mp3"
+
+    result = vad.trim_silence(
+        source, tmp_path / "speech.wav", min_silence_seconds=2.0, keep_silence_seconds=0.5, margin_db=12
+    )
+
+    assert result.path == tmp_path / "speech.wav"
+    assert [path.name for path in tmp_path.iterdir()] == ["speech.wav"]
+    with wave.open(str(result.path)) as trimmed:
+        assert trimmed.getnframes() / RATE == pytest.approx(result.trimmed_seconds)
+    assert result.trimmed_percent == pytest.approx(100 * 9.5 / 14, abs=1)
+    # A word 3s into the trimmed audio was spoken 12.5s into the lecture.
+    assert result.offset_map.to_original(3.0) == pytest.approx(12.5, abs=0.05)
+
+
+def test_time_offset_map_round_trips_json():
+    offsets = TimeOffsetMap([(0.0, 0.0, 2.25), (2.25, 11.75, 2.25)])
+
+    restored = TimeOffsetMap.from_json(offsets.to_json())
+
+    assert restored.to_original(1.0) == 1.0
+    assert restored.to_original(3.0) == pytest.approx(12.5)
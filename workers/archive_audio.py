@@ -0,0 +1,194 @@
+"""
+Move recordings of finished transcriptions out of hot storage.
+
+    python -m workers.archive_audio [--days 90] [--policy archive|delete] [--batch-size 100]
+
+Completed transcriptions whose recording has not been played for
+AUDIO_RETENTION_DAYS (or, if never played, was uploaded that long ago) are
+archived to the gzipped cold tier, or purged under the "delete" policy. The
+audio endpoint restores archived recordings on demand. Rows are walked in
+id order, a batch per transaction, and every step is idempotent, so the
+command can be stopped and re-run at any time (e.g. nightly from cron).
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from db.models import Transcription, TranscriptionStatus
+from db.sessions import SessionLocal
+from services.retention import (
+    AUDIO_RETENTION_DAYS,
+    AUDIO_RETENTION_POLICY,
+    AUDIO_TIER_COLD,
+    AUDIO_TIER_PURGED,
+    archive_key,
+    archive_object,
+    get_archive_storage,
+)
+from services.storage import StorageBackend, audio_key, get_storage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 100
+
+
+@dataclass
+class RetentionReport:
+    rows_moved: int = 0
+    objects_archived: int = 0
+    objects_deleted: int = 0
+    hot_bytes_freed: int = 0
+    cold_bytes_written: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.hot_bytes_freed - self.cold_bytes_written
+
+
+def _stored_key(row, storage: StorageBackend) -> Optional[str]:
+    if row.audio_key:
+        return row.audio_key
+    # Rows from before storage keys point at the same content-addressed
+    # file under MEDIA_ROOT; adopt its key when that is where they live.
+    if not row.audio_sha256:
+        return None
+    key = audio_key(row.audio_sha256, Path(row.audio_path).suffix.lower())
+    local = storage.local_path(key)
+    if local is not None and local.resolve() == Path(row.audio_path).resolve():
+        return key
+    return None
+
+
+def _still_hot(db, key: str) -> bool:
+    # Includes rows that are still being transcribed, and new uploads of
+    # the same recording.
+    return (
+        db.query(Transcription.id)
+        .filter(Transcription.audio_key == key, Transcription.audio_tier.is_(None))
+        .first()
+        is not None
+    )
+
+
+def apply_retention(
+    session_factory=SessionLocal,
+    *,
+    days: int = AUDIO_RETENTION_DAYS,
+    policy: str = AUDIO_RETENTION_POLICY,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> RetentionReport:
+    if policy not in ("archive", "delete"):
+        raise ValueError(f"Unknown audio retention policy {policy!r}")
+    report = RetentionReport()
+    started = time.perf_counter()
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    storage = get_storage()
+    cold = get_archive_storage()
+    last_id = ""
+    while True:
+        db = session_factory()
+        try:
+            rows = (
+                db.query(
+                    Transcription.id,
+                    Transcription.audio_key,
+                    Transcription.audio_path,
+                    Transcription.audio_sha256,
+                )
+                .filter(
+                    Transcription.status == TranscriptionStatus.COMPLETED,
+                    Transcription.audio_tier.is_(None),
+                    func.coalesce(Transcription.audio_accessed_at, Transcription.created_at) < cutoff,
+                    Transcription.id > last_id,
+                )
+                .order_by(Transcription.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            by_key: Dict[str, List[str]] = {}
+            for row in rows:
+                key = _stored_key(row, storage)
+                if key is None:
+                    logger.warning("Transcription %s: no storage key for %s, skipping", row.id, row.audio_path)
+                    continue
+                by_key.setdefault(key, []).append(row.id)
+
+            moved_keys = []
+            for key, ids in by_key.items():
+                try:
+                    if policy == "archive":
+                        hot = storage.exists(key)
+                        if not hot and not cold.exists(archive_key(key)):
+                            raise FileNotFoundError(f"Stored audio {key} is missing")
+                        written = archive_object(key, storage, cold) if hot else 0
+                        if written:
+                            report.objects_archived += 1
+                            report.cold_bytes_written += written
+                        values = {"audio_tier": AUDIO_TIER_COLD, "audio_path": cold.uri(archive_key(key))}
+                    else:
+                        values = {"audio_tier": AUDIO_TIER_PURGED, "audio_path": ""}
+                except Exception:
+                    report.failures += 1
+                    logger.exception("Could not archive %s", key)
+                    continue
+                db.query(Transcription).filter(Transcription.id.in_(ids)).update(
+                    {**values, "audio_key": key}, synchronize_session=False
+                )
+                report.rows_moved += len(ids)
+                moved_keys.append(key)
+            db.commit()
+
+            # Rows are committed before objects are removed, so a crash in
+            # between leaves a redundant hot copy, never a row pointing at
+            # nothing.
+            for key in moved_keys:
+                if _still_hot(db, key) or not storage.exists(key):
+                    continue
+                size = storage.size(key)
+                storage.delete(key)
+                report.objects_deleted += 1
+                report.hot_bytes_freed += size
+            logger.info(
+                "Moved %d recordings out of hot storage so far, %d bytes reclaimed",
+                report.rows_moved,
+                report.reclaimed_bytes,
+            )
+        finally:
+            db.close()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive or purge recordings of finished transcriptions.")
+    parser.add_argument("--days", type=int, default=AUDIO_RETENTION_DAYS)
+    parser.add_argument("--policy", choices=("archive", "delete"), default=AUDIO_RETENTION_POLICY)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = apply_retention(days=args.days, policy=args.policy, batch_size=args.batch_size)
+    print(
+        f"Moved {report.rows_moved} recordings ({report.objects_archived} archived, "
+        f"{report.objects_deleted} hot objects removed, {report.failures} failures); "
+        f"reclaimed {report.reclaimed_bytes} bytes "
+        f"({report.hot_bytes_freed} freed, {report.cold_bytes_written} written to the cold tier) "
+        f"in {report.seconds:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Backfill for the compressed transcript/summary columns (migration 0003).
+
+    python -m workers.compress_text [--batch-size 200]
+
+Rows are walked in id order, a batch per transaction, and only values that
+are not compressed yet are rewritten, so the command can be stopped and
+re-run at any time.
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import sqlalchemy as sa
+
+from db.sessions import SessionLocal
+from db.types import decode_text, encode_text, is_compressed
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 200
+_COLUMNS = ("transcript_text", "summary_text")
+# Untyped view of the table so values come back exactly as stored.
+_transcriptions = sa.table("transcriptions", sa.column("id"), *(sa.column(c) for c in _COLUMNS))
+
+
+@dataclass
+class BackfillReport:
+    rows_scanned: int = 0
+    rows_rewritten: int = 0
+    text_bytes: int = 0
+    stored_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.stored_bytes:
+            return None
+        return self.text_bytes / self.stored_bytes
+
+
+def backfill(session_factory=SessionLocal, batch_size: int = BACKFILL_BATCH_SIZE) -> BackfillReport:
+    report = BackfillReport()
+    started = time.perf_counter()
+    last_id = ""
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                sa.select(_transcriptions)
+                .where(_transcriptions.c.id > last_id)
+                .order_by(_transcriptions.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                changes = {}
+                for column in _COLUMNS:
+                    stored = getattr(row, column)
+                    if stored is None:
+                        continue
+                    text = decode_text(stored)
+                    encoded = stored if is_compressed(stored) else encode_text(text)
+                    report.text_bytes += len(text.encode("utf-8"))
+                    report.stored_bytes += len(encoded)
+                    if isinstance(stored, str) or bytes(stored) != encoded:
+                        changes[column] = sa.literal(encoded, sa.LargeBinary)
+                if changes:
+                    db.execute(sa.update(_transcriptions).where(_transcriptions.c.id == row.id).values(**changes))
+                    report.rows_rewritten += 1
+            db.commit()
+            report.rows_scanned += len(rows)
+            last_id = rows[-1].id
+            logger.info("Compressed %d/%d rows so far", report.rows_rewritten, report.rows_scanned)
+        finally:
+            db.close()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compress transcript and summary text in place.")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = backfill(batch_size=args.batch_size)
+    ratio = f"{report.ratio:.2f}x" if report.ratio else "n/a"
+    print(
+        f"Scanned {report.rows_scanned} rows, rewrote {report.rows_rewritten} in {report.seconds:.1f}s; "
+        f"{report.text_bytes} bytes of text stored in {report.stored_bytes} bytes ({ratio})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from db.models import TranscriptionStatus
+from db.sessions import SessionLocal
+from services.leases import claim_due_retries, reap_expired_leases
+from services.progress import publish_progress
+from services.scheduler import choose_lane, transcription_scheduler
+
+logger = logging.getLogger(__name__)
+
+REAPER_INTERVAL_SECONDS = float(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+
+
+def sweep() -> None:
+    """
+    One reaper pass: reclaim expired leases, then hand retries whose backoff
+    has elapsed back to the scheduler.
+    """
+    db = SessionLocal()
+    try:
+        requeued, failed = reap_expired_leases(db)
+        due = claim_due_retries(db)
+    finally:
+        db.close()
+
+    for transcription_id, user_id in requeued + failed:
+        transcription_scheduler.job_finished(transcription_id, user_id=user_id)
+    for transcription_id, _ in failed:
+        publish_progress(
+            transcription_id,
+            {"id": transcription_id, "status": TranscriptionStatus.FAILED.value, "error_message": "Worker stopped responding"},
+        )
+    for transcription_id, user_id, duration_seconds in due:
+        transcription_scheduler.submit(transcription_id, user_id=user_id, lane=choose_lane(duration_seconds))
+
+    if requeued or failed or due:
+        logger.info("Reaper: %d requeued, %d failed, %d retries dispatched", len(requeued), len(failed), len(due))
+
+
+async def run_reaper(interval: float = REAPER_INTERVAL_SECONDS) -> None:
+    while True:
+        try:
+            await run_in_threadpool(sweep)
+        except Exception:
+            logger.exception("Reaper sweep failed")
+        await asyncio.sleep(interval)
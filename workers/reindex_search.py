@@ -0,0 +1,110 @@
+"""
+Rebuild the search documents from the source tables (migration 0005).
+
+    python -m workers.reindex_search [--batch-size 200]
+
+New and changed rows are indexed as they are written; this fills the index
+for rows that existed before it, and repairs it after bulk changes that
+bypass the ORM. Each source table is walked in id order, a batch per
+transaction, so the command can be stopped and re-run at any time.
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.orm import undefer
+
+from db.models import FlashCard, Note, Transcription, TranscriptionStatus
+from db.sessions import SessionLocal
+from services.search import (
+    KIND_FLASHCARD,
+    KIND_NOTE,
+    KIND_TRANSCRIPTION,
+    create_search_index,
+    index_document,
+)
+
+logger = logging.getLogger(__name__)
+
+REINDEX_BATCH_SIZE = 200
+
+
+@dataclass
+class ReindexReport:
+    transcriptions: int = 0
+    notes: int = 0
+    flashcards: int = 0
+    seconds: float = 0.0
+
+
+def _document_fields(row):
+    if isinstance(row, Transcription):
+        return KIND_TRANSCRIPTION, row.title, row.transcript_text
+    if isinstance(row, Note):
+        return KIND_NOTE, row.title, row.content
+    return KIND_FLASHCARD, row.prompt, row.answer
+
+
+def _reindex(session_factory, query, model, batch_size: int) -> int:
+    indexed = 0
+    last_id = None
+    while True:
+        db = session_factory()
+        try:
+            batch = query(db)
+            if last_id is not None:
+                batch = batch.filter(model.id > last_id)
+            rows = batch.order_by(model.id).limit(batch_size).all()
+            if not rows:
+                return indexed
+            connection = db.connection()
+            for row in rows:
+                kind, title, body = _document_fields(row)
+                index_document(connection, kind=kind, ref_id=row.id, user_id=row.user_id, title=title, body=body)
+            db.commit()
+            indexed += len(rows)
+            last_id = rows[-1].id
+            logger.info("Indexed %d %s rows so far", indexed, model.__tablename__)
+        finally:
+            db.close()
+
+
+def reindex(session_factory=SessionLocal, batch_size: int = REINDEX_BATCH_SIZE) -> ReindexReport:
+    report = ReindexReport()
+    started = time.perf_counter()
+    db = session_factory()
+    try:
+        create_search_index(db.connection())
+        db.commit()
+    finally:
+        db.close()
+    report.transcriptions = _reindex(
+        session_factory,
+        lambda db: db.query(Transcription)
+        .options(undefer(Transcription.transcript_text))
+        .filter(Transcription.status == TranscriptionStatus.COMPLETED),
+        Transcription,
+        batch_size,
+    )
+    report.notes = _reindex(session_factory, lambda db: db.query(Note), Note, batch_size)
+    report.flashcards = _reindex(session_factory, lambda db: db.query(FlashCard), FlashCard, batch_size)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search index.")
+    parser.add_argument("--batch-size", type=int, default=REINDEX_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = reindex(batch_size=args.batch_size)
+    print(
+        f"Indexed {report.transcriptions} transcriptions, {report.notes} notes and "
+        f"{report.flashcards} flashcards in {report.seconds:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
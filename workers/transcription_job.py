@@ -1,16 +1,24 @@
+from typing import Optional
+
 from db.sessions import SessionLocal
+# Registers the listeners that index transcriptions as they complete.
+import services.search  # noqa: F401
 
 
 
-def transcription_job(transcription_id: str) -> None:
+def transcription_job(transcription_id: str, user_id: Optional[int] = None) -> None:
     # Import the controller function at runtime to avoid a circular
     # import between Controllers.transcription_controller and this module
     # during application startup / import time.
     from Controllers.transcription_controller import process_transcription_job
+    from services.scheduler import transcription_scheduler
 
     db = SessionLocal()
     try:
         process_transcription_job(db, transcription_id)
     finally:
         db.close()
+        # Jobs enqueued before the scheduler existed carry no user_id.
+        if user_id is not None:
+            transcription_scheduler.job_finished(transcription_id, user_id=user_id)
 